@@ -0,0 +1,142 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from bills import Bill
+from customers import Customer
+from operators import Operator
+from registry import OperatorRegistry
+
+#відтворюваний набір бенчмарків гарячих шляхів тарифікації
+#python bench.py --scales 1e3,1e5 --output results.json [--compare baseline.json --threshold 0.1]
+
+BLOCK = 1000                            #операцій в одному блоці заміру затримки
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(name: str, scale: int, setup: Callable[[int], Callable[[int], None]]) -> Dict:
+    #setup(scale) готує дані і повертає run(i), що виконує i-ту операцію
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        run = setup(scale)
+        blocks: List[float] = []
+        start = time.perf_counter()
+        for block_start in range(0, scale, BLOCK):
+            block_time = time.perf_counter()
+            for i in range(block_start, min(block_start + BLOCK, scale)):
+                run(i)
+            blocks.append((time.perf_counter() - block_time) / (min(block_start + BLOCK, scale) - block_start))
+        elapsed = time.perf_counter() - start
+
+        run = setup(scale)
+        tracemalloc.start()
+        for i in range(scale):
+            run(i)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        "name": name,
+        "scale": scale,
+        "ops_per_sec": scale / elapsed,
+        "p50_us": _percentile(blocks, 0.50) * 1e6,
+        "p99_us": _percentile(blocks, 0.99) * 1e6,
+        "peak_bytes": peak,
+    }
+
+
+def _customers(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    registry = OperatorRegistry([Operator(0, 0.4, 0.2, 0.2, 10), Operator(1, 0.6, 0.2, 0.2, 5)])
+    return [Customer(i, f'Customer{i}', '', rng.randint(10, 80), registry, {0: Bill(1e12), 1: Bill(1e12)})
+            for i in range(count)]
+
+
+def _talking_cost(scale: int) -> Callable[[int], None]:
+    customers = _customers(min(scale, 10_000))
+    operator = customers[0].get_operator(0)
+    rng = random.Random(1)
+    minutes = [rng.random() * 60 for _ in range(min(scale, 10_000))]
+    return lambda i: operator.calc_talking_cost(minutes[i % len(minutes)], customers[i % len(customers)])
+
+
+def _message_cost(scale: int) -> Callable[[int], None]:
+    customers = _customers(min(scale, 10_000))
+    operator = customers[0].get_operator(1)
+    return lambda i: operator.calc_message_cost(i % 7 + 1, customers[i % len(customers)],
+                                                customers[(i * 31) % len(customers)])
+
+
+def _network_cost(scale: int) -> Callable[[int], None]:
+    operator = Operator(0, 0.4, 0.2, 0.2, 10)
+    return lambda i: operator.calc_network_cost(i % 500)
+
+
+def _customer_talk(scale: int) -> Callable[[int], None]:
+    customers = _customers(min(scale, 10_000))
+    return lambda i: customers[i % len(customers)].talk(i % 30 + 1, customers[(i * 31) % len(customers)], i % 2)
+
+
+BENCHMARKS: Dict[str, Callable[[int], Callable[[int], None]]] = {
+    "operator.calc_talking_cost": _talking_cost,
+    "operator.calc_message_cost": _message_cost,
+    "operator.calc_network_cost": _network_cost,
+    "customer.talk": _customer_talk,
+}
+
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float) -> List[str]:
+    #регресія: пропускна здатність впала більше ніж на threshold відносно базового прогону
+    previous = {(entry["name"], entry["scale"]): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        old = previous.get((entry["name"], entry["scale"]))
+        if old and entry["ops_per_sec"] < old["ops_per_sec"] * (1 - threshold):
+            regressions.append(f'{entry["name"]} @ {entry["scale"]}: '
+                               f'{old["ops_per_sec"]:.0f} -> {entry["ops_per_sec"]:.0f} ops/s')
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки тарифікації")
+    parser.add_argument('--scales', default='1e3,1e4,1e5', help='кількість подій, до 1e7')
+    parser.add_argument('--only', default='', help='підрядок назви бенчмарку')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='попередній файл результатів')
+    parser.add_argument('--threshold', type=float, default=0.10)
+    args = parser.parse_args()
+
+    scales = [int(float(scale)) for scale in args.scales.split(',')]
+    results = []
+    for name, setup in BENCHMARKS.items():
+        if args.only not in name:
+            continue
+        for scale in scales:
+            entry = measure(name, scale, setup)
+            results.append(entry)
+            print(f'{name:32} {scale:>10} {entry["ops_per_sec"]:>12.0f} ops/s '
+                  f'p50 {entry["p50_us"]:.2f} us  p99 {entry["p99_us"]:.2f} us  peak {entry["peak_bytes"]} B')
+
+    with open(args.output, 'w') as f:
+        json.dump({"python": sys.version, "platform": platform.platform(), "results": results}, f)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
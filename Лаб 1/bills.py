@@ -1,5 +1,6 @@
 class Bill:
     #клас bill представляє рахунок клієнта за послуги оператора
+    __slots__ = ('limiting_amount', 'current_debt')
 
     def __init__(self, limiting_amount: float) -> None:
         #конструктор для класу Bill
@@ -12,11 +13,16 @@ class Bill:
 
     def add_debt(self, debt: float) -> None:
         #додавання боргу до рахунку
+        if not self.try_add_debt(debt):
+            print(f"Ви перевищили ліміт! Ваш борг становитиме {debt + self.current_debt}")
+
+    def try_add_debt(self, debt: float) -> bool:
+        #додавання боргу без виводу, False якщо ліміт буде перевищено
         tentative_debt = debt + self.current_debt               #попередній - tentative
         if tentative_debt <= self.limiting_amount:
             self.current_debt += debt
-        else:
-            print(f"Ви перевищили ліміт! Ваш борг становитиме {tentative_debt}")
+            return True
+        return False
 
     def pay(self, amount: float) -> None:
         #оплата рахунку
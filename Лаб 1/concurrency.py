@@ -0,0 +1,162 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from customers import Customer
+from ledger import BillLedger, BillView
+from operators import RateTable, apply_rate, discounted_age
+from pipeline import CONNECTION, MESSAGE, TALK, UsageRecord
+
+#конкурентне списання: атомарна перевірка ліміту під смугастими блокуваннями, шардинг тарифікації по процесах
+
+
+class StripedLocks:
+    #фіксований набір блокувань, рахунок потрапляє у смугу за своїм ключем
+
+    def __init__(self, stripes: int = 64) -> None:
+        if stripes <= 0:
+            raise ValueError('Stripes count must be positive')
+        self._locks: List[threading.Lock] = [threading.Lock() for _ in range(stripes)]
+
+    def lock_for(self, key: int) -> threading.Lock:
+        return self._locks[hash(key) % len(self._locks)]
+
+    @contextmanager
+    def all(self) -> Iterator[None]:
+        #усі смуги в одному порядку, без взаємоблокувань: зупиняє всі зміни, напр. для узгодженого знімка
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+
+class ConcurrentLedger:
+    #потокобезпечна обгортка BillLedger з тим самим інтерфейсом, тож BillView працює поверх неї
+
+    def __init__(self, ledger: BillLedger, stripes: int = 64) -> None:
+        self.ledger: BillLedger = ledger
+        self.locks: StripedLocks = StripedLocks(stripes)
+        self._open_lock = threading.Lock()
+
+    @property
+    def limiting_amounts(self):
+        return self.ledger.limiting_amounts
+
+    @property
+    def current_debts(self):
+        return self.ledger.current_debts
+
+    def open_account(self, limiting_amount: float, key: Optional[Tuple[int, int]] = None) -> int:
+        with self._open_lock:
+            return self.ledger.open_account(limiting_amount, key)
+
+    def slot(self, customer_id: int, operator_id: int) -> int:
+        return self.ledger.slot(customer_id, operator_id)
+
+    def subscribe(self, listener: Callable[[int], None]) -> None:
+        self.ledger.subscribe(listener)
+
+    def notify(self, slot: int) -> None:
+        self.ledger.notify(slot)
+
+    def try_add_debt(self, slot: int, debt: float) -> bool:
+        #перевірка і списання атомарні в межах рахунку
+        with self.locks.lock_for(slot):
+            return self.ledger.try_add_debt(slot, debt)
+
+    def pay(self, slot: int, amount: float) -> None:
+        with self.locks.lock_for(slot):
+            self.ledger.pay(slot, amount)
+
+    def change_limit(self, slot: int, amount: float) -> None:
+        with self.locks.lock_for(slot):
+            self.ledger.change_limit(slot, amount)
+
+    def view(self, slot: int) -> BillView:
+        #BillView поверх обгортки, тож рахунки клієнтів теж ідуть через смугасті блокування
+        return BillView(self, slot)
+
+    def bills(self, customer_id: int, operator_ids: Iterable[int]) -> Dict[int, BillView]:
+        return {operator_id: BillView(self, self.ledger.slot(customer_id, operator_id)) for operator_id in operator_ids}
+
+    def apply_costs(self, costs: Mapping[int, Sequence[float]]) -> int:
+        #списання вартостей, порахованих шардами, по порядку і з перевіркою ліміту на поточному боргу
+        #повертає кількість відхилених: рахунок заблокований або ліміт був би перевищений
+        rejected = 0
+        for slot, slot_costs in costs.items():
+            with self.locks.lock_for(slot):
+                for cost in slot_costs:
+                    if self.ledger.current_debts[slot] >= self.ledger.limiting_amounts[slot] \
+                            or not self.ledger.try_add_debt(slot, cost):
+                        rejected += 1
+        return rejected
+
+
+def _rate_shard(records: List[UsageRecord], rates: Dict[int, RateTable], ages: Dict[int, int],
+                subscribers: Dict[int, FrozenSet[int]],
+                accounts: Dict[Tuple[int, int], int]) -> Tuple[Dict[int, List[float]], int]:
+    #працює в окремому процесі: тарифікує записи свого шарду, повертає вартості по слотах у порядку записів
+    #ліміти тут не перевіряються: борг у батьківському процесі міг змінитися, перевіряє apply_costs
+    costs: Dict[int, List[float]] = {}
+    rejected = 0
+    for record in records:
+        slot = accounts.get((record.customer_id, record.operator_id))
+        table = rates.get(record.operator_id)
+        if slot is None or table is None:
+            rejected += 1
+            continue
+        if record.kind == TALK:
+            cost = apply_rate(table, 'talk', discounted_age(ages[record.customer_id]), record.amount)
+        elif record.kind == MESSAGE:
+            same_operator = record.operator_id in subscribers.get(record.other_id, ())
+            cost = apply_rate(table, 'message', same_operator, int(record.amount))
+        elif record.kind == CONNECTION:
+            cost = apply_rate(table, 'network', False, record.amount)
+        else:
+            raise ValueError(f"Unknown usage kind: {record.kind}")
+        costs.setdefault(slot, []).append(cost)
+    return costs, rejected
+
+
+def rate_sharded(records: Iterable[UsageRecord], customers: Iterable[Customer],
+                 ledger: Union[BillLedger, ConcurrentLedger], workers: int = 4) -> int:
+    #шардинг за customer_id % workers, шарди лише тарифікують, списання з перевіркою ліміту робить apply_costs
+    #під смугастим блокуванням рахунку, тож паралельні списання через той самий ConcurrentLedger
+    #не дають перевищити ліміт: вартість, що вже не вміщується, відхиляється
+    if not isinstance(ledger, ConcurrentLedger):
+        ledger = ConcurrentLedger(ledger)
+    customers = {customer.id: customer for customer in customers}
+    shards: List[List[UsageRecord]] = [[] for _ in range(workers)]
+    for record in records:
+        shards[record.customer_id % workers].append(record)
+
+    jobs = []
+    for shard in shards:
+        rates: Dict[int, RateTable] = {}      #таблиці з кешу оператора, той самий розрахунок що й Operator.rate_*
+        ages: Dict[int, int] = {}
+        subscribers: Dict[int, FrozenSet[int]] = {}
+        accounts: Dict[Tuple[int, int], int] = {}
+        for record in shard:
+            customer = customers.get(record.customer_id)
+            if customer is None:
+                continue
+            key = (record.customer_id, record.operator_id)
+            if key not in accounts and record.operator_id in customer.operators:
+                accounts[key] = ledger.slot(*key)
+                rates[record.operator_id] = customer.operators[record.operator_id].rates()
+            ages[customer.id] = customer.age
+            other = customers.get(record.other_id)
+            if other is not None and other.id not in subscribers:
+                subscribers[other.id] = frozenset(other.bills)      #як Customer.uses_operator
+        jobs.append((shard, rates, ages, subscribers, accounts))
+
+    rejected = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for costs, shard_rejected in pool.map(_rate_shard, *zip(*jobs)):
+            rejected += shard_rejected + ledger.apply_costs(costs)
+    return rejected
+
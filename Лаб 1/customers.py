@@ -1,25 +1,29 @@
-from typing import List, Dict
+from typing import Dict
 from bills import Bill
 from operators import Operator
+from registry import OperatorRegistry
 
 class Customer:
-
+    __slots__ = ('id', 'first_name', 'last_name', '_age', 'operators', 'bills', 'limiting_amount')
 
     def __init__(self, id: int, first_name: str, last_name: str,
-                 age: int, operators: List[Operator], bills: List[Bill], limiting_amount: float = 1000.0) -> None:
+                 age: int, operators: OperatorRegistry, bills: Dict[int, Bill],
+                 limiting_amount: float = 1000.0) -> None:
         self.id: int = id
         self.first_name: str = first_name
         self.last_name: str = last_name
         self._age: int = age
-        self.operators: List[Operator] = operators
-        self.bills: List[Bill] = bills
+        if not isinstance(operators, OperatorRegistry):
+            raise TypeError('operators must be a shared OperatorRegistry')
+        self.operators: OperatorRegistry = operators            #спільний реєстр, пошук за id
+        self.bills: Dict[int, Bill] = bills                     #рахунки за id оператора, а не за позицією
         self.limiting_amount: float = limiting_amount
 
     def talk(self, minutes: float, customer: 'Customer', operator_id: int) -> None:
-        idx = [idx for idx, operator in enumerate(self.operators) if operator_id == operator.id]
-        if idx:
-            talk_cost = self.operators[idx[0]].calc_talking_cost(minutes, self)
-            bill = self.bills[idx[0]]
+        operator = self.operators.get(operator_id)
+        if operator is not None:
+            talk_cost = operator.calc_talking_cost(minutes, self)
+            bill = self.bills[operator_id]
             if not bill.check():
                 bill.add_debt(talk_cost)
                 print(f"{self.first_name} говорив з {customer.first_name} {minutes} хвилин.")
@@ -60,10 +64,17 @@ class Customer:
         return self.operators[operator_id]
 
     def set_operator(self, operator_id: int, operator: Operator) -> None:
-        self.operators[operator_id] = operator
+        #заміна стосується лише цього клієнта: спільний реєстр не змінюється
+        if operator.id != operator_id:
+            raise ValueError(f'Operator id {operator.id} does not match key {operator_id}')
+        self.operators = self.operators.overlay(operator)
 
     def get_bill(self, operator_id: int) -> Bill:
         return self.bills[operator_id]
 
     def set_bill(self, operator_id: int, bill: Bill) -> None:
-        self.bills[operator_id] = bill
\ No newline at end of file
+        self.bills[operator_id] = bill
+
+    def uses_operator(self, operator_id: int) -> bool:
+        #чи має клієнт рахунок у цього оператора
+        return operator_id in self.bills
@@ -0,0 +1,116 @@
+import threading
+import time
+from bisect import bisect_right
+from heapq import heapify, heappop, heappush
+from typing import Callable, Dict, List, Set, Tuple
+
+from ledger import BillLedger
+
+#інкрементальний індекс кредитного ризику: рахунки впорядковані за часткою використаного ліміту
+
+
+class ExposureIndex:
+    #оновлюється підпискою на BillLedger за O(log n), запити top/above за O(k log k) від розміру відповіді
+    #max-купа з лінивим видаленням: старий запис рахунку лишається в купі, доки її не перебудують
+
+    def __init__(self, ledger: BillLedger, clock: Callable[[], float] = time.monotonic,
+                 max_log: int = 100_000) -> None:
+        self.ledger: BillLedger = ledger
+        self.clock: Callable[[], float] = clock
+        self.max_log: int = max_log                          #скільки останніх блокувань пам'ятати щонайменше
+        self._lock = threading.Lock()                        #оновлення йдуть з потоків ConcurrentLedger
+        self._heap: List[Tuple[float, int]] = []             #(-використання, слот), включно із застарілими
+        self._entries: Dict[int, Tuple[float, int]] = {}     #слот -> його актуальний запис у купі
+        self._blocked: Set[int] = set()
+        self._blocked_times: List[float] = []                #моменти блокування, неспадні
+        self._blocked_slots: List[int] = []
+        for slot in range(len(ledger)):
+            self.update(slot)
+        ledger.subscribe(self.update)
+
+    def _compute(self, slot: int) -> float:
+        debt = self.ledger.current_debts[slot]
+        limit = self.ledger.limiting_amounts[slot]
+        if limit > 0:
+            return debt / limit
+        return float('inf') if debt > 0 else 0.0
+
+    def _live(self, entry: Tuple[float, int]) -> bool:
+        return self._entries.get(entry[1]) is entry
+
+    def update(self, slot: int) -> None:
+        #перерахунок одного рахунку після зміни боргу або ліміту
+        utilization = self._compute(slot)
+        blocked = self.ledger.current_debts[slot] >= self.ledger.limiting_amounts[slot]   #як Bill.check()
+        with self._lock:
+            old = self._entries.get(slot)
+            if old is None or -old[0] != utilization:
+                entry = (-utilization, slot)
+                self._entries[slot] = entry
+                heappush(self._heap, entry)
+                if len(self._heap) > 2 * len(self._entries):
+                    #застарілих записів більше ніж живих: перебудова за O(n), амортизовано O(1) на оновлення
+                    self._heap = list(self._entries.values())
+                    heapify(self._heap)
+
+            if blocked and slot not in self._blocked:
+                self._blocked.add(slot)
+                self._blocked_times.append(self.clock())
+                self._blocked_slots.append(slot)
+                if len(self._blocked_times) > 2 * self.max_log:
+                    del self._blocked_times[:-self.max_log]
+                    del self._blocked_slots[:-self.max_log]
+            elif not blocked:
+                self._blocked.discard(slot)
+
+    def utilization(self, slot: int) -> float:
+        return -self._entries[slot][0]
+
+    def top(self, n: int) -> List[Tuple[int, float]]:
+        #n найризикованіших рахунків: (слот, використання), обхід купи в порядку спадання без її зміни
+        result: List[Tuple[int, float]] = []
+        with self._lock:
+            heap = self._heap
+            frontier = [(heap[0], 0)] if heap and n > 0 else []
+            while frontier and len(result) < n:
+                entry, index = heappop(frontier)
+                if self._live(entry):
+                    result.append((entry[1], -entry[0]))
+                for child in (2 * index + 1, 2 * index + 2):
+                    if child < len(heap):
+                        heappush(frontier, (heap[child], child))
+        return result
+
+    def above(self, fraction: float) -> List[int]:
+        #усі рахунки з використанням не менше fraction (0.9 = 90% ліміту), за зростанням використання
+        found: List[Tuple[float, int]] = []
+        with self._lock:
+            heap = self._heap
+            stack = [0] if heap else []
+            while stack:
+                index = stack.pop()
+                entry = heap[index]
+                if -entry[0] < fraction:
+                    continue                                  #нащадки в купі не більші
+                if self._live(entry):
+                    found.append((-entry[0], entry[1]))
+                stack.extend(child for child in (2 * index + 1, 2 * index + 2) if child < len(heap))
+        found.sort()
+        return [slot for _, slot in found]
+
+    def blocked(self) -> Set[int]:
+        with self._lock:
+            return set(self._blocked)
+
+    def newly_blocked_since(self, since: float) -> List[int]:
+        #рахунки, заблоковані після моменту since і досі заблоковані
+        #журнал обмежений: події старші за останні max_log блокувань можуть бути вже відкинуті
+        with self._lock:
+            start = bisect_right(self._blocked_times, since)
+            seen: Set[int] = set()
+            result = []
+            for slot in self._blocked_slots[start:]:
+                if slot in self._blocked and slot not in seen:
+                    seen.add(slot)
+                    result.append(slot)
+        return result
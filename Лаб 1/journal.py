@@ -0,0 +1,298 @@
+import os
+import struct
+import threading
+import time
+from array import array
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from concurrency import StripedLocks
+from ledger import BillLedger
+
+#журнал попереднього запису (WAL) для BillLedger та компактні двійкові знімки для швидкого відновлення
+
+OPEN, DEBT, PAY, LIMIT = 1, 2, 3, 4
+
+_OP = struct.Struct('<BId')                 #код операції, слот, сума
+_OPEN_KEY = struct.Struct('<qq')            #для OPEN ще (customer_id, operator_id), -1 якщо ключа немає
+_SEGMENT_HEADER = struct.Struct('<4sQ')     #magic, LSN першого запису сегмента
+_SEGMENT_MAGIC = b'BLWJ'
+_SNAPSHOT_HEADER = struct.Struct('<4sIQQQ')  #magic, версія, кількість рахунків, кількість ключів, LSN журналу
+_SNAPSHOT_MAGIC = b'BLSN'
+_SNAPSHOT_VERSION = 2
+
+#LSN - позиція байта в усій історії журналу, наскрізна для сегментів
+#активний сегмент лежить у filename, архівні - у filename.<LSN початку>, доки їх не покриє знімок
+#журналюється лише BillLedger (рахунки клієнтів - його BillView), окремі об'єкти Bill у пам'яті не журналюються
+
+
+def _open_segment(filename: str, base: int):
+    #відкриває сегмент на дозапис або створює новий з LSN base; повертає файл і LSN початку сегмента
+    if os.path.exists(filename) and os.path.getsize(filename) >= _SEGMENT_HEADER.size:
+        with open(filename, 'rb') as f:
+            base = _segment_base(f.read(_SEGMENT_HEADER.size), filename)
+        return open(filename, 'ab'), base
+    f = open(filename, 'wb')
+    f.write(_SEGMENT_HEADER.pack(_SEGMENT_MAGIC, base))
+    f.flush()
+    os.fsync(f.fileno())
+    return f, base
+
+
+def _segment_base(data: bytes, filename: str) -> int:
+    magic, base = _SEGMENT_HEADER.unpack_from(data)
+    if magic != _SEGMENT_MAGIC:
+        raise ValueError(f"Not a ledger journal: {filename}")
+    return base
+
+
+def segments(filename: str) -> List[str]:
+    #файли журналу за зростанням LSN: архівні сегменти, потім активний
+    directory = os.path.dirname(filename) or '.'
+    prefix = os.path.basename(filename) + '.'
+    archived = sorted(int(name[len(prefix):]) for name in os.listdir(directory)
+                      if name.startswith(prefix) and name[len(prefix):].isdigit())
+    paths = [f"{filename}.{base}" for base in archived]
+    if os.path.exists(filename):
+        paths.append(filename)
+    return paths
+
+
+class Journal:
+    #журнал лише на дозапис, fsync робиться раз на batch_size записів
+    #lock тримається лише на дозапис і fsync, щоб записи з різних потоків не переплітались у файлі
+
+    def __init__(self, filename: str, batch_size: int = 1024, base: int = 0) -> None:
+        self.filename: str = filename
+        self.batch_size: int = batch_size
+        self._file, self.base = _open_segment(filename, base)      #base - LSN початку активного сегмента
+        self._buffer: bytearray = bytearray()
+        self._pending: int = 0
+        self.lock = threading.RLock()
+        self.position: int = self.base + self._file.tell() - _SEGMENT_HEADER.size   #LSN кінця журналу
+
+    def append(self, op: int, slot: int, amount: float, key: Optional[Tuple[int, int]] = None) -> None:
+        record = _OP.pack(op, slot, amount)
+        if op == OPEN:
+            record += _OPEN_KEY.pack(*(key if key is not None else (-1, -1)))
+        with self.lock:
+            self._buffer += record
+            self.position += len(record)
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        #запис буфера та fsync однією операцією на всю партію
+        with self.lock:
+            if self._buffer:
+                self._file.write(self._buffer)
+                self._buffer.clear()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+    def rotate(self) -> None:
+        #починає новий сегмент з поточного LSN, старий архівується під ім'ям зі своїм LSN
+        with self.lock:
+            self.flush()
+            self._file.close()
+            os.replace(self.filename, f"{self.filename}.{self.base}")
+            self._file, self.base = _open_segment(self.filename, self.position)
+
+    def prune(self, lsn: int) -> None:
+        #видаляє архівні сегменти, що цілком лежать до lsn (їх уже покриває знімок)
+        with self.lock:
+            paths = segments(self.filename)
+            for path, following in zip(paths, paths[1:]):
+                with open(following, 'rb') as f:
+                    end = _segment_base(f.read(_SEGMENT_HEADER.size), following)
+                if path != self.filename and end <= lsn:
+                    os.remove(path)
+
+    def close(self) -> None:
+        with self.lock:
+            self.flush()
+            self._file.close()
+
+
+def _scan(data: bytes) -> Iterator[Tuple[int, int, float, Optional[Tuple[int, int]], int]]:
+    #записи разом з позицією їх кінця, обірваний останній запис (збій під час запису) ігнорується
+    position = 0
+    while position + _OP.size <= len(data):
+        op, slot, amount = _OP.unpack_from(data, position)
+        position += _OP.size
+        key = None
+        if op == OPEN:
+            if position + _OPEN_KEY.size > len(data):
+                return
+            key = _OPEN_KEY.unpack_from(data, position)
+            position += _OPEN_KEY.size
+            if key == (-1, -1):
+                key = None
+        yield op, slot, amount, key, position
+
+
+def read_journal(filename: str, offset: int = 0) -> Iterator[Tuple[int, int, float, Optional[Tuple[int, int]]]]:
+    #читання одного сегмента журналу, починаючи з LSN offset
+    with open(filename, 'rb') as f:
+        data = f.read()
+    start = _SEGMENT_HEADER.size + max(0, offset - _segment_base(data, filename))
+    for op, slot, amount, key, _ in _scan(data[start:]):
+        yield op, slot, amount, key
+
+
+class JournaledLedger(BillLedger):
+    #BillLedger, кожна успішна зміна якого потрапляє в журнал
+    #зміна і її запис робляться під блокуванням смуги рахунку: для кожного рахунку порядок у журналі
+    #збігається з порядком змін, а зміни різних рахунків комутують і йдуть паралельно
+    #save_snapshot бере всі смуги, тож знімок не бачить зміну без її запису
+
+    def __init__(self, journal: Journal, stripes: int = 64) -> None:
+        super().__init__()
+        self.journal: Journal = journal
+        self.locks: StripedLocks = StripedLocks(stripes)
+        self._open_lock = threading.Lock()
+
+    def open_account(self, limiting_amount: float, key: Optional[Tuple[int, int]] = None) -> int:
+        with self._open_lock:
+            slot = super().open_account(limiting_amount, key)
+            self.journal.append(OPEN, slot, limiting_amount, key)
+        return slot
+
+    def try_add_debt(self, slot: int, debt: float) -> bool:
+        with self.locks.lock_for(slot):
+            accepted = super().try_add_debt(slot, debt)
+            if accepted:
+                self.journal.append(DEBT, slot, debt)
+        return accepted
+
+    def pay(self, slot: int, amount: float) -> None:
+        with self.locks.lock_for(slot):
+            super().pay(slot, amount)
+            self.journal.append(PAY, slot, amount)
+
+    def change_limit(self, slot: int, amount: float) -> None:
+        with self.locks.lock_for(slot):
+            super().change_limit(slot, amount)
+            self.journal.append(LIMIT, slot, amount)
+
+    def apply_delta(self, slot: int, delta: float) -> None:
+        #приріст без перевірки ліміту повторюється як DEBT
+        with self.locks.lock_for(slot):
+            super().apply_delta(slot, delta)
+            self.journal.append(DEBT, slot, delta)
+
+    def apply_debts(self, slots: Sequence[int], debts: Sequence[float]) -> List[bool]:
+        if len(slots) != len(debts):
+            raise ValueError("slots and debts must have the same length")
+        return [self.try_add_debt(slot, debt) for slot, debt in zip(slots, debts)]
+
+    def save_snapshot(self, filename: str) -> None:
+        #знімок стану + LSN, з якого почнеться відновлення; запис атомарний через rename
+        #журнал переходить на новий сегмент із цим LSN, старі сегменти видаляються після запису знімка
+        with self._open_lock, self.locks.all():
+            keys = array('q')
+            for (customer_id, operator_id), slot in self._slots.items():
+                keys.extend((customer_id, operator_id, slot))
+            lsn = self.journal.position
+            header = _SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, _SNAPSHOT_VERSION, len(self), len(keys) // 3, lsn)
+            limits = self.limiting_amounts.tobytes()
+            debts = self.current_debts.tobytes()
+            self.journal.rotate()
+        tmp = filename + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(header)
+            f.write(limits)
+            f.write(debts)
+            f.write(keys.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filename)
+        self.journal.prune(lsn)
+
+
+def _apply(ledger: BillLedger, op: int, slot: int, amount: float, key: Optional[Tuple[int, int]]) -> None:
+    #повтор операції на звичайному BillLedger, тож вона не журналюється вдруге
+    if op == OPEN:
+        ledger.open_account(amount, key)
+    elif op == DEBT:
+        ledger.apply_delta(slot, amount)
+    elif op == PAY:
+        ledger.pay(slot, amount)
+    elif op == LIMIT:
+        ledger.change_limit(slot, amount)
+    else:
+        raise ValueError(f"Unknown journal operation: {op}")
+
+
+def recover(snapshot_filename: str, journal_filename: str, batch_size: int = 1024) -> JournaledLedger:
+    #останній знімок + повтор лише записів журналу після його LSN, зі старих сегментів теж,
+    #якщо збій стався між ротацією журналу та записом знімка
+    lsn = 0
+    ledger = BillLedger()
+    if os.path.exists(snapshot_filename):
+        with open(snapshot_filename, 'rb') as f:
+            magic, version, count, key_count, lsn = _SNAPSHOT_HEADER.unpack(f.read(_SNAPSHOT_HEADER.size))
+            if magic != _SNAPSHOT_MAGIC or version != _SNAPSHOT_VERSION:
+                raise ValueError(f"Not a ledger snapshot: {snapshot_filename}")
+            ledger.limiting_amounts.frombytes(f.read(count * 8))
+            ledger.current_debts.frombytes(f.read(count * 8))
+            keys = array('q')
+            keys.frombytes(f.read(key_count * 3 * 8))
+        for i in range(0, len(keys), 3):
+            ledger._slots[(keys[i], keys[i + 1])] = keys[i + 2]
+    position = lsn
+    for path in segments(journal_filename):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < _SEGMENT_HEADER.size:
+            continue                                        #сегмент не встиг отримати заголовок
+        base = _segment_base(data, path)
+        skip = max(0, lsn - base)
+        records = data[_SEGMENT_HEADER.size + skip:]
+        end = 0
+        for op, slot, amount, key, end in _scan(records):
+            _apply(ledger, op, slot, amount, key)
+        position = max(position, base + skip + end)
+        if end < len(records) and path == journal_filename:
+            #відрізаємо обірваний запис, щоб нові записи не пішли після сміття
+            os.truncate(journal_filename, _SEGMENT_HEADER.size + skip + end)
+
+    journaled = JournaledLedger(Journal(journal_filename, batch_size, base=position))
+    journaled.limiting_amounts = ledger.limiting_amounts
+    journaled.current_debts = ledger.current_debts
+    journaled._slots = ledger._slots
+    return journaled
+
+
+def benchmark(directory: str, accounts: int = 100_000, operations: int = 1_000_000) -> None:
+    #пропускна здатність журналу та час відновлення
+    journal_filename = os.path.join(directory, 'ledger.wal')
+    snapshot_filename = os.path.join(directory, 'ledger.snap')
+    ledger = JournaledLedger(Journal(journal_filename, batch_size=4096))
+    for _ in range(accounts):
+        ledger.open_account(1e9)
+    start = time.perf_counter()
+    for i in range(operations):
+        ledger.try_add_debt(i % accounts, 1.0)
+    ledger.journal.flush()
+    elapsed = time.perf_counter() - start
+    print(f"Журнал: {operations / elapsed:.0f} операцій/с")
+
+    ledger.save_snapshot(snapshot_filename)
+    for i in range(operations // 10):
+        ledger.pay(i % accounts, 0.5)
+    ledger.journal.close()
+
+    start = time.perf_counter()
+    recovered = recover(snapshot_filename, journal_filename)
+    print(f"Відновлення (знімок + хвіст {operations // 10} записів): {time.perf_counter() - start:.3f} с")
+    recovered.journal.close()
+    assert recovered.current_debts == ledger.current_debts
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        benchmark(directory)
@@ -0,0 +1,174 @@
+import tracemalloc
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bills import Bill
+
+#компактне зберігання рахунків: ліміти і борги в суцільних буферах array('d'), індекс - номер слота
+
+
+class BillLedger:
+    #struct-of-arrays сховище для мільйонів рахунків
+
+    def __init__(self) -> None:
+        self.limiting_amounts: array = array('d')
+        self.current_debts: array = array('d')
+        self._slots: Dict[Tuple[int, int], int] = {}           #(customer_id, operator_id) -> слот
+        self._listeners: List[Callable[[int], None]] = []       #викликаються зі слотом після кожної зміни
+
+    def __len__(self) -> int:
+        return len(self.current_debts)
+
+    def open_account(self, limiting_amount: float, key: Optional[Tuple[int, int]] = None) -> int:
+        #новий рахунок, повертає його слот
+        slot = len(self.current_debts)
+        self.limiting_amounts.append(limiting_amount)
+        self.current_debts.append(0.0)
+        if key is not None:
+            self._slots[key] = slot
+        if self._listeners:
+            self.notify(slot)
+        return slot
+
+    def subscribe(self, listener: Callable[[int], None]) -> None:
+        #підписка на зміни рахунків (індекси, звіти)
+        self._listeners.append(listener)
+
+    def notify(self, slot: int) -> None:
+        #також для тих, хто змінює буфери напряму (злиття шардів)
+        for listener in self._listeners:
+            listener(slot)
+
+    def slot(self, customer_id: int, operator_id: int) -> int:
+        return self._slots[(customer_id, operator_id)]
+
+    def view(self, slot: int) -> 'BillView':
+        return BillView(self, slot)
+
+    def bills(self, customer_id: int, operator_ids: Iterable[int]) -> Dict[int, 'BillView']:
+        #рахунки клієнта у форматі Customer.bills: id оператора -> рахунок
+        return {operator_id: BillView(self, self._slots[(customer_id, operator_id)]) for operator_id in operator_ids}
+
+    def try_add_debt(self, slot: int, debt: float) -> bool:
+        tentative_debt = debt + self.current_debts[slot]
+        if tentative_debt <= self.limiting_amounts[slot]:
+            self.current_debts[slot] += debt
+            if self._listeners:
+                self.notify(slot)
+            return True
+        return False
+
+    def pay(self, slot: int, amount: float) -> None:
+        debt = self.current_debts[slot] - amount
+        if debt < 0:
+            self.limiting_amounts[slot] += abs(debt)
+            debt = 0
+        self.current_debts[slot] = debt
+        if self._listeners:
+            self.notify(slot)
+
+    def change_limit(self, slot: int, amount: float) -> None:
+        self.limiting_amounts[slot] += amount
+        if self._listeners:
+            self.notify(slot)
+
+    def apply_delta(self, slot: int, delta: float) -> None:
+        #приріст боргу без перевірки ліміту: злиття результатів, уже перевірених шардом
+        self.current_debts[slot] += delta
+        if self._listeners:
+            self.notify(slot)
+
+    def apply_debts(self, slots: Sequence[int], debts: Sequence[float]) -> List[bool]:
+        #пакетне списання, для кожного боргу та сама перевірка ліміту що і в Bill.add_debt
+        if len(slots) != len(debts):
+            raise ValueError("slots and debts must have the same length")
+        limits = self.limiting_amounts
+        current = self.current_debts
+        accepted = []
+        for slot, debt in zip(slots, debts):
+            if debt + current[slot] <= limits[slot]:
+                current[slot] += debt
+                accepted.append(True)
+            else:
+                accepted.append(False)
+        if self._listeners:
+            for slot, ok in zip(slots, accepted):
+                if ok:
+                    self.notify(slot)
+        return accepted
+
+    def pay_many(self, slots: Sequence[int], amounts: Sequence[float]) -> None:
+        #пакетна оплата без виводу
+        if len(slots) != len(amounts):
+            raise ValueError("slots and amounts must have the same length")
+        for slot, amount in zip(slots, amounts):
+            self.pay(slot, amount)
+
+    def blocked(self) -> List[int]:
+        #слоти, для яких Bill.check() повернув би True
+        limits = self.limiting_amounts
+        return [slot for slot, debt in enumerate(self.current_debts) if debt >= limits[slot]]
+
+
+class BillView:
+    #легке представлення одного рахунку з BillLedger з інтерфейсом Bill
+    __slots__ = ('ledger', 'slot')
+
+    def __init__(self, ledger: BillLedger, slot: int) -> None:
+        self.ledger: BillLedger = ledger
+        self.slot: int = slot
+
+    @property
+    def limiting_amount(self) -> float:
+        return self.ledger.limiting_amounts[self.slot]
+
+    @property
+    def current_debt(self) -> float:
+        return self.ledger.current_debts[self.slot]
+
+    def check(self) -> bool:
+        return self.ledger.current_debts[self.slot] >= self.ledger.limiting_amounts[self.slot]
+
+    def add_debt(self, debt: float) -> None:
+        if not self.ledger.try_add_debt(self.slot, debt):
+            print(f"Ви перевищили ліміт! Ваш борг становитиме {debt + self.current_debt}")
+
+    def try_add_debt(self, debt: float) -> bool:
+        return self.ledger.try_add_debt(self.slot, debt)
+
+    def pay(self, amount: float) -> None:
+        self.ledger.pay(self.slot, amount)
+        print(f"Оплачено {amount}. Борг: {self.current_debt}")
+
+    def change_limit(self, amount: float) -> None:
+        self.ledger.change_limit(self.slot, amount)
+        print(f"Ліміт змінено. Новий ліміт: {self.limiting_amount}")
+
+    def get_limiting_amount(self) -> float:
+        return self.limiting_amount
+
+    def get_current_debt(self) -> float:
+        return self.current_debt
+
+
+def memory_comparison(count: int = 1_000_000) -> Dict[str, float]:
+    #байт на рахунок: окремі об'єкти Bill проти BillLedger
+    tracemalloc.start()
+    objects = [Bill(1000.0) for _ in range(count)]
+    objects_bytes = tracemalloc.get_traced_memory()[0]
+    del objects
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    ledger = BillLedger()
+    for _ in range(count):
+        ledger.open_account(1000.0)
+    ledger_bytes = tracemalloc.get_traced_memory()[0]
+    del ledger
+    tracemalloc.stop()
+    return {"bill_objects": objects_bytes / count, "ledger": ledger_bytes / count}
+
+
+if __name__ == "__main__":
+    for name, per_account in memory_comparison().items():
+        print(f"{name}: {per_account:.1f} байт на рахунок")
@@ -1,13 +1,14 @@
 from customers import Customer
 from operators import Operator
 from bills import Bill
+from registry import OperatorRegistry
 
 
 def main():
     # ініціалізація операторів
-    operators = [Operator(0, 0.4, 0.2, 0.2, 10), Operator(1, 0.6, 0.2, 0.2, 5)]
+    operators = OperatorRegistry([Operator(0, 0.4, 0.2, 0.2, 10), Operator(1, 0.6, 0.2, 0.2, 5)])
 
-    bills = [Bill(1000), Bill(500)]
+    bills = {0: Bill(1000), 1: Bill(500)}   #рахунки за id оператора
 
     customers = [Customer(0, 'Влад', 'Припотнюк', 19, operators, bills),
                  Customer(1, 'Дмитро', 'Ролін', 25, operators, bills)]
@@ -1,66 +1,158 @@
-from typing import TYPE_CHECKING
+import threading
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional, Tuple
 
 if TYPE_CHECKING:
     from customers import Customer
 
+RateTable = Dict[Tuple[str, bool], Tuple[float, float]]    #(послуга, чи є знижка) -> (ціна за одиницю, частка знижки)
+
+
+DISCOUNT_MIN_AGE = 18                 #знижка для молодших за 18
+DISCOUNT_MAX_AGE = 65                 #та старших за 65
+
+
+def discounted_age(age: int) -> bool:
+    #вікова знижка на дзвінки; працює і поелементно для масивів NumPy (batch_rating)
+    return (age < DISCOUNT_MIN_AGE) | (age > DISCOUNT_MAX_AGE)
+
+
+def apply_rate(rates: RateTable, service: str, discounted: bool, quantity: float) -> float:
+    #єдина формула тарифікації: пошук у таблиці, множення і знижка; quantity може бути масивом NumPy
+    charge, discount = rates[(service, discounted)]
+    cost = charge * quantity
+    if discount:
+        cost -= cost * discount
+    return cost
+
+
+class Tariff(NamedTuple):
+    #незмінна версія тарифів оператора
+    talking_charge: float
+    message_cost: float
+    network_charge: float
+    discount_rate: int
+    version: int = 0
+
+    def rate_table(self) -> RateTable:
+        #таблиця для apply_rate, обчислюється раз на версію в Operator.rates
+        discount = self.discount_rate / 100
+        return {
+            ('talk', False): (self.talking_charge, 0.0),
+            ('talk', True): (self.talking_charge, discount),
+            ('message', False): (self.message_cost, 0.0),
+            ('message', True): (self.message_cost, discount),
+            ('network', False): (self.network_charge, 0.0),
+        }
+
 
 class Operator:
     #клас operator представляє оператора зв'язку та тарифи на послуги
+    _tariff_lock = threading.Lock()     #зміни тарифів рідкісні, одне блокування на всіх операторів
 
     def __init__(self, id: int, talking_charge: float, message_cost: float,
                  network_charge: float, discount_rate: int) -> None:
         #конструктор
         self.id = id
-        self.talking_charge: float = talking_charge
-        self.message_cost: float = message_cost
-        self.network_charge: float = network_charge
-        self.discount_rate: int = discount_rate
+        self._tariff: Tariff = Tariff(talking_charge, message_cost, network_charge, discount_rate)
+        self._rates: Optional[Tuple[int, RateTable]] = None   #кеш таблиці тарифів: (версія тарифу, таблиця)
+        self.rate_table_hits: int = 0
+        self.rate_table_misses: int = 0
+
+    @property
+    def tariff(self) -> Tariff:
+        #поточна версія тарифів
+        return self._tariff
+
+    def _update_tariff(self, **changes) -> None:
+        #кожна зміна створює нову версію, старі лишаються незмінними
+        #оператор тримає лише поточну версію: стара живе, доки на неї посилається знімок реєстру
+        #кеш прив'язаний до версії, тож таблиця старої версії не буде використана для нової
+        with self._tariff_lock:
+            tariff = self._tariff
+            self._tariff = tariff._replace(version=tariff.version + 1, **changes)
+            self._rates = None
+
+    def rates(self, tariff: Optional[Tariff] = None) -> RateTable:
+        #таблиця тарифів поточної версії або переданої версії зі знімку
+        if tariff is None:
+            tariff = self._tariff
+        cached = self._rates                 #кортеж (версія, таблиця) читається і замінюється атомарно
+        if cached is not None and cached[0] == tariff.version:
+            self.rate_table_hits += 1
+            return cached[1]
+        self.rate_table_misses += 1
+        rates = tariff.rate_table()
+        if tariff is self._tariff:
+            self._rates = (tariff.version, rates)
+        return rates
+
+    @property
+    def talking_charge(self) -> float:
+        return self._tariff.talking_charge
+
+    @property
+    def message_cost(self) -> float:
+        return self._tariff.message_cost
+
+    @property
+    def network_charge(self) -> float:
+        return self._tariff.network_charge
+
+    @property
+    def discount_rate(self) -> int:
+        return self._tariff.discount_rate
 
     def calc_talking_cost(self, minutes: float, customer: 'Customer') -> float:
 
-        cost = self.talking_charge * minutes
-        if customer.age < 18 or customer.age > 65:
-            discount = cost * (self.discount_rate / 100)
-            cost -= discount
+        cost = self.rate_talk(minutes, customer.age)
         print(f"Дзвінок {minutes} хвилин коштував {cost}")
         return cost
 
     def calc_message_cost(self, quantity: int, customer: 'Customer', other: 'Customer') -> float:
          #метод розрахунку вартості повідомлень
-        cost = self.message_cost * quantity
-        if self.id == other.operators[self.id].id:             # той самий оператор
-            discount = cost * (self.discount_rate / 100)
-            cost -= discount
+        cost = self.rate_message(quantity, other.uses_operator(self.id))   # отримувач має рахунок у цього оператора
         print(f"Надсилає {quantity} повідомлень, що коштує {cost}")
         return cost
 
     def calc_network_cost(self, amount: float) -> float:
         #метод для розрахунку вартості інтернету
-        cost = self.network_charge * amount
+        cost = self.rate_network(amount)
         print(f"Використані {amount} MB інтернету коштує {cost}")
         return cost
 
+    def rate_talk(self, minutes: float, age: int, tariff: Optional[Tariff] = None) -> float:
+        #вартість дзвінка без виводу
+        return apply_rate(self.rates(tariff), 'talk', discounted_age(age), minutes)
+
+    def rate_message(self, quantity: int, same_operator: bool, tariff: Optional[Tariff] = None) -> float:
+        #вартість повідомлень без виводу
+        return apply_rate(self.rates(tariff), 'message', same_operator, quantity)
+
+    def rate_network(self, amount: float, tariff: Optional[Tariff] = None) -> float:
+        #вартість інтернету без виводу
+        return apply_rate(self.rates(tariff), 'network', False, amount)
+
 
     def get_talking_charge(self) -> float:
         return self.talking_charge
 
     def set_talking_charge(self, charge: float) -> None:
-        self.talking_charge = charge
+        self._update_tariff(talking_charge=charge)
 
     def get_message_cost(self) -> float:
         return self.message_cost
 
     def set_message_cost(self, cost: float) -> None:
-        self.message_cost = cost
+        self._update_tariff(message_cost=cost)
 
     def get_network_charge(self) -> float:
         return self.network_charge
 
     def set_network_charge(self, charge: float) -> None:
-        self.network_charge = charge
+        self._update_tariff(network_charge=charge)
 
     def get_discount_rate(self) -> int:
         return self.discount_rate
 
     def set_discount_rate(self, rate: int) -> None:
-        self.discount_rate = rate
+        self._update_tariff(discount_rate=rate)
@@ -0,0 +1,219 @@
+import csv
+import json
+import queue
+import threading
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Protocol, TextIO, Tuple
+
+from bills import Bill
+from customers import Customer
+from operators import Tariff
+
+#потокова обробка записів використання: читання частинами, тарифікація, списання на Bill
+
+TALK = 'talk'
+MESSAGE = 'message'
+CONNECTION = 'connection'
+
+_END = object()                        #маркер кінця потоку в буфері
+
+
+class UsageRecord(NamedTuple):
+    #один запис використання послуг
+    kind: str                          #talk / message / connection
+    customer_id: int
+    operator_id: int
+    amount: float                      #хвилини, кількість повідомлень або MB
+    other_id: Optional[int] = None     #співрозмовник для talk/message
+
+
+class BillingEvent(NamedTuple):
+    #структурована подія відмови або перевищення ліміту
+    kind: str                          #blocked / limit_exceeded / unknown_customer / unknown_operator
+    record: UsageRecord
+    cost: float = 0.0
+
+
+class EventSink(Protocol):
+    #приймач подій конвеєра замість print
+
+    def emit(self, event: BillingEvent) -> None:
+        pass
+
+
+class ListSink:
+    #збирає події у список
+
+    def __init__(self) -> None:
+        self.events: List[BillingEvent] = []
+
+    def emit(self, event: BillingEvent) -> None:
+        self.events.append(event)
+
+
+class JsonlSink:
+    #пише події у файл, по одному json на рядок
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+
+    def emit(self, event: BillingEvent) -> None:
+        self.stream.write(json.dumps({"event": event.kind, "cost": event.cost, **event.record._asdict()}) + "\n")
+
+
+class PipelineStats:
+    #підсумки прогону конвеєра
+
+    def __init__(self) -> None:
+        self.records: int = 0
+        self.accepted: int = 0
+        self.rejected: int = 0
+        self.elapsed: float = 0.0
+
+    @property
+    def records_per_sec(self) -> float:
+        return self.records / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return (f"PipelineStats(records={self.records}, accepted={self.accepted}, "
+                f"rejected={self.rejected}, records_per_sec={self.records_per_sec:.0f})")
+
+
+def parse_record(row: Dict) -> UsageRecord:
+    other_id = row.get('other_id')
+    if row['kind'] not in (TALK, MESSAGE, CONNECTION):
+        raise ValueError(f"Unknown usage kind: {row['kind']}")
+    return UsageRecord(row['kind'], int(row['customer_id']), int(row['operator_id']), float(row['amount']),
+                       int(other_id) if other_id not in (None, '') else None)
+
+
+def chunked(records: Iterable[UsageRecord], chunk_size: int) -> Iterator[List[UsageRecord]]:
+    #розбиває довільний ітератор на частини
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_csv(filename: str, chunk_size: int = 10000) -> Iterator[List[UsageRecord]]:
+    #колонки: kind,customer_id,operator_id,amount,other_id
+    with open(filename, newline='') as f:
+        yield from chunked((parse_record(row) for row in csv.DictReader(f)), chunk_size)
+
+
+def read_jsonl(filename: str, chunk_size: int = 10000) -> Iterator[List[UsageRecord]]:
+    with open(filename) as f:
+        yield from chunked((parse_record(json.loads(line)) for line in f if line.strip()), chunk_size)
+
+
+class BillingPipeline:
+    #етап конвеєра: тарифікує записи та списує вартість на відповідний рахунок
+
+    def __init__(self, customers: Iterable[Customer], sink: Optional[EventSink] = None,
+                 quiet: bool = False, buffer_size: int = 8) -> None:
+        self.customers: Dict[int, Customer] = {customer.id: customer for customer in customers}
+        self.sink: Optional[EventSink] = sink
+        self.quiet: bool = quiet                   #без подій на кожен запис, тільки лічильники
+        self.buffer_size: int = buffer_size        #макс кількість частин у буфері між читанням і обробкою
+
+    def process(self, chunk: List[UsageRecord], stats: PipelineStats,
+                results: Optional[List[Tuple[Optional[str], float]]] = None) -> None:
+        #обробка однієї частини записів, тарифи беруться з одного знімку на всю частину
+        #спершу тарифікується вся частина, і лише потім списується: помилка не лишає частину списаною
+        #якщо передано results, туди додається (подія або None, вартість) для кожного запису
+        customers = self.customers
+        snapshots: Dict[int, Mapping[int, Tariff]] = {}
+        rated: List[Tuple[UsageRecord, Optional[str], Optional[Bill], float]] = []
+        for record in chunk:
+            customer = customers.get(record.customer_id)
+            if customer is None:
+                rated.append((record, 'unknown_customer', None, 0.0))
+                continue
+            if record.operator_id not in customer.operators or not customer.uses_operator(record.operator_id):
+                rated.append((record, 'unknown_operator', None, 0.0))
+                continue
+            tariffs = snapshots.get(id(customer.operators))
+            if tariffs is None:
+                tariffs = snapshots[id(customer.operators)] = customer.operators.snapshot()
+            tariff = tariffs[record.operator_id]
+            operator = customer.operators[record.operator_id]
+            if record.kind == TALK:
+                cost = operator.rate_talk(record.amount, customer.age, tariff)
+            elif record.kind == MESSAGE:
+                other = customers.get(record.other_id)
+                same_operator = other is not None and other.uses_operator(record.operator_id)
+                cost = operator.rate_message(int(record.amount), same_operator, tariff)
+            elif record.kind == CONNECTION:
+                cost = operator.rate_network(record.amount, tariff)
+            else:
+                raise ValueError(f"Unknown usage kind: {record.kind}")
+            rated.append((record, None, customer.get_bill(record.operator_id), cost))
+
+        for record, event, bill, cost in rated:
+            if bill is not None:
+                if bill.check():
+                    event = 'blocked'
+                elif not bill.try_add_debt(cost):
+                    event = 'limit_exceeded'
+            stats.records += 1
+            if results is not None:
+                results.append((event, cost))
+            if event is None:
+                stats.accepted += 1
+            else:
+                stats.rejected += 1
+                if not self.quiet and self.sink is not None:
+                    self.sink.emit(BillingEvent(event, record, cost))
+
+    def run(self, chunks: Iterable[List[UsageRecord]]) -> PipelineStats:
+        #читання йде в окремому потоці, обмежений буфер гальмує його коли обробка не встигає
+        buffer: 'queue.Queue' = queue.Queue(maxsize=self.buffer_size)
+        stop = threading.Event()                   #обробка завершилась або впала, читати далі не треба
+        errors: List[BaseException] = []
+
+        def put(item: object) -> bool:
+            #не блокується назавжди на повному буфері, якщо споживач уже зупинився
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.05)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produce() -> None:
+            try:
+                for chunk in chunks:
+                    if not put(chunk):
+                        return
+            except BaseException as error:
+                errors.append(error)
+            finally:
+                put(_END)
+
+        stats = PipelineStats()
+        start = time.perf_counter()
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                chunk = buffer.get()
+                if chunk is _END:
+                    break
+                self.process(chunk, stats)
+        finally:
+            #помилка обробки: зупинити читача, звільнити буфер і дочекатися потоку
+            stop.set()
+            while True:
+                try:
+                    buffer.get_nowait()
+                except queue.Empty:
+                    break
+            producer.join()
+        stats.elapsed = time.perf_counter() - start
+        if errors:
+            raise errors[0]
+        return stats
@@ -0,0 +1,73 @@
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, Mapping, Optional
+
+from operators import Operator, Tariff
+
+
+class OperatorRegistry:
+    #спільний для всіх клієнтів реєстр операторів з пошуком за id за O(1)
+    #реєстр з parent - це накладка: власні оператори клієнта поверх спільного реєстру
+
+    def __init__(self, operators: Iterable[Operator] = (), parent: Optional['OperatorRegistry'] = None) -> None:
+        self._operators: Dict[int, Operator] = {}
+        self._parent = parent
+        for operator in operators:
+            self.register(operator)
+
+    def register(self, operator: Operator) -> None:
+        self._operators[operator.id] = operator
+
+    def overlay(self, operator: Operator) -> 'OperatorRegistry':
+        #новий реєстр, де operator замінює оператора з тим самим id, а решта береться з цього реєстру
+        #сам цей реєстр не змінюється, а пізніші зміни в ньому видно через накладку
+        #накладка на накладку копіює її власних операторів, тож ланцюжок не росте і замінені не утримуються
+        if self._parent is None:
+            return OperatorRegistry([operator], parent=self)
+        operators = dict(self._operators)
+        operators[operator.id] = operator
+        return OperatorRegistry(operators.values(), parent=self._parent)
+
+    def _merged(self) -> Dict[int, Operator]:
+        if self._parent is None:
+            return self._operators
+        operators = dict(self._parent._merged())
+        operators.update(self._operators)
+        return operators
+
+    def get(self, operator_id: int) -> Optional[Operator]:
+        operator = self._operators.get(operator_id)
+        if operator is None and self._parent is not None:
+            return self._parent.get(operator_id)
+        return operator
+
+    def __getitem__(self, operator_id: int) -> Operator:
+        operator = self.get(operator_id)
+        if operator is None:
+            raise KeyError(operator_id)
+        return operator
+
+    def __setitem__(self, operator_id: int, operator: Operator) -> None:
+        if operator.id != operator_id:
+            raise ValueError(f'Operator id {operator.id} does not match key {operator_id}')
+        self._operators[operator_id] = operator
+
+    def __contains__(self, operator_id: object) -> bool:
+        return operator_id in self._operators or (self._parent is not None and operator_id in self._parent)
+
+    def __iter__(self) -> Iterator[Operator]:
+        return iter(self._merged().values())
+
+    def __len__(self) -> int:
+        return len(self._merged())
+
+    def tariff(self, operator_id: int, version: Optional[int] = None) -> Tariff:
+        #поточна версія тарифів оператора; старі версії реєстр не зберігає, їх тримають знімки
+        tariff = self[operator_id].tariff
+        if version is not None and version != tariff.version:
+            raise KeyError(f'Tariff version {version} of operator {operator_id} is not kept, '
+                           f'take it from a snapshot()')
+        return tariff
+
+    def snapshot(self) -> Mapping[int, Tariff]:
+        #узгоджений знімок тарифів: зміни через сеттери не впливають на вже взятий знімок
+        return MappingProxyType({operator_id: operator.tariff for operator_id, operator in self._merged().items()})
@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from customers import Customer
+from ledger import BillLedger
+from operators import Operator
+from pipeline import CONNECTION, MESSAGE, TALK, BillingPipeline, PipelineStats, UsageRecord, parse_record
+from registry import OperatorRegistry
+
+#asyncio-сервіс тарифікації: TCP, один json на рядок
+#запит:   {"events": [{"kind": "talk", "customer_id": 0, "operator_id": 0, "amount": 10, "other_id": 1}, ...]}
+#відповідь: {"results": [{"status": "ok" | "blocked" | ..., "cost": 4.0}, ...]}
+#запит {"stats": true} повертає лічильники та p50/p99 затримки
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class RatingService:
+    #запити від усіх клієнтів зливаються в спільні партії, щоб розподілити накладні витрати
+
+    def __init__(self, customers: Iterable[Customer], max_batch: int = 4096, max_delay: float = 0.002,
+                 latency_window: int = 100_000) -> None:
+        self.pipeline: BillingPipeline = BillingPipeline(customers, quiet=True)
+        self.max_batch: int = max_batch               #макс кількість подій в одній партії
+        self.max_delay: float = max_delay             #скільки чекати на інші запити перед обробкою, с
+        self.stats: PipelineStats = PipelineStats()
+        self.latencies: Deque[float] = deque(maxlen=latency_window)
+        self.batches: int = 0
+        self.max_batch_seen: int = 0                  #найбільша зібрана партія, подій
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher_task: Optional[asyncio.Task] = None   #посилання, щоб задачу не зібрав GC
+
+    async def _batcher(self) -> None:
+        while True:
+            pending = [await self._queue.get()]
+            size = len(pending[0][0])
+            deadline = time.perf_counter() + self.max_delay
+            while size < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            #уся партія тарифікується одним викликом; process спершу тарифікує всі записи, тож якщо він впав,
+            #нічого не списано і запити повторюються окремо: помилка одного не зачіпає інших
+            start = time.perf_counter()
+            results: List[Tuple[Optional[str], float]] = []
+            try:
+                self.pipeline.process([record for records, _ in pending for record in records], self.stats, results)
+            except Exception:
+                self._process_each(pending)
+            else:
+                position = 0
+                for records, future in pending:
+                    if not future.done():
+                        future.set_result(results[position:position + len(records)])
+                    position += len(records)
+            self.stats.elapsed += time.perf_counter() - start
+            self.batches += 1
+            self.max_batch_seen = max(self.max_batch_seen, size)
+
+    def _process_each(self, pending: List[Tuple[List[UsageRecord], asyncio.Future]]) -> None:
+        for records, future in pending:
+            results: List[Tuple[Optional[str], float]] = []
+            try:
+                self.pipeline.process(records, self.stats, results)
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+                continue
+            if not future.done():
+                future.set_result(results)
+
+    async def rate(self, records: List[UsageRecord]) -> List[Tuple[Optional[str], float]]:
+        if self._queue is None:
+            raise RuntimeError('RatingService is not serving: call serve() first')
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((records, future))
+        return await future
+
+    def report(self) -> Dict:
+        samples = list(self.latencies)
+        return {
+            "records": self.stats.records,
+            "accepted": self.stats.accepted,
+            "rejected": self.stats.rejected,
+            "batches": self.batches,
+            "max_batch": self.max_batch_seen,
+            "p50_ms": percentile(samples, 0.50) * 1000,
+            "p99_ms": percentile(samples, 0.99) * 1000,
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                start = time.perf_counter()
+                try:
+                    request = json.loads(line)
+                    if request.get("stats"):
+                        response = self.report()
+                    else:
+                        records = [parse_record(event) for event in request["events"]]
+                        results = await self.rate(records)
+                        response = {"results": [{"status": event or "ok", "cost": cost} for event, cost in results]}
+                        self.latencies.append(time.perf_counter() - start)
+                except (ValueError, KeyError, TypeError, AttributeError, IndexError) as error:
+                    response = {"error": str(error)}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765) -> asyncio.AbstractServer:
+        self._queue = asyncio.Queue()
+        self._batcher_task = asyncio.get_running_loop().create_task(self._batcher())
+        return await asyncio.start_server(self._handle, host, port)
+
+
+def demo_customers(count: int, operators: int = 2, limiting_amount: float = 1e6) -> List[Customer]:
+    #синтетичні клієнти на рахунках BillLedger
+    registry = OperatorRegistry(Operator(i, 0.4 + 0.1 * i, 0.2, 0.2, 5 + i) for i in range(operators))
+    ledger = BillLedger()
+    customers = []
+    for customer_id in range(count):
+        for operator_id in range(operators):
+            ledger.open_account(limiting_amount, (customer_id, operator_id))
+        customers.append(Customer(customer_id, f'Customer{customer_id}', '', 15 + customer_id % 60, registry,
+                                  ledger.bills(customer_id, range(operators))))
+    return customers
+
+
+async def load_generator(host: str, port: int, clients: int = 16, requests: int = 500, batch: int = 50,
+                         customers: int = 1000, operators: int = 2) -> Dict:
+    #локальний клієнт навантаження: кожен клієнт шле requests запитів по batch подій
+    latencies: List[float] = []
+
+    async def client(seed: int) -> None:
+        rng = random.Random(seed)
+        reader, writer = await asyncio.open_connection(host, port)
+        for _ in range(requests):
+            events = [{"kind": rng.choice((TALK, MESSAGE, CONNECTION)), "customer_id": rng.randrange(customers),
+                       "operator_id": rng.randrange(operators), "amount": rng.randint(1, 30),
+                       "other_id": rng.randrange(customers)} for _ in range(batch)]
+            start = time.perf_counter()
+            writer.write(json.dumps({"events": events}).encode() + b"\n")
+            await writer.drain()
+            await reader.readline()
+            latencies.append(time.perf_counter() - start)
+        writer.close()
+        await writer.wait_closed()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(seed) for seed in range(clients)))
+    elapsed = time.perf_counter() - start
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'{"stats": true}\n')
+    server = json.loads(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return {
+        "events_per_sec": clients * requests * batch / elapsed,
+        "client_p50_ms": percentile(latencies, 0.50) * 1000,
+        "client_p99_ms": percentile(latencies, 0.99) * 1000,
+        "server": server,
+    }
+
+
+async def _benchmark(args: argparse.Namespace) -> None:
+    service = RatingService(demo_customers(args.customers))
+    server = await service.serve(args.host, args.port)
+    async with server:
+        result = await load_generator(args.host, args.port, args.clients, args.requests, args.batch, args.customers)
+    print(json.dumps(result, indent=4))
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = await RatingService(demo_customers(args.customers)).serve(args.host, args.port)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сервіс тарифікації")
+    parser.add_argument('mode', choices=('serve', 'bench'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--customers', type=int, default=1000)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--batch', type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(_serve(args) if args.mode == 'serve' else _benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
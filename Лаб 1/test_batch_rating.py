@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from batch_rating import calc_message_costs, calc_network_costs, calc_talking_costs
+from customers import Customer
+from operators import Operator
+from registry import OperatorRegistry
+
+
+def setup():
+    operator = Operator(1, 0.45, 0.3, 0.15, 12)
+    registry = OperatorRegistry([operator, Operator(2, 0.5, 0.2, 0.1, 5)])
+    subscriber = Customer(0, '', '', 30, registry, {1: None})
+    outsider = Customer(1, '', '', 30, registry, {2: None})
+    return operator, subscriber, outsider
+
+
+def test_talk_matches_scalar_rating():
+    operator, _, _ = setup()
+    minutes = [1.0, 7.5, 12.0, 3.0, 60.0, 0.5]
+    ages = [10, 17, 18, 65, 66, 40]
+    expected = [operator.rate_talk(m, a) for m, a in zip(minutes, ages)]
+    assert calc_talking_costs(operator, minutes, ages).tolist() == expected
+
+
+def test_message_matches_scalar_rating():
+    operator, subscriber, outsider = setup()
+    quantities = [1, 4, 9, 2]
+    recipients = [subscriber, outsider, None, subscriber]
+    expected = [operator.rate_message(q, other is not None and other.uses_operator(operator.id))
+                for q, other in zip(quantities, recipients)]
+    assert calc_message_costs(operator, quantities, recipients).tolist() == expected
+    assert expected[0] < operator.rate_message(1, False)                   #знижка для абонента оператора
+
+
+def test_network_matches_scalar_rating_after_tariff_change():
+    operator, _, _ = setup()
+    old = operator.tariff
+    operator.set_network_charge(0.25)
+    amounts = np.array([0.0, 100.0, 2.5])
+    assert calc_network_costs(operator, amounts).tolist() == [operator.rate_network(a) for a in amounts]
+    assert calc_network_costs(operator, amounts, old).tolist() == [operator.rate_network(a, old) for a in amounts]
+
+
+def test_shape_mismatch_is_rejected():
+    operator, subscriber, _ = setup()
+    with pytest.raises(ValueError):
+        calc_talking_costs(operator, [1.0, 2.0], [30])
+    with pytest.raises(ValueError):
+        calc_message_costs(operator, [1, 2], [subscriber])
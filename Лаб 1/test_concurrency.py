@@ -0,0 +1,81 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from concurrency import ConcurrentLedger, rate_sharded
+from customers import Customer
+from ledger import BillLedger
+from operators import Operator
+from pipeline import BillingPipeline, PipelineStats, UsageRecord
+from registry import OperatorRegistry
+
+
+def test_striped_ledger_loses_no_updates(threads: int = 8, operations: int = 20000, limit: float = 1000.0):
+    #всі потоки списують по 1.0 з одного рахунку: жодне оновлення не губиться і ліміт не перевищується
+    ledger = ConcurrentLedger(BillLedger(), stripes=16)
+    unlimited = ledger.open_account(float('inf'))
+    limited = ledger.open_account(limit)
+
+    def worker() -> int:
+        accepted = 0
+        for _ in range(operations):
+            ledger.try_add_debt(unlimited, 1.0)
+            accepted += ledger.try_add_debt(limited, 1.0)
+        return accepted
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        accepted = sum(pool.map(lambda _: worker(), range(threads)))
+
+    assert ledger.current_debts[unlimited] == threads * operations
+    assert ledger.current_debts[limited] == limit
+    assert accepted == limit
+
+
+def test_sharded_rating_matches_pipeline():
+    registry = OperatorRegistry([Operator(0, 0.4, 0.2, 0.2, 10), Operator(3, 0.6, 0.2, 0.2, 5)])
+    records = [UsageRecord(('talk', 'message', 'connection')[i % 3], i % 7, (0, 3)[i % 2], 1 + i % 5, (i + 1) % 7)
+               for i in range(500)]
+
+    def customers(ledger: BillLedger):
+        for customer_id in range(7):
+            for operator_id in (0, 3):
+                ledger.open_account(40.0, (customer_id, operator_id))
+        return [Customer(customer_id, '', '', 10 + 9 * customer_id, registry, ledger.bills(customer_id, (0, 3)))
+                for customer_id in range(7)]
+
+    sequential = BillLedger()
+    BillingPipeline(customers(sequential), quiet=True).process(records, PipelineStats())
+    sharded = BillLedger()
+    rate_sharded(records, customers(sharded), sharded, workers=3)
+
+    assert list(sharded.current_debts) == list(sequential.current_debts)
+
+
+def test_sharded_rating_respects_limits_under_concurrent_debits():
+    #поки шарди тарифікують, інший потік списує з тих самих рахунків через BillView обгортки
+    registry = OperatorRegistry([Operator(0, 0.4, 0.2, 0.2, 10)])
+    ledger = ConcurrentLedger(BillLedger())
+    for customer_id in range(8):
+        ledger.open_account(100.0, (customer_id, 0))
+    customers = [Customer(customer_id, '', '', 30, registry, ledger.bills(customer_id, (0,)))
+                 for customer_id in range(8)]
+    records = [UsageRecord('connection', i % 8, 0, 1.0) for i in range(4000)]
+    done = threading.Event()
+
+    def debit() -> int:
+        accepted = 0
+        while not done.is_set():
+            for customer in customers:
+                accepted += customer.get_bill(0).try_add_debt(0.5)
+        return accepted
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        debiting = pool.submit(debit)
+        rejected = rate_sharded(records, customers, ledger, workers=2)
+        done.set()
+        debited = debiting.result()
+
+    cost = registry[0].rate_network(1.0)
+    assert all(debt <= 100.0 for debt in ledger.current_debts)
+    assert sum(ledger.current_debts) == pytest.approx(debited * 0.5 + (len(records) - rejected) * cost)
@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from concurrency import ConcurrentLedger
+from journal import Journal, JournaledLedger, recover, segments
+
+
+def make_ledger(directory, accounts: int = 20) -> JournaledLedger:
+    ledger = JournaledLedger(Journal(os.path.join(directory, 'ledger.wal'), batch_size=64))
+    for customer_id in range(accounts):
+        ledger.open_account(500.0, (customer_id, 0))
+    return ledger
+
+
+def test_recovery_after_concurrent_updates_and_snapshots(tmp_path):
+    ledger = make_ledger(str(tmp_path))
+    concurrent = ConcurrentLedger(ledger, stripes=8)
+    snapshot = str(tmp_path / 'ledger.snap')
+
+    def worker(seed: int) -> None:
+        for i in range(2000):
+            slot = (seed * 7 + i) % len(ledger)
+            if i % 10 == 0:
+                concurrent.pay(slot, 3.0)
+            else:
+                concurrent.try_add_debt(slot, 1.0 + seed)
+            if seed == 0 and i % 500 == 0:
+                ledger.save_snapshot(snapshot)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(worker, range(4)))
+    ledger.journal.close()
+
+    recovered = recover(snapshot, ledger.journal.filename)
+    recovered.journal.close()
+    assert recovered.current_debts == ledger.current_debts
+    assert recovered.limiting_amounts == ledger.limiting_amounts
+    assert recovered._slots == ledger._slots
+
+
+def test_snapshot_starts_a_new_segment(tmp_path):
+    ledger = make_ledger(str(tmp_path))
+    for i in range(1000):
+        ledger.try_add_debt(i % 20, 0.25)
+    snapshot = str(tmp_path / 'ledger.snap')
+    ledger.save_snapshot(snapshot)
+    assert segments(ledger.journal.filename) == [ledger.journal.filename]
+    assert ledger.journal.base == ledger.journal.position
+
+    ledger.pay(3, 1.0)
+    ledger.journal.close()
+    recovered = recover(snapshot, ledger.journal.filename)
+    recovered.journal.close()
+    assert recovered.current_debts == ledger.current_debts
+    assert recovered.journal.position == ledger.journal.position
+
+
+def test_recovery_replays_segments_archived_before_a_crash(tmp_path):
+    ledger = make_ledger(str(tmp_path))
+    snapshot = str(tmp_path / 'ledger.snap')
+    ledger.save_snapshot(snapshot)
+    ledger.try_add_debt(1, 10.0)
+    ledger.journal.rotate()                                  #збій після ротації, до запису нового знімка
+    ledger.try_add_debt(2, 20.0)
+    ledger.journal.close()
+    assert len(segments(ledger.journal.filename)) == 2
+
+    recovered = recover(snapshot, ledger.journal.filename)
+    recovered.journal.close()
+    assert recovered.current_debts == ledger.current_debts
+
+
+def test_torn_record_is_truncated(tmp_path):
+    ledger = make_ledger(str(tmp_path), accounts=2)
+    ledger.try_add_debt(0, 5.0)
+    ledger.journal.close()
+    with open(ledger.journal.filename, 'ab') as f:
+        f.write(b'\x02\x00')                                  #обірваний запис
+    recovered = recover(str(tmp_path / 'missing.snap'), ledger.journal.filename)
+    recovered.try_add_debt(1, 7.0)
+    recovered.journal.close()
+
+    again = recover(str(tmp_path / 'missing.snap'), ledger.journal.filename)
+    again.journal.close()
+    assert list(again.current_debts) == [5.0, 7.0]
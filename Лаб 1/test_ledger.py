@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from bills import Bill
+from customers import Customer
+from exposure import ExposureIndex
+from ledger import BillLedger
+from operators import Operator
+from registry import OperatorRegistry
+
+
+def test_ledger_matches_bill_objects():
+    rng = random.Random(0)
+    ledger = BillLedger()
+    bills = []
+    for _ in range(50):
+        limit = rng.uniform(10.0, 100.0)
+        ledger.open_account(limit)
+        bills.append(Bill(limit))
+    for _ in range(2000):
+        slot = rng.randrange(len(bills))
+        action = rng.random()
+        if action < 0.7:
+            amount = rng.uniform(0.0, 20.0)
+            assert ledger.try_add_debt(slot, amount) == bills[slot].try_add_debt(amount)
+        elif action < 0.9:
+            amount = rng.uniform(0.0, 30.0)
+            ledger.pay(slot, amount)
+            bills[slot].pay(amount)
+        else:
+            amount = rng.uniform(-5.0, 5.0)
+            ledger.change_limit(slot, amount)
+            bills[slot].change_limit(amount)
+    assert list(ledger.current_debts) == [bill.current_debt for bill in bills]
+    assert list(ledger.limiting_amounts) == [bill.limiting_amount for bill in bills]
+    assert ledger.blocked() == [slot for slot, bill in enumerate(bills) if bill.check()]
+
+
+def test_apply_debts_checks_every_debt_in_order():
+    ledger = BillLedger()
+    slot = ledger.open_account(10.0)
+    other = ledger.open_account(5.0)
+    assert ledger.apply_debts([slot, slot, other, slot], [6.0, 5.0, 5.0, 4.0]) == [True, False, True, True]
+    assert list(ledger.current_debts) == [10.0, 5.0]
+    with pytest.raises(ValueError):
+        ledger.apply_debts([slot], [])
+
+
+def test_customer_charges_a_ledger_view_like_a_bill():
+    ledger = BillLedger()
+    registry = OperatorRegistry([Operator(0, 0.5, 0.2, 0.1, 0)])
+    for customer_id in range(2):
+        ledger.open_account(3.0, key=(customer_id, 0))
+    customer = Customer(0, 'A', '', 30, registry, ledger.bills(0, [0]))
+    other = Customer(1, 'B', '', 30, registry, ledger.bills(1, [0]))
+    customer.talk(4, other, 0)
+    customer.talk(4, other, 0)                               #2 + 2 > 3: друге списання відхилено
+    assert customer.get_bill(0).current_debt == pytest.approx(2.0)
+    assert ledger.current_debts[ledger.slot(0, 0)] == pytest.approx(2.0)
+    assert ledger.current_debts[ledger.slot(1, 0)] == 0.0
+
+
+def test_exposure_index_tracks_the_ledger():
+    rng = random.Random(1)
+    now = [0.0]
+    ledger = BillLedger()
+    for _ in range(200):
+        ledger.open_account(rng.uniform(10.0, 100.0))
+    index = ExposureIndex(ledger, clock=lambda: now[0])
+    for step in range(3000):
+        now[0] = float(step)
+        slot = rng.randrange(len(ledger))
+        if rng.random() < 0.8:
+            ledger.try_add_debt(slot, rng.uniform(0.0, 15.0))
+        else:
+            ledger.pay(slot, rng.uniform(0.0, 40.0))
+
+    utilization = {slot: ledger.current_debts[slot] / ledger.limiting_amounts[slot] for slot in range(len(ledger))}
+    expected = sorted(utilization.items(), key=lambda item: -item[1])
+    assert [value for _, value in index.top(20)] == [value for _, value in expected[:20]]
+    assert sorted(index.above(0.9)) == sorted(slot for slot, value in utilization.items() if value >= 0.9)
+    assert index.blocked() == set(ledger.blocked())
+    assert set(index.newly_blocked_since(-1.0)) == index.blocked()
+    assert index.newly_blocked_since(now[0]) == []
@@ -0,0 +1,123 @@
+import io
+import json
+
+import pytest
+
+from bills import Bill
+from customers import Customer
+from operators import Operator, apply_rate, discounted_age
+from pipeline import (CONNECTION, MESSAGE, TALK, BillingPipeline, JsonlSink, ListSink, PipelineStats, UsageRecord,
+                      read_jsonl)
+from registry import OperatorRegistry
+
+
+def network():
+    registry = OperatorRegistry([Operator(0, 0.4, 0.2, 0.1, 10), Operator(1, 0.6, 0.3, 0.2, 50)])
+    alice = Customer(0, 'Alice', '', 30, registry, {0: Bill(100.0), 1: Bill(100.0)})
+    bob = Customer(1, 'Bob', '', 70, registry, {0: Bill(100.0)})
+    kid = Customer(2, 'Kid', '', 12, registry, {1: Bill(1.0)})
+    return registry, alice, bob, kid
+
+
+@pytest.mark.parametrize("age, discounted", [(12, True), (17, True), (18, False), (40, False),
+                                              (65, False), (66, True)])
+def test_age_discount_boundaries(age, discounted):
+    operator = Operator(0, 0.5, 0.2, 0.1, 20)
+    assert discounted_age(age) == discounted
+    assert operator.rate_talk(10, age) == pytest.approx(4.0 if discounted else 5.0)
+
+
+def test_message_discount_follows_the_recipients_accounts():
+    registry, alice, bob, kid = network()
+    #знижка, якщо отримувач має рахунок у того ж оператора, незалежно від того, хто надсилає
+    assert bob.uses_operator(0) and not bob.uses_operator(1)
+    assert registry[0].calc_message_cost(10, alice, bob) == pytest.approx(1.8)
+    assert registry[1].calc_message_cost(10, alice, bob) == pytest.approx(3.0)
+    assert registry[1].calc_message_cost(10, alice, kid) == pytest.approx(1.5)
+
+
+def test_network_is_never_discounted():
+    registry, alice, bob, kid = network()
+    rates = registry[1].rates()
+    assert ('network', True) not in rates
+    assert registry[1].rate_network(100) == apply_rate(rates, 'network', False, 100) == pytest.approx(20.0)
+
+
+def test_rate_table_is_cached_per_tariff_version():
+    operator = Operator(0, 0.4, 0.2, 0.1, 10)
+    operator.rate_talk(1, 30)
+    operator.rate_talk(1, 30)
+    assert (operator.rate_table_misses, operator.rate_table_hits) == (1, 1)
+    operator.set_discount_rate(50)
+    assert operator.rate_talk(10, 12) == pytest.approx(2.0)
+    assert operator.rate_table_misses == 2
+
+
+def test_customer_debits_the_bill_of_the_operator_used():
+    registry, alice, bob, kid = network()
+    alice.talk(10, bob, 1)
+    alice.message(5, bob, 0)
+    alice.connection(100, 0)
+    assert alice.get_bill(1).current_debt == pytest.approx(6.0)
+    assert alice.get_bill(0).current_debt == pytest.approx(0.9 + 10.0)
+    alice.talk(10, bob, 7)                                   #невідомий оператор: нічого не списано
+    assert sum(bill.current_debt for bill in alice.bills.values()) == pytest.approx(16.9)
+
+
+def test_customer_over_the_limit_is_not_charged():
+    registry, alice, bob, kid = network()
+    kid.connection(100, 1)                                   #20 при ліміті 1: не списано
+    assert kid.get_bill(1).current_debt == 0.0
+    kid.get_bill(1).current_debt = 1.0
+    kid.message(1, alice, 1)                                 #ліміт вичерпано: рахунок заблоковано
+    assert kid.get_bill(1).current_debt == 1.0
+
+
+def test_pipeline_rates_like_the_customer_methods():
+    registry, alice, bob, kid = network()
+    expected = [registry[1].rate_talk(10, alice.age), registry[0].rate_message(4, alice.uses_operator(0)),
+                registry[0].rate_network(50)]
+    pipeline = BillingPipeline([alice, bob, kid], sink=ListSink())
+    results = []
+    pipeline.process([UsageRecord(TALK, 0, 1, 10, 1), UsageRecord(MESSAGE, 1, 0, 4, 0),
+                      UsageRecord(CONNECTION, 0, 0, 50)], PipelineStats(), results)
+    assert results == [(None, cost) for cost in expected]
+
+
+def test_pipeline_reports_unknown_operator_and_limits():
+    registry, alice, bob, kid = network()
+    sink = ListSink()
+    pipeline = BillingPipeline([alice, bob, kid], sink=sink)
+    stats = PipelineStats()
+    pipeline.process([UsageRecord(TALK, 1, 1, 10, 0),       #у Bob немає рахунку в операторі 1
+                      UsageRecord(TALK, 0, 5, 10, 1),        #оператора 5 немає в реєстрі
+                      UsageRecord(TALK, 9, 0, 10, 1),
+                      UsageRecord(CONNECTION, 2, 1, 100),    #20 при ліміті 1
+                      UsageRecord(CONNECTION, 0, 0, 10)], stats)
+    assert [event.kind for event in sink.events] == ['unknown_operator', 'unknown_operator', 'unknown_customer',
+                                                     'limit_exceeded']
+    assert (stats.records, stats.accepted, stats.rejected) == (5, 1, 4)
+    assert alice.get_bill(0).current_debt == pytest.approx(1.0)
+
+
+def test_pipeline_takes_new_tariffs_from_the_next_chunk():
+    registry, alice, bob, kid = network()
+    pipeline = BillingPipeline([alice, bob])
+    results = []
+    records = [UsageRecord(CONNECTION, 0, 0, 10) for _ in range(3)]
+    pipeline.process(records, PipelineStats(), results)
+    registry[0].set_network_charge(1.0)
+    pipeline.process(records[:1], PipelineStats(), results)
+    assert [cost for _, cost in results] == [pytest.approx(1.0)] * 3 + [pytest.approx(10.0)]
+
+
+def test_pipeline_run_reads_jsonl_and_writes_events(tmp_path):
+    registry, alice, bob, kid = network()
+    path = tmp_path / "usage.jsonl"
+    rows = [{"kind": "talk", "customer_id": 0, "operator_id": 0, "amount": 5, "other_id": 1},
+            {"kind": "connection", "customer_id": 2, "operator_id": 1, "amount": 100}]
+    path.write_text("\n".join(json.dumps(row) for row in rows) + "\n")
+    stream = io.StringIO()
+    stats = BillingPipeline([alice, bob, kid], sink=JsonlSink(stream)).run(read_jsonl(str(path), chunk_size=1))
+    assert (stats.records, stats.accepted, stats.rejected) == (2, 1, 1)
+    assert [json.loads(line)["event"] for line in stream.getvalue().splitlines()] == ['limit_exceeded']
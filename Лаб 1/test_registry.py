@@ -0,0 +1,62 @@
+import gc
+import weakref
+
+import pytest
+
+from bills import Bill
+from customers import Customer
+from operators import Operator
+from registry import OperatorRegistry
+
+
+def test_operator_keeps_only_the_current_tariff():
+    operator = Operator(0, 0.4, 0.2, 0.2, 10)
+    registry = OperatorRegistry([operator])
+    snapshot = registry.snapshot()
+    for charge in range(1, 1000):
+        operator.set_talking_charge(charge / 10)
+    #знімок тримає свою версію, а оператор - лише поточну
+    assert snapshot[0].version == 0 and snapshot[0].talking_charge == 0.4
+    assert registry.tariff(0).version == 999
+    assert registry.tariff(0, 999) is operator.tariff
+    with pytest.raises(KeyError):
+        registry.tariff(0, 0)
+    assert not any(isinstance(value, list) for value in vars(operator).values())
+
+
+def test_rates_of_a_snapshot_version_are_not_cached():
+    operator = Operator(0, 0.4, 0.2, 0.2, 10)
+    old = OperatorRegistry([operator]).snapshot()[0]
+    operator.set_talking_charge(1.0)
+    assert operator.rate_talk(10, 30, old) == pytest.approx(4.0)
+    assert operator.rate_talk(10, 30) == pytest.approx(10.0)
+
+
+def test_set_operator_does_not_touch_the_shared_registry():
+    shared = OperatorRegistry([Operator(0, 0.4, 0.2, 0.2, 10), Operator(1, 0.6, 0.2, 0.2, 5)])
+    alice = Customer(0, 'Alice', '', 30, shared, {0: Bill(100.0), 1: Bill(100.0)})
+    bob = Customer(1, 'Bob', '', 30, shared, {0: Bill(100.0)})
+    private = Operator(0, 2.0, 0.2, 0.2, 0)
+    alice.set_operator(0, private)
+
+    assert alice.get_operator(0) is private
+    assert bob.get_operator(0) is shared[0] and shared[0] is not private
+    assert alice.operators.snapshot()[0] is private.tariff
+    #пізніші зміни спільного реєстру видно і через накладку клієнта
+    shared.register(Operator(2, 0.1, 0.1, 0.1, 0))
+    assert 2 in alice.operators and len(alice.operators) == 3
+    assert [operator.id for operator in alice.operators] == [0, 1, 2]
+    with pytest.raises(ValueError):
+        alice.set_operator(1, private)
+
+
+def test_registry_does_not_retain_replaced_operators():
+    shared = OperatorRegistry([Operator(0, 0.4, 0.2, 0.2, 10)])
+    customer = Customer(0, '', '', 30, shared, {0: Bill(100.0)})
+    first = Operator(0, 1.0, 0.2, 0.2, 0)
+    customer.set_operator(0, first)
+    first_ref = weakref.ref(first)
+    del first
+    customer.set_operator(0, Operator(0, 2.0, 0.2, 0.2, 0))
+    gc.collect()
+    assert first_ref() is None
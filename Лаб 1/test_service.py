@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from pipeline import UsageRecord
+from service import RatingService, demo_customers
+
+
+def test_coalesced_requests_are_rated_in_one_batch():
+    async def scenario():
+        service = RatingService(demo_customers(4), max_delay=0.05)
+        server = await service.serve(port=0)
+        async with server:
+            first = [UsageRecord('connection', 0, 0, 10.0), UsageRecord('talk', 1, 1, 2.0)]
+            second = [UsageRecord('message', 2, 0, 3, 3)]
+            return service, await asyncio.gather(service.rate(first), service.rate(second))
+
+    service, (first, second) = asyncio.run(scenario())
+    assert [event for event, _ in first + second] == [None, None, None]
+    assert service.batches == 1
+    assert service.report()["max_batch"] == 3
+    assert service.stats.accepted == 3
+
+
+def test_failing_request_does_not_affect_others():
+    async def scenario():
+        customers = demo_customers(2)
+        service = RatingService(customers, max_delay=0.05)
+        server = await service.serve(port=0)
+        async with server:
+            good = service.rate([UsageRecord('connection', 0, 0, 10.0)])
+            bad = service.rate([UsageRecord('connection', 1, 0, 10.0), UsageRecord('fax', 1, 0, 1.0)])
+            results = await asyncio.gather(good, bad, return_exceptions=True)
+        return customers, results
+
+    customers, (good, bad) = asyncio.run(scenario())
+    assert good[0][0] is None and good[0][1] > 0
+    assert isinstance(bad, ValueError)
+    assert customers[0].get_bill(0).current_debt == good[0][1]
+    assert customers[1].get_bill(0).current_debt == 0.0          #жоден запис невдалого запиту не списано
+
+
+def test_rate_before_serve_raises():
+    service = RatingService(demo_customers(1))
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.rate([UsageRecord('connection', 0, 0, 1.0)]))
@@ -0,0 +1,260 @@
+"""Reproducible benchmarks for the ship and port hot paths.
+
+Usage:
+    python bench.py --scales 1e2,1e4 --output results.json [--compare baseline.json --threshold 0.1]
+    python bench.py --memory [--scales 1e5]      bytes per container
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from containers import container_factory
+from persistence import read_port, write_port
+from ports import Port
+from samples import make_containers, make_port
+from ships import Ship
+from snapshot import PortSnapshot, write_snapshot
+
+BLOCK = 1000
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    """Return the given fraction percentile of the samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure_ops(name: str, scale: int, setup: Callable[[int], Callable[[int], None]]) -> Dict:
+    """Measure a per-operation benchmark.
+
+    Args:
+        name (str): Benchmark name.
+        scale (int): Number of operations.
+        setup (Callable): Prepares the data and returns run(i) performing the i-th operation.
+
+    Returns:
+        Dict: Throughput, block latency percentiles and peak traced memory.
+    """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        run = setup(scale)
+        blocks: List[float] = []
+        start = time.perf_counter()
+        for block_start in range(0, scale, BLOCK):
+            block_end = min(block_start + BLOCK, scale)
+            block_time = time.perf_counter()
+            for i in range(block_start, block_end):
+                run(i)
+            blocks.append((time.perf_counter() - block_time) / (block_end - block_start))
+        elapsed = time.perf_counter() - start
+
+        run = setup(scale)
+        tracemalloc.start()
+        for i in range(scale):
+            run(i)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"name": name, "scale": scale, "ops_per_sec": scale / elapsed,
+            "p50_us": _percentile(blocks, 0.50) * 1e6, "p99_us": _percentile(blocks, 0.99) * 1e6,
+            "peak_bytes": peak}
+
+
+def measure_call(name: str, scale: int, setup: Callable[[int, str], Callable[[], None]], repeat: int = 3) -> Dict:
+    """Measure a whole-dataset operation such as saving a port.
+
+    The setup gets a scratch directory for its files, removed after the measurement.
+    Throughput is reported in containers per second.
+    """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+            tempfile.TemporaryDirectory() as directory:
+        run = setup(scale, directory)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    best = min(timings)
+    return {"name": name, "scale": scale, "ops_per_sec": scale / best,
+            "p50_us": _percentile(timings, 0.50) * 1e6, "p99_us": max(timings) * 1e6, "peak_bytes": peak}
+
+
+def _load_container(scale: int) -> Callable[[int], None]:
+    ship = Ship(1, 1e12)
+    containers = make_containers(scale)
+    return lambda i: ship.load_container(containers[i])
+
+
+def _unload_container(scale: int) -> Callable[[int], None]:
+    ship = Ship(1, 1e12)
+    containers = make_containers(scale)
+    for container in containers:
+        ship.load_container(container)
+    return lambda i: ship.unload_container(containers[i])
+
+
+def _save_to_json(scale: int, directory: str) -> Callable[[], None]:
+    port = make_port(scale)
+    filename = os.path.join(directory, 'port.json')
+    return lambda: port.save_to_json(filename)
+
+
+def _load_from_json(scale: int, directory: str) -> Callable[[], None]:
+    filename = os.path.join(directory, 'port.json')
+    make_port(scale).save_to_json(filename)
+    return lambda: Port.load_from_json(filename)
+
+
+def _write_port(scale: int, directory: str) -> Callable[[], None]:
+    port = make_port(scale)
+    filename = os.path.join(directory, 'port.jsonl')
+    return lambda: write_port(port, filename)
+
+
+def _read_port(scale: int, directory: str) -> Callable[[], None]:
+    filename = os.path.join(directory, 'port.jsonl')
+    write_port(make_port(scale), filename)
+    return lambda: read_port(filename)
+
+
+def _write_snapshot(scale: int, directory: str) -> Callable[[], None]:
+    port = make_port(scale)
+    filename = os.path.join(directory, 'port.snap')
+    return lambda: write_snapshot(port, filename)
+
+
+def _snapshot_totals(scale: int, directory: str) -> Callable[[], None]:
+    filename = os.path.join(directory, 'port.snap')
+    write_snapshot(make_port(scale), filename)
+
+    def run() -> None:
+        with PortSnapshot(filename) as snapshot:
+            snapshot.ship_totals()
+    return run
+
+
+BENCHMARKS: Dict[str, Tuple[Callable, Callable]] = {
+    "ship.load_container": (measure_ops, _load_container),
+    "ship.unload_container": (measure_ops, _unload_container),
+    "port.save_to_json": (measure_call, _save_to_json),
+    "port.load_from_json": (measure_call, _load_from_json),
+    "persistence.write_port": (measure_call, _write_port),
+    "persistence.read_port": (measure_call, _read_port),
+    "snapshot.write": (measure_call, _write_snapshot),
+    "snapshot.ship_totals": (measure_call, _snapshot_totals),
+}
+
+
+class _DictContainer:
+    """Container layout before __slots__: id and weight kept in a per-instance __dict__."""
+
+    def __init__(self, id: int, weight: float) -> None:
+        self.id = id
+        self.weight = weight
+
+
+def _traced_bytes(build: Callable[[], object]) -> int:
+    """Return the memory still allocated by build() while its result is alive."""
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def memory_report(count: int, ships: int = 5) -> Dict[str, float]:
+    """Measure bytes per container before and after __slots__ and interning.
+
+    The interning case loads a port where several docked ships carry the same
+    cargo.
+
+    Args:
+        count (int): Number of containers.
+        ships (int): How many docked ships carry the same containers.
+
+    Returns:
+        Dict[str, float]: Bytes per container for each layout and load mode.
+    """
+    rng = random.Random(0)
+    weights = [rng.randint(500, 6000) for _ in range(count)]
+    port = Port(0, (50.4501, 30.5234))
+    cargo = make_containers(count)
+    for number in range(ships):
+        ship = Ship(number, 1e12)
+        for container in cargo:
+            ship.restore_container(container)
+        port.dock(ship)
+    data = port.to_dict()
+    loaded = count * ships
+    return {
+        "dict": _traced_bytes(lambda: [_DictContainer(i, weights[i]) for i in range(count)]) / count,
+        "slots": _traced_bytes(lambda: [container_factory(i, weights[i]) for i in range(count)]) / count,
+        "from_dict": _traced_bytes(lambda: Port.from_dict(data)) / loaded,
+        "from_dict_interned": _traced_bytes(lambda: Port.from_dict(data, intern=True)) / loaded,
+    }
+
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float) -> List[str]:
+    """List benchmarks whose throughput dropped by more than threshold against a baseline run."""
+    previous = {(entry["name"], entry["scale"]): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        old = previous.get((entry["name"], entry["scale"]))
+        if old and entry["ops_per_sec"] < old["ops_per_sec"] * (1 - threshold):
+            regressions.append(f'{entry["name"]} @ {entry["scale"]}: '
+                               f'{old["ops_per_sec"]:.0f} -> {entry["ops_per_sec"]:.0f} ops/s')
+    return regressions
+
+
+def main() -> int:
+    """Run the selected benchmarks, write the results and optionally check for regressions."""
+    parser = argparse.ArgumentParser(description="Port and ship benchmarks")
+    parser.add_argument('--scales', default='1e2,1e3,1e4', help='number of containers, up to 1e6')
+    parser.add_argument('--only', default='', help='substring of the benchmark name')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='previous results file')
+    parser.add_argument('--threshold', type=float, default=0.10)
+    parser.add_argument('--memory', action='store_true', help='report bytes per container and exit')
+    args = parser.parse_args()
+
+    scales = [int(float(scale)) for scale in args.scales.split(',')]
+    if args.memory:
+        for scale in scales:
+            report = memory_report(scale)
+            print(f'{scale:>9} containers: ' + '  '.join(f'{name} {size:.1f} B' for name, size in report.items()))
+        return 0
+    results = []
+    for name, (measure, setup) in BENCHMARKS.items():
+        if args.only not in name:
+            continue
+        for scale in scales:
+            entry = measure(name, scale, setup)
+            results.append(entry)
+            print(f'{name:24} {scale:>9} {entry["ops_per_sec"]:>12.0f} ops/s '
+                  f'p50 {entry["p50_us"]:.2f} us  p99 {entry["p99_us"]:.2f} us  peak {entry["peak_bytes"]} B')
+
+    with open(args.output, 'w') as f:
+        json.dump({"python": sys.version, "platform": platform.platform(), "results": results}, f)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""Concurrent saving and loading of many ports with a process or thread pool.
+
+Every file goes through Port.save_to_json / Port.load_from_json, so each save
+is atomic (temporary file, fsync, rename). Per-file timings and sizes are
+collected, and a failing file is reported without stopping the others.
+
+JSON encoding and decoding are CPU-bound and hold the GIL, so by default the
+files are handled by worker processes: ports are pickled to the workers and
+loaded ports are pickled back. Threads (processes=False) only pay off when the
+storage, not the encoding, is the bottleneck. The benchmark prints both pools'
+speedup over a serial loop.
+
+Usage:
+    python bulk.py [ports] [containers] [workers]      compare with a serial loop
+"""
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from ports import Port
+from samples import make_port
+
+
+class FileResult:
+    """Outcome of saving or loading one file.
+
+    Attributes:
+        filename (str): The file.
+        port_id (Optional[int]): The id of the saved or loaded port, None if loading failed.
+        size (int): File size in bytes (0 on failure).
+        seconds (float): Time spent on this file.
+        error (Optional[str]): The error message if the operation failed.
+    """
+
+    __slots__ = ('filename', 'port_id', 'size', 'seconds', 'error')
+
+    def __init__(self, filename: str, port_id: Optional[int], size: int, seconds: float,
+                 error: Optional[str] = None) -> None:
+        """Initialize a FileResult."""
+        self.filename = filename
+        self.port_id = port_id
+        self.size = size
+        self.seconds = seconds
+        self.error = error
+
+
+class BulkReport:
+    """Per-file results and aggregate throughput of a bulk operation.
+
+    Attributes:
+        results (List[FileResult]): One result per file, in input order.
+        elapsed (float): Wall-clock seconds for the whole operation.
+    """
+
+    def __init__(self, results: List[FileResult], elapsed: float) -> None:
+        """Initialize a BulkReport."""
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(result.size for result in self.results)
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.total_bytes / 1e6 / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def failed(self) -> List[FileResult]:
+        return [result for result in self.results if result.error is not None]
+
+    def summary(self) -> str:
+        """Return a one-line summary of the operation."""
+        slowest = max(self.results, key=lambda result: result.seconds, default=None)
+        text = (f"{len(self.results)} files, {self.total_bytes / 1e6:.1f} MB in {self.elapsed:.2f} s "
+                f"({self.mb_per_sec:.1f} MB/s), {len(self.failed)} failed")
+        if slowest is not None:
+            text += f", slowest {os.path.basename(slowest.filename)} {slowest.seconds * 1e3:.1f} ms"
+        return text
+
+
+def _timed(filename: str, action: Callable[[], Optional[Port]]) -> Tuple[Optional[Port], FileResult]:
+    start = time.perf_counter()
+    try:
+        port = action()
+        size = os.path.getsize(filename)
+    except Exception as error:
+        return None, FileResult(filename, None, 0, time.perf_counter() - start, f"{type(error).__name__}: {error}")
+    return port, FileResult(filename, port.id, size, time.perf_counter() - start)
+
+
+def _save(port: Port, filename: str) -> FileResult:
+    def action() -> Port:
+        port.save_to_json(filename)
+        return port
+    return _timed(filename, action)[1]
+
+
+def _load(filename: str) -> Tuple[Optional[Port], FileResult]:
+    return _timed(filename, lambda: Port.load_from_json(filename))
+
+
+def _pool(workers: Optional[int], processes: bool) -> Executor:
+    return ProcessPoolExecutor(max_workers=workers) if processes else ThreadPoolExecutor(max_workers=workers or 8)
+
+
+def save_ports(ports: Iterable[Port], directory: str, workers: Optional[int] = None,
+               name: str = "port_{id}.json", processes: bool = True) -> BulkReport:
+    """Save many ports concurrently, each to its own file, atomically.
+
+    Args:
+        ports (Iterable[Port]): The ports to save.
+        directory (str): Destination directory.
+        workers (Optional[int]): Number of workers, the CPU count for processes and 8 for threads by default.
+        name (str): File name pattern, formatted with the port id.
+        processes (bool): Encode in worker processes; with False, in threads of this process.
+
+    Returns:
+        BulkReport: Per-file timing and sizes, in input order.
+    """
+    ports = list(ports)
+    filenames = [os.path.join(directory, name.format(id=port.id)) for port in ports]
+    start = time.perf_counter()
+    with _pool(workers, processes) as pool:
+        results = list(pool.map(_save, ports, filenames))
+    return BulkReport(results, time.perf_counter() - start)
+
+
+def load_ports(filenames: Iterable[str], workers: Optional[int] = None,
+               processes: bool = True) -> Tuple[List[Optional[Port]], BulkReport]:
+    """Load many ports concurrently.
+
+    Args:
+        filenames (Iterable[str]): Files written by Port.save_to_json.
+        workers (Optional[int]): Number of workers, the CPU count for processes and 8 for threads by default.
+        processes (bool): Decode in worker processes; with False, in threads of this process.
+
+    Returns:
+        Tuple[List[Optional[Port]], BulkReport]: The ports in input order (None where loading
+        failed) and the per-file report.
+    """
+    start = time.perf_counter()
+    with _pool(workers, processes) as pool:
+        loaded = list(pool.map(_load, filenames))
+    report = BulkReport([result for _, result in loaded], time.perf_counter() - start)
+    return [port for port, _ in loaded], report
+
+
+def benchmark(ports: int = 200, containers: int = 2000, workers: Optional[int] = None) -> None:
+    """Compare a serial save/load loop with the process and thread pools and print the speedups."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        network = [make_port(containers, ships=5, seed=seed) for seed in range(ports)]
+    directory = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        for port in network:
+            port.save_to_json(os.path.join(directory, f"serial_{port.id}.json"))
+        serial_save = time.perf_counter() - start
+        start = time.perf_counter()
+        for port in network:
+            Port.load_from_json(os.path.join(directory, f"serial_{port.id}.json"))
+        serial_load = time.perf_counter() - start
+
+        print(f"serial save {serial_save:.2f} s, load {serial_load:.2f} s ({os.cpu_count()} CPU)")
+        for processes in (True, False):
+            kind = "processes" if processes else "threads"
+            saved = save_ports(network, directory, workers, processes=processes)
+            loaded, report = load_ports([result.filename for result in saved.results], workers, processes)
+            print(f"{kind} save: {saved.summary()}, speedup x{serial_save / saved.elapsed:.2f}")
+            print(f"{kind} load: {report.summary()}, speedup x{serial_load / report.elapsed:.2f}")
+            print(f"round trip identical: {all(a.to_dict() == b.to_dict() for a, b in zip(network, loaded))}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    benchmark(*(int(float(value)) for value in sys.argv[1:4]))
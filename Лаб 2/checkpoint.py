@@ -0,0 +1,273 @@
+"""Incremental checkpoints of a port: a full base file plus an append-only delta log.
+
+The log is JSON Lines. Its first line names the base generation; the base
+itself is a persistence.write_port file next to the log:
+
+    {"t": "base", "generation": g}                        base is <log>.base<g>
+    {"t": "dock", "ship": {...}, "at": ...}               ship docked, its state at that moment
+    {"t": "undock", "id": ..., "visit": {...}}            ship left, its visit record
+    {"t": "delta", "owner": null | ship id, "del": [...], "put": [...]}
+    {"t": "ship", "id": ..., "max_weight": ..., "weight": [w, e], "consumption": [c, e]}
+    {"t": "commit", "n": ...}                             closes one checkpoint
+
+A checkpoint only writes the containers and ships that changed since the
+previous one, so its cost follows the amount of change. Ship attributes
+(max_weight and the compensated running totals) are compared with the values
+last written, and a "ship" record sets them exactly. Containers are immutable,
+so a store's additions and removals are all the container changes there are. Records after the last
+commit (a torn write) are ignored on load. Compaction writes the next base
+generation, then atomically swaps in a fresh log pointing at it, so a crash at
+any point leaves a consistent base/log pair.
+
+Usage:
+    python checkpoint.py [containers] [changes]      compare with save_to_json
+"""
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+from containers import Container, container_factory
+from persistence import read_port, write_port
+from ports import Port
+from samples import make_port
+from ships import Ship
+from visits import Visit
+
+_encoder = json.JSONEncoder(separators=(',', ':'))
+
+
+def base_filename(path: str, generation: int) -> str:
+    """Return the base file of a generation for a log path."""
+    return f"{path}.base{generation}"
+
+
+def _committed(path: str) -> Iterator[Dict]:
+    """Yield the header and then the records of complete, committed checkpoints."""
+    with open(path, 'r') as f:
+        pending: List[Dict] = []
+        for number, line in enumerate(f):
+            if not line.endswith("\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if number == 0:
+                yield record
+            elif record["t"] == "commit":
+                yield from pending
+                pending = []
+            else:
+                pending.append(record)
+
+
+def load_checkpoint(path: str) -> Port:
+    """Load a port from its base file and the committed deltas of the log.
+
+    Args:
+        path (str): The delta log written by Checkpointer.
+
+    Returns:
+        Port: The port as of the last committed checkpoint.
+
+    Raises:
+        ValueError: If the log does not start with a base header or has an unknown record.
+    """
+    records = _committed(path)
+    header = next(records, None)
+    if not header or header.get("t") != "base":
+        raise ValueError(f"Not a checkpoint log: {path}")
+    port = read_port(base_filename(path, header["generation"]))
+    ships: Dict[int, Ship] = {ship.id: ship for ship in port.ships}
+    for record in records:
+        kind = record["t"]
+        if kind == "dock":
+            ship = Ship.from_dict(record["ship"])
+            ships[ship.id] = ship
+            port.dock(ship, record["at"])
+        elif kind == "undock":
+            # Візит записано повністю: вантаж на момент відплиття в журнал не потрапляє
+            ship = ships.pop(record["id"])
+            port.ships.remove(ship)
+            port.arrivals.pop(ship.id, None)
+            port.history.append(*Visit.from_dict(record["visit"]))
+        elif kind == "ship":
+            ship = ships[record["id"]]
+            ship.max_weight = record["max_weight"]
+            ship.current_weight, ship._weight_error = record["weight"]
+            ship.current_consumption, ship._consumption_error = record["consumption"]
+        elif kind == "delta":
+            put = [Container.from_dict(data) for data in record["put"]]
+            if record["owner"] is None:
+                port.containers.pop_many(record["del"] + [container.id for container in put])
+                port.containers.extend(put)
+            else:
+                ship = ships[record["owner"]]
+                ship.unload_containers(record["del"] + [container.id for container in put])
+                for container in put:
+                    ship.restore_container(container)
+        else:
+            raise ValueError(f"Unknown record type: {kind}")
+    return port
+
+
+class Checkpointer:
+    """Writes incremental checkpoints of one port.
+
+    Attributes:
+        port (Port): The checkpointed port; change tracking is switched on for it.
+        path (str): The delta log file.
+        generation (int): The current base generation.
+        compact_every (int): Log records after which checkpoint() compacts automatically.
+        records (int): Records in the log since the last compaction.
+    """
+
+    def __init__(self, port: Port, path: str, compact_every: int = 10000) -> None:
+        """Start checkpointing a port; writes a first base generation.
+
+        If the log already exists, numbering continues after its generation, so
+        call this with the port returned by load_checkpoint to resume.
+
+        Args:
+            port (Port): The port to checkpoint.
+            path (str): The delta log file.
+            compact_every (int): Log records after which checkpoint() compacts automatically.
+        """
+        self.port = port
+        self.path = path
+        self.compact_every = compact_every
+        self.generation = -1
+        self.records = 0
+        self._log = None
+        self._ships: Dict[int, Tuple[float, ...]] = {}  # Атрибути кораблів, записані останніми
+        if os.path.exists(path):
+            header = next(_committed(path), None)
+            if header and header.get("t") == "base":
+                self.generation = header["generation"]
+        port.track_changes()
+        self.compact()
+
+    def checkpoint(self) -> int:
+        """Append the changes since the previous checkpoint to the log and fsync it.
+
+        Returns:
+            int: The number of records written (0 if nothing changed).
+        """
+        changes, moves = self.port.take_changes()
+        records: List[Dict[str, Any]] = []
+        for kind, ship, detail in moves:
+            if kind == "dock":
+                at, state = detail
+                records.append({"t": "dock", "ship": state, "at": at})
+                self._ships.pop(ship.id, None)
+            else:
+                records.append({"t": "undock", "id": ship.id, "visit": detail.to_dict()})
+                self._ships.pop(ship.id, None)
+        for owner, ids in changes.items():
+            store = self.port.containers if owner is None else self.port.tracked_ship(owner).containers
+            records.append({"t": "delta", "owner": owner, "del": [id for id in ids if id not in store],
+                            "put": [store.get(id).to_dict() for id in ids if id in store]})
+        records.extend(self._ship_records())
+        if not records:
+            return 0
+        records.append({"t": "commit", "n": len(records)})
+        self._log.writelines(_encoder.encode(record) + "\n" for record in records)
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self.records += len(records)
+        if self.records >= self.compact_every:
+            self.compact()
+        return len(records)
+
+    def _ship_records(self) -> List[Dict[str, Any]]:
+        """Return "ship" records for the ships whose attributes changed since they were last written."""
+        records = []
+        for ship in self.port.ships:
+            state = (ship.max_weight, ship.current_weight, ship._weight_error,
+                     ship.current_consumption, ship._consumption_error)
+            if self._ships.get(ship.id) != state:
+                self._ships[ship.id] = state
+                records.append({"t": "ship", "id": ship.id, "max_weight": state[0],
+                                "weight": list(state[1:3]), "consumption": list(state[3:5])})
+        return records
+
+    def compact(self) -> None:
+        """Fold everything into a new base generation and start an empty log."""
+        self.port.take_changes()
+        generation = self.generation + 1
+        directory = os.path.dirname(os.path.abspath(self.path))
+        base = base_filename(self.path, generation)
+        write_port(self.port, base + ".tmp")
+        _fsync_file(base + ".tmp")
+        os.replace(base + ".tmp", base)
+
+        # Перевантажений з бази корабель рахує суми заново; записи "ship" повертають точні значення
+        self._ships = {}
+        ships = self._ship_records()
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(descriptor, 'w') as f:
+            f.write(_encoder.encode({"t": "base", "generation": generation}) + "\n")
+            if ships:
+                f.writelines(_encoder.encode(record) + "\n" for record in ships)
+                f.write(_encoder.encode({"t": "commit", "n": len(ships)}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if self._log is not None:
+            self._log.close()
+        os.replace(temporary, self.path)
+        if os.path.exists(base_filename(self.path, self.generation)):
+            os.remove(base_filename(self.path, self.generation))
+        self.generation = generation
+        self.records = 0
+        self._log = open(self.path, 'a')
+
+    def close(self) -> None:
+        """Close the log file."""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+def _fsync_file(filename: str) -> None:
+    with open(filename, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def benchmark(containers: int = 100000, changes: int = 100, seed: int = 0) -> None:
+    """Compare a full save_to_json with an incremental checkpoint after a few changes."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        port = make_port(containers, seed=seed)
+    directory = tempfile.mkdtemp()
+    try:
+        checkpointer = Checkpointer(port, os.path.join(directory, 'port.log'))
+        ship = port.ships[0]
+
+        start = time.perf_counter()
+        port.save_to_json(os.path.join(directory, 'port.json'))
+        full = time.perf_counter() - start
+
+        for index in range(changes):
+            container = container_factory(containers + index, 500 + index)
+            if index % 2:
+                ship.restore_container(container)
+            else:
+                port.containers.append(container)
+        start = time.perf_counter()
+        written = checkpointer.checkpoint()
+        incremental = time.perf_counter() - start
+        checkpointer.close()
+
+        same = load_checkpoint(checkpointer.path).to_dict() == port.to_dict()
+        print(f"save_to_json: {full * 1e3:.1f} ms   checkpoint of {changes} changes ({written} records): "
+              f"{incremental * 1e3:.2f} ms   x{full / incremental:.0f}   reload identical: {same}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    benchmark(*(int(float(value)) for value in sys.argv[1:3]))
@@ -0,0 +1,176 @@
+"""Columnar container store with vectorized fuel consumption.
+
+Containers of many ships are kept in parallel NumPy arrays of weight and type
+code plus the index of the ship (group) they belong to. A store built from a
+port also holds the port's own containers as a PORT_GROUP group, in the same
+group order as a snapshot of that port. Consumption for one
+ship, many ships or a whole port is computed in a single pass. The results
+match Ship.total_consumption() for the same containers to rounding, not bit for
+bit: the ships keep compensated running totals while NumPy sums the arrays, so
+compare them with math.isclose (a relative tolerance of 1e-12 is ample).
+
+Usage:
+    python columnar.py [containers] [ships]      compare with the per-object methods
+"""
+import contextlib
+import math
+import os
+import sys
+import time
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from ports import Port
+from ships import Ship
+from snapshot import PORT_GROUP, SHIP_GROUP, TYPE_CLASSES, TYPE_CODES, PortSnapshot
+
+UNIT_CONSUMPTION = np.array([cls.UNIT_CONSUMPTION for cls in TYPE_CLASSES], dtype=np.float64)
+
+
+class ColumnarContainers:
+    """Parallel arrays describing the containers of several ships.
+
+    Attributes:
+        ship_ids (np.ndarray): Id of every group in order: the port id for a port group, else the ship id.
+        weights (np.ndarray): Weight of every container.
+        type_codes (np.ndarray): Type code of every container, see snapshot.TYPE_NAMES.
+        groups (np.ndarray): Index into ship_ids of the ship holding each container.
+        kinds (np.ndarray): PORT_GROUP or SHIP_GROUP for every group.
+    """
+
+    def __init__(self, ship_ids: Sequence[int], weights: np.ndarray, type_codes: np.ndarray,
+                 groups: np.ndarray, kinds: Optional[np.ndarray] = None) -> None:
+        """Initialize a ColumnarContainers instance from prepared arrays; without kinds every group is a ship."""
+        self.ship_ids: np.ndarray = np.asarray(ship_ids, dtype=np.int64)
+        self.weights: np.ndarray = weights
+        self.type_codes: np.ndarray = type_codes
+        self.groups: np.ndarray = groups
+        self.kinds: np.ndarray = np.full(len(self.ship_ids), SHIP_GROUP, dtype=np.uint8) if kinds is None else kinds
+
+    @staticmethod
+    def from_ships(ships: Iterable[Ship]) -> 'ColumnarContainers':
+        """Build the store from ship objects.
+
+        Args:
+            ships (Iterable[Ship]): The ships to include.
+
+        Returns:
+            ColumnarContainers: The columnar copy of the ships' containers.
+        """
+        return ColumnarContainers._from_groups((ship.id, SHIP_GROUP, ship.containers) for ship in ships)
+
+    @staticmethod
+    def from_port(port: Port) -> 'ColumnarContainers':
+        """Build the store from a port: its own containers as group 0, then its docked ships.
+
+        The groups match those of snapshot.write_snapshot for the same port, so the
+        store equals ColumnarContainers.from_snapshot over that snapshot.
+        """
+        groups = [(port.id, PORT_GROUP, port.containers)]
+        groups.extend((ship.id, SHIP_GROUP, ship.containers) for ship in port.ships)
+        return ColumnarContainers._from_groups(groups)
+
+    @staticmethod
+    def _from_groups(groups: Iterable) -> 'ColumnarContainers':
+        """Build the store from (group id, kind, containers) triples."""
+        group_ids: List[int] = []
+        kinds: List[int] = []
+        weights: List[float] = []
+        codes: List[int] = []
+        indexes: List[int] = []
+        for index, (group_id, kind, containers) in enumerate(groups):
+            group_ids.append(group_id)
+            kinds.append(kind)
+            for container in containers:
+                weights.append(container.weight)
+                codes.append(TYPE_CODES[container.__class__.__name__])
+                indexes.append(index)
+        return ColumnarContainers(group_ids, np.array(weights, dtype=np.float64), np.array(codes, dtype=np.uint8),
+                                  np.array(indexes, dtype=np.int64), np.array(kinds, dtype=np.uint8))
+
+    @staticmethod
+    def from_snapshot(snapshot: PortSnapshot, kind: Optional[int] = None) -> 'ColumnarContainers':
+        """Build the store over a memory-mapped snapshot without copying weights or type codes.
+
+        Without a kind filter the arrays share memory with the snapshot, so the
+        store must be dropped before the snapshot is closed.
+
+        Args:
+            snapshot (PortSnapshot): An open snapshot.
+            kind (Optional[int]): Only keep groups of this kind (e.g. snapshot.SHIP_GROUP).
+
+        Returns:
+            ColumnarContainers: Groups follow the snapshot group order.
+        """
+        offsets = np.frombuffer(snapshot.offsets, dtype=np.int64)
+        weights = np.frombuffer(snapshot.weights, dtype=np.float64)
+        codes = np.frombuffer(snapshot.type_codes, dtype=np.uint8)
+        groups = np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+        ship_ids = np.frombuffer(snapshot.group_ids, dtype=np.int64)
+        kinds = np.frombuffer(snapshot.kinds, dtype=np.uint8)
+        store = ColumnarContainers(ship_ids, weights, codes, groups, kinds)
+        if kind is not None:
+            selected = np.flatnonzero(kinds == kind)
+            remap = np.full(len(kinds), -1, dtype=np.int64)
+            remap[selected] = np.arange(len(selected))
+            mask = remap[groups] >= 0
+            store = ColumnarContainers(ship_ids[selected], weights[mask], codes[mask], remap[groups][mask],
+                                       kinds[selected])
+        return store
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def container_consumption(self) -> np.ndarray:
+        """Return the fuel consumption of every container."""
+        return UNIT_CONSUMPTION[self.type_codes] * self.weights
+
+    def ship_consumption(self) -> np.ndarray:
+        """Return the total fuel consumption of every group, in ship_ids order."""
+        return np.bincount(self.groups, weights=self.container_consumption(), minlength=len(self.ship_ids))
+
+    def ship_weight(self) -> np.ndarray:
+        """Return the total container weight of every group, in ship_ids order."""
+        return np.bincount(self.groups, weights=self.weights, minlength=len(self.ship_ids))
+
+    def consumption_of(self, ship_id: int) -> float:
+        """Return the fuel consumption of one ship.
+
+        Raises:
+            KeyError: If the ship is not in the store.
+        """
+        matches = np.flatnonzero((self.ship_ids == ship_id) & (self.kinds == SHIP_GROUP))
+        if not len(matches):
+            raise KeyError(ship_id)
+        mask = self.groups == matches[0]
+        return float((UNIT_CONSUMPTION[self.type_codes[mask]] * self.weights[mask]).sum())
+
+    def total_consumption(self) -> float:
+        """Return the fuel consumption of all groups, the port's own containers included."""
+        return math.fsum(self.ship_consumption().tolist())
+
+
+def benchmark(containers: int = 1000000, ships: int = 1000, rel_tol: float = 1e-12) -> None:
+    """Time the columnar fleet consumption against the per-object methods and compare within rel_tol."""
+    from samples import make_port
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        port = make_port(containers, ships)
+    store = ColumnarContainers.from_ships(port.ships)
+
+    start = time.perf_counter()
+    per_container = [sum(container.consumption() for container in ship.containers) for ship in port.ships]
+    objects = time.perf_counter() - start
+    start = time.perf_counter()
+    columnar = store.ship_consumption().tolist()
+    vectorized = time.perf_counter() - start
+    expected = [ship.total_consumption() for ship in port.ships]
+    same = all(math.isclose(value, other, rel_tol=rel_tol) for value, other in zip(columnar, expected))
+    same = same and all(math.isclose(value, other, rel_tol=rel_tol) for value, other in zip(columnar, per_container))
+    print(f"{containers} containers on {ships} ships: consumption() per container {objects * 1e3:.1f} ms, "
+          f"columnar {vectorized * 1e3:.1f} ms, equal within {rel_tol:g}: {same}")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(float(value)) for value in sys.argv[1:3]))
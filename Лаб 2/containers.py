@@ -1,15 +1,92 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Any, Callable, ClassVar, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
+
+
+class ContainerType:
+    """Shared description of a container type (flyweight).
+
+    One instance exists per type and is referenced by the class, so per-type
+    data is stored once no matter how many containers exist.
+
+    Attributes:
+        name (str): The type name written by to_dict.
+        unit_consumption (float): Fuel consumed per unit of weight.
+        cls (Type[Container]): The class creating containers of this type.
+    """
+
+    __slots__ = ('name', 'unit_consumption', 'cls')
+
+    def __init__(self, name: str, unit_consumption: float, cls: Type['Container']) -> None:
+        """Initialize a ContainerType instance.
+
+        Args:
+            name (str): The type name written by to_dict.
+            unit_consumption (float): Fuel consumed per unit of weight.
+            cls (Type[Container]): The class creating containers of this type.
+        """
+        self.name = name
+        self.unit_consumption = unit_consumption
+        self.cls = cls
+
+    def create(self, id: int, weight: float) -> 'Container':
+        """Create a container of this type."""
+        return self.cls(id, weight)
+
+    def __repr__(self) -> str:
+        return f"ContainerType({self.name!r}, {self.unit_consumption})"
+
+
+CONTAINER_TYPES: Dict[str, ContainerType] = {}
+
+_set = object.__setattr__  # Container забороняє звичайне присвоєння атрибутів
+
+InternTable = Dict[Tuple[str, int, float], 'Container']
+
+
+def register_container_type(cls: Type['Container']) -> Type['Container']:
+    """Class decorator adding a container class to the type registry.
+
+    Args:
+        cls (Type[Container]): A container class defining UNIT_CONSUMPTION.
+
+    Returns:
+        Type[Container]: The same class, with its shared TYPE descriptor set.
+    """
+    cls.TYPE = ContainerType(cls.__name__, cls.UNIT_CONSUMPTION, cls)
+    CONTAINER_TYPES[cls.TYPE.name] = cls.TYPE
+    return cls
+
+
+def container_type(name: str) -> ContainerType:
+    """Return the registered descriptor of a container type.
+
+    Raises:
+        ValueError: If the container type is unknown.
+    """
+    try:
+        return CONTAINER_TYPES[name]
+    except KeyError:
+        raise ValueError("Unknown container type") from None
 
 
 class Container(ABC):
     """Abstract base class for containers.
 
+    Instances only hold id and weight (no per-instance __dict__); everything
+    that depends on the type lives in the shared TYPE descriptor. Containers are
+    immutable values: interning shares one object between stores, and change
+    tracking (Port.track_changes) only sees containers added to or removed from a
+    store, so to change a container replace it with a new one.
+
     Attributes:
         id (int): The unique identifier for the container.
         weight (float): The weight of the container.
     """
 
+    __slots__ = ('id', 'weight')
+
+    TYPE: ClassVar[ContainerType]
+
     def __init__(self, id: int, weight: float) -> None:
         """Initialize a Container instance.
 
@@ -17,8 +94,17 @@ class Container(ABC):
             id (int): The unique identifier for the container.
             weight (float): The weight of the container.
         """
-        self.id = id
-        self.weight = weight
+        _set(self, 'id', id)
+        _set(self, 'weight', weight)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"Container {self.id} is immutable; replace it instead of changing {name}")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"Container {self.id} is immutable")
+
+    def __reduce__(self) -> Tuple[Type['Container'], Tuple[int, float]]:
+        return self.__class__, (self.id, self.weight)
 
     @abstractmethod
     def consumption(self) -> float:
@@ -48,32 +134,50 @@ class Container(ABC):
             Dict: A dictionary containing the container's attributes.
         """
         return {
-            "type": self.__class__.__name__,
+            "type": self.TYPE.name,
             "id": self.id,
             "weight": self.weight
         }
 
     @staticmethod
-    def from_dict(data: Dict) -> 'Container':
+    def from_dict(data: Dict, interned: Optional[InternTable] = None) -> 'Container':
         """Create a Container instance from a dictionary representation.
 
         Args:
             data (Dict): A dictionary containing container attributes.
+            interned (Optional[InternTable]): If given, identical containers (same type,
+                id and weight) read with the same table are returned as one shared object.
 
         Returns:
-            Container: A new Container instance populated with data from the dictionary.
+            Container: A Container instance populated with data from the dictionary.
 
         Raises:
             ValueError: If the container type is unknown.
         """
-        if data["type"] == "BasicContainer":
-            return BasicContainer(data['id'], data['weight'])
-        elif data["type"] == "HeavyContainer":
-            return HeavyContainer(data['id'], data['weight'])
-        else:
-            raise ValueError("Unknown container type")
+        descriptor = container_type(data["type"])
+        if interned is None:
+            return descriptor.create(data['id'], data['weight'])
+        key = (descriptor.name, data['id'], data['weight'])
+        container = interned.get(key)
+        if container is None:
+            container = interned[key] = descriptor.create(data['id'], data['weight'])
+        return container
+
 
+def intern_container(container: Container, interned: InternTable) -> Container:
+    """Return the shared container identical to the given one, registering it if it is new.
+
+    Args:
+        container (Container): A freshly read container.
+        interned (InternTable): The table shared by one load.
 
+    Returns:
+        Container: The first container read with the same type, id and weight.
+    """
+    return interned.setdefault((container.TYPE.name, container.id, container.weight), container)
+
+
+@register_container_type
 class BasicContainer(Container):
     """Class representing a basic container.
 
@@ -81,6 +185,8 @@ class BasicContainer(Container):
     based on a predefined unit consumption rate.
     """
 
+    __slots__ = ()
+
     UNIT_CONSUMPTION = 2.5
 
     def __init__(self, id: int, weight: float) -> None:
@@ -101,6 +207,7 @@ class BasicContainer(Container):
         return BasicContainer.UNIT_CONSUMPTION * self.weight
 
 
+@register_container_type
 class HeavyContainer(Container):
     """Class representing a heavy container.
 
@@ -108,6 +215,8 @@ class HeavyContainer(Container):
     based on a predefined unit consumption rate.
     """
 
+    __slots__ = ()
+
     UNIT_CONSUMPTION = 3.0
 
     def __init__(self, id: int, weight: float) -> None:
@@ -139,6 +248,121 @@ def container_factory(id: int, weight: float) -> Container:
         Container: A BasicContainer or HeavyContainer instance based on the weight.
     """
     if weight <= 3000:
-        return BasicContainer(id, weight)
+        return BasicContainer.TYPE.create(id, weight)
     else:
-        return HeavyContainer(id, weight)
+        return HeavyContainer.TYPE.create(id, weight)
+
+
+class ContainerStore:
+    """Id-keyed, insertion-ordered collection of containers.
+
+    Lookups, membership tests and removals by id or by object are O(1) and
+    exact: a container is only matched if it is the stored object with that id.
+    Subscribed listeners are called with the id of every added or removed
+    container, which is how ports track changes for incremental checkpoints.
+    """
+
+    def __init__(self, containers: Iterable[Container] = ()) -> None:
+        """Initialize a ContainerStore instance.
+
+        Args:
+            containers (Iterable[Container]): Containers to store initially.
+        """
+        self._items: Dict[int, Container] = {}
+        self._listeners: List[Callable[[int], None]] = []
+        self.extend(containers)
+
+    def subscribe(self, listener: Callable[[int], None]) -> None:
+        """Call listener(container_id) after every addition or removal."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[int], None]) -> None:
+        """Stop calling a subscribed listener."""
+        self._listeners.remove(listener)
+
+    def listener_count(self) -> int:
+        """Return the number of subscribed listeners."""
+        return len(self._listeners)
+
+    def _notify(self, id: int) -> None:
+        for listener in self._listeners:
+            listener(id)
+
+    def append(self, container: Container) -> None:
+        """Store a container.
+
+        Args:
+            container (Container): The container to store.
+
+        Raises:
+            ValueError: If a container with the same id is already stored.
+        """
+        if container.id in self._items:
+            raise ValueError(f"Container {container.id} is already stored")
+        self._items[container.id] = container
+        if self._listeners:
+            self._notify(container.id)
+
+    def extend(self, containers: Iterable[Container]) -> None:
+        """Store several containers in order."""
+        for container in containers:
+            self.append(container)
+
+    def get(self, id: int) -> Optional[Container]:
+        """Return the container with the given id, or None."""
+        return self._items.get(id)
+
+    def remove(self, container: Union[Container, int]) -> Container:
+        """Remove a container given as object or id.
+
+        Raises:
+            KeyError: If the container is not stored.
+        """
+        if isinstance(container, Container):
+            if self._items.get(container.id) is not container:
+                raise KeyError(container.id)
+            removed = self._items.pop(container.id)
+        else:
+            removed = self._items.pop(container)
+        if self._listeners:
+            self._notify(removed.id)
+        return removed
+
+    def pop_many(self, ids: Iterable[int]) -> Tuple[List[Container], List[int]]:
+        """Remove many containers by id in O(k).
+
+        Args:
+            ids (Iterable[int]): Ids of the containers to remove.
+
+        Returns:
+            Tuple[List[Container], List[int]]: The removed containers and the ids that were not found.
+        """
+        removed: List[Container] = []
+        missing: List[int] = []
+        for id in ids:
+            container = self._items.pop(id, None)
+            if container is None:
+                missing.append(id)
+            else:
+                removed.append(container)
+                if self._listeners:
+                    self._notify(id)
+        return removed, missing
+
+    def ids(self) -> List[int]:
+        """Return the stored ids in insertion order."""
+        return list(self._items)
+
+    def __contains__(self, item: Any) -> bool:
+        if isinstance(item, Container):
+            return self._items.get(item.id) is item
+        return item in self._items
+
+    def __iter__(self) -> Iterator[Container]:
+        return iter(self._items.values())
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        return f"ContainerStore({list(self._items.values())!r})"
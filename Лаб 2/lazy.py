@@ -0,0 +1,411 @@
+"""Lazy loading of JSON Lines port files written by persistence.write_port.
+
+open_port reads the port header and the offset index at the end of the file
+and returns a LazyPort. Files without an index are scanned once instead; the
+scan parses the records but keeps no containers. The ships of the port are
+LazyShip objects whose containers are read from the file on first access.
+
+At most max_resident unmodified ships keep their containers in memory. When
+another ship is hydrated, the least recently used one drops its containers
+and reads them again the next time they are needed. A ship whose containers
+were changed, or are observed by a listener (e.g. Port.track_changes), stays
+resident. The port's own containers and its visits are also read on first
+access.
+
+Usage:
+    python lazy.py [containers] [ships]      compare with persistence.read_port
+"""
+import contextlib
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple, Union
+
+from containers import Container, ContainerStore, container_type
+from persistence import CONTAINER, END, INDEX, PORT, SHIP, VISIT, read_port, write_port
+from ports import Port
+from samples import make_port
+from ships import Ship, add_compensated
+from visits import DEFAULT_CAPACITY, Visit, VisitLog
+
+ShipEntry = Tuple[int, float, int, int, float, float, Optional[float]]
+
+_TAIL = 256  # Рядок "end" коротший за це число байтів
+
+
+class FileIndex:
+    """Byte offsets of the parts of a port file.
+
+    Attributes:
+        port_id (int): The id of the port.
+        coordinates (Tuple[float, float]): The coordinates of the port.
+        containers (Tuple[int, int]): Offset and count of the port's own containers.
+        ships (List[ShipEntry]): (id, max_weight, offset, count, weight, consumption, arrived)
+            of every docked ship, where offset and count locate its containers.
+        visits (Tuple[int, int]): Offset and count of the visit records.
+        departed (List[Visit]): Visits built from the "history" ships of old files.
+    """
+
+    def __init__(self, port_id: int, coordinates: Tuple[float, float], containers: Tuple[int, int],
+                 ships: List[ShipEntry], visits: Tuple[int, int], departed: Optional[List[Visit]] = None) -> None:
+        """Initialize a FileIndex."""
+        self.port_id = port_id
+        self.coordinates = coordinates
+        self.containers = containers
+        self.ships = ships
+        self.visits = visits
+        self.departed = departed or []
+
+
+def read_index(filename: str) -> Optional[FileIndex]:
+    """Read the index written at the end of a port file.
+
+    Args:
+        filename (str): A file written by persistence.write_port.
+
+    Returns:
+        Optional[FileIndex]: The index, or None if the file has none.
+
+    Raises:
+        ValueError: If the file does not start with a port header.
+    """
+    with open(filename, 'rb') as f:
+        header = json.loads(f.readline() or b'{}')
+        if header.get("t") != PORT:
+            raise ValueError(f"Not a port file: {filename}")
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - _TAIL))
+        last = f.read().rstrip(b"\n").rsplit(b"\n", 1)[-1]
+        if not last.startswith(b'{"t":"' + END.encode() + b'"'):
+            return None
+        f.seek(json.loads(last)["index"])
+        record = json.loads(f.readline())
+    if record.get("t") != INDEX:
+        return None
+    return FileIndex(header["id"], tuple(header["coordinates"]), tuple(record["containers"]),
+                     [tuple(entry) for entry in record["ships"]], tuple(record["visits"]))
+
+
+def scan_index(filename: str) -> FileIndex:
+    """Build the index of a port file by reading it once, for files written without one.
+
+    Args:
+        filename (str): A JSON Lines port file.
+
+    Returns:
+        FileIndex: The index of the file.
+
+    Raises:
+        ValueError: If the file does not start with a port header or has an unknown record.
+    """
+    ships: List[ShipEntry] = []
+    departed: List[Visit] = []
+    containers = visits = None
+    entry: Optional[list] = None
+    history = False
+
+    def finish() -> None:
+        if entry is not None:
+            if history:
+                departed.append(Visit(entry[0], math.nan, math.nan, entry[4], entry[5]))
+            else:
+                ships.append(tuple(entry[:7]))
+
+    position = 0
+    with open(filename, 'rb') as f:
+        header = json.loads(f.readline() or b'{}')
+        if header.get("t") != PORT:
+            raise ValueError(f"Not a port file: {filename}")
+        position = f.tell()
+        containers = [position, 0]
+        for line in f:
+            start, position = position, position + len(line)
+            record = json.loads(line)
+            kind = record.get("t")
+            if kind == CONTAINER:
+                weight = record["weight"]
+                if entry is None:
+                    containers[1] += 1
+                else:
+                    entry[3] += 1
+                    entry[4], entry[7] = add_compensated(entry[4], entry[7], weight)
+                    entry[5], entry[8] = add_compensated(entry[5], entry[8],
+                                                         container_type(record["type"]).unit_consumption * weight)
+            elif kind == SHIP:
+                finish()
+                entry = [record["id"], record["max_weight"], position, 0, 0.0, 0.0, record.get("arrived"), 0.0, 0.0]
+                history = record["section"] == "history"
+            elif kind == VISIT:
+                finish()
+                entry = None
+                visits = visits or [start, 0]
+                visits[1] += 1
+            elif kind == INDEX or kind == END:
+                break
+            else:
+                raise ValueError(f"Unknown record type: {kind}")
+        finish()
+    return FileIndex(header["id"], tuple(header["coordinates"]), tuple(containers), ships,
+                     tuple(visits or [position, 0]), departed)
+
+
+class _ReloadedStore(ContainerStore):
+    """Containers of a LazyShip; objects taken before an eviction still match their reloaded copies."""
+
+    def __contains__(self, item: Any) -> bool:
+        if isinstance(item, Container):
+            stored = self._items.get(item.id)
+            return stored is not None and stored == item
+        return item in self._items
+
+    def remove(self, container: Union[Container, int]) -> Container:
+        if isinstance(container, Container):
+            if container not in self:
+                raise KeyError(container.id)
+            container = container.id
+        return super().remove(container)
+
+
+class PortFile:
+    """Open port file shared by the lazy objects read from it.
+
+    Attributes:
+        filename (str): The port file.
+        index (FileIndex): Offsets of the parts of the file.
+        max_resident (int): Unmodified ships allowed to keep their containers in memory.
+    """
+
+    def __init__(self, filename: str, max_resident: int = 64) -> None:
+        """Open a port file and read or build its index.
+
+        Args:
+            filename (str): A file written by persistence.write_port.
+            max_resident (int): Unmodified ships allowed to keep their containers in memory.
+
+        Raises:
+            ValueError: If max_resident is not positive or the file is not a port file.
+        """
+        if max_resident < 1:
+            raise ValueError("max_resident must be at least 1")
+        self.filename = filename
+        self.max_resident = max_resident
+        self.index = read_index(filename) or scan_index(filename)
+        self._file = open(filename, 'rb')
+        self._lock = threading.RLock()
+        self._resident: 'OrderedDict[LazyShip, None]' = OrderedDict()  # Від найдавніше використаного
+
+    @property
+    def resident(self) -> int:
+        """Number of unmodified ships currently holding their containers."""
+        return len(self._resident)
+
+    def _lines(self, offset: int, count: int) -> List[bytes]:
+        with self._lock:
+            self._file.seek(offset)
+            return [self._file.readline() for _ in range(count)]
+
+    def read_containers(self, offset: int, count: int) -> List[Container]:
+        """Read count container records starting at a byte offset."""
+        return [Container.from_dict(json.loads(line)) for line in self._lines(offset, count)]
+
+    def read_visits(self, offset: int, count: int) -> List[Visit]:
+        """Read count visit records starting at a byte offset."""
+        return [Visit.from_dict(json.loads(line)) for line in self._lines(offset, count)]
+
+    def access(self, ship: 'LazyShip') -> ContainerStore:
+        """Return the containers of a ship, reading them if needed, and mark it recently used."""
+        with self._lock:
+            store = ship._containers
+            if store is None:
+                store = ship._containers = _ReloadedStore(self.read_containers(ship._offset, ship._count))
+                reference = weakref.ref(store)  # Без циклу, щоб витіснений вміст звільнявся одразу
+                store.subscribe(lambda _: self._modified(ship, reference()))
+                self._resident[ship] = None
+                self._evict()
+            elif ship in self._resident:
+                self._resident.move_to_end(ship)
+            return store
+
+    def _modified(self, ship: 'LazyShip', store: ContainerStore) -> None:
+        with self._lock:
+            self._resident.pop(ship, None)  # Змінений корабель більше не витісняється
+            if ship._containers is None and store is not None:
+                ship._containers = store  # Вміст змінили після витіснення: повертаємо його кораблю
+
+    def _evict(self) -> None:
+        while len(self._resident) > self.max_resident:
+            ship, _ = self._resident.popitem(last=False)
+            if ship._containers.listener_count() == 1:  # Лише власний слухач
+                ship._containers = None
+
+    def release(self, ship: 'LazyShip') -> None:
+        """Stop managing a ship's containers; they stay in memory."""
+        with self._lock:
+            self._resident.pop(ship, None)
+
+    def close(self) -> None:
+        """Close the file; containers not read yet can no longer be loaded."""
+        self._file.close()
+
+
+class LazyShip(Ship):
+    """Ship whose containers are read from the port file on first access.
+
+    current_weight and total_consumption() come from the index, so they are
+    available without reading any container. Containers read again after an
+    eviction are new objects; a container object taken earlier still matches
+    its stored copy by id and value, so unload_container keeps working.
+    """
+
+    def __init__(self, source: PortFile, entry: ShipEntry) -> None:
+        """Initialize a LazyShip from its index entry.
+
+        Args:
+            source (PortFile): The open port file.
+            entry (ShipEntry): The ship's entry in the file index.
+        """
+        id, max_weight, offset, count, weight, consumption, _ = entry
+        self._source = source
+        self._offset = offset
+        self._count = count
+        super().__init__(id, max_weight)
+        self._containers: Optional[ContainerStore] = None
+        self.current_weight = weight
+        self.current_consumption = consumption
+
+    @property
+    def containers(self) -> ContainerStore:
+        return self._source.access(self)
+
+    @containers.setter
+    def containers(self, store: ContainerStore) -> None:
+        self._containers = store
+        self._source.release(self)
+
+    @property
+    def hydrated(self) -> bool:
+        """True while the containers are in memory."""
+        return self._containers is not None
+
+
+class LazyPort(Port):
+    """Port opened by open_port; its containers, ships' containers and visits are read on demand.
+
+    Attributes:
+        source (PortFile): The open port file; close it with close() or a with block.
+    """
+
+    def __init__(self, source: PortFile) -> None:
+        """Initialize a LazyPort from an open port file.
+
+        Args:
+            source (PortFile): The open port file.
+        """
+        index = source.index
+        super().__init__(index.port_id, index.coordinates)
+        self.source = source
+        self._containers: Optional[ContainerStore] = None
+        self._history: Optional[VisitLog] = None
+        self.ships = [LazyShip(source, entry) for entry in index.ships]
+        self.arrivals = {entry[0]: entry[6] for entry in index.ships if entry[6] is not None}
+
+    @property
+    def containers(self) -> ContainerStore:
+        if self._containers is None:
+            self._containers = ContainerStore(self.source.read_containers(*self.source.index.containers))
+        return self._containers
+
+    @containers.setter
+    def containers(self, store: ContainerStore) -> None:
+        self._containers = store
+
+    @property
+    def history(self) -> VisitLog:
+        if self._history is None:
+            history = VisitLog(DEFAULT_CAPACITY)
+            for visit in self.source.index.departed + self.source.read_visits(*self.source.index.visits):
+                history.append(*visit)
+            self._history = history
+        return self._history
+
+    @history.setter
+    def history(self, log: VisitLog) -> None:
+        self._history = log
+
+    def __enter__(self) -> 'LazyPort':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying file and the history's spill file, if any."""
+        if self._history is not None:
+            self._history.close()
+        self.source.close()
+
+
+def open_port(filename: str, max_resident: int = 64) -> LazyPort:
+    """Open a port file lazily: only the header and the index are read.
+
+    Args:
+        filename (str): A file written by persistence.write_port.
+        max_resident (int): Unmodified ships allowed to keep their containers in memory.
+
+    Returns:
+        LazyPort: The port; close it when done.
+    """
+    return LazyPort(PortFile(filename, max_resident))
+
+
+def benchmark(containers: int = 1000000, ships: int = 1000) -> None:
+    """Compare opening a port file lazily with read_port, and check the results match."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        port = make_port(containers, ships)
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, 'port.jsonl')
+    try:
+        write_port(port, filename)
+        size = os.path.getsize(filename)
+
+        start = time.perf_counter()
+        eager = read_port(filename)
+        eager_seconds = time.perf_counter() - start
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        with open_port(filename, max_resident=16) as lazy:
+            opened = time.perf_counter() - start
+            one_ship = len(lazy.ships[ships // 2].containers)
+            single = time.perf_counter() - start - opened
+            fuel = sum(ship.total_consumption() for ship in lazy.ships)
+            same = all(ship.to_dict() == other.to_dict() for ship, other in zip(lazy.ships, eager.ships))
+            peak = tracemalloc.get_traced_memory()[1]
+            same = same and lazy.to_dict() == eager.to_dict()
+        tracemalloc.stop()
+
+        write_port(port, filename, index=False)
+        start = time.perf_counter()
+        with open_port(filename) as scanned:
+            scan = time.perf_counter() - start
+            same = same and scanned.to_dict() == eager.to_dict()
+
+        print(f"{size / 1e6:.0f} MB, {containers} containers on {ships} ships")
+        print(f"read_port: {eager_seconds:.2f} s   open_port: {opened * 1e3:.1f} ms   "
+              f"one ship ({one_ship} containers): {single * 1e3:.2f} ms   without index: {scan:.2f} s")
+        print(f"fleet fuel from the index: {fuel:.0f}, peak memory while visiting all ships "
+              f"(16 resident): {peak / 1e6:.1f} MB, identical: {same}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    benchmark(*(int(float(value)) for value in sys.argv[1:3]))
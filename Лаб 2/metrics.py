@@ -0,0 +1,298 @@
+"""Counters, latency histograms and gauges for the port and ship hot paths.
+
+Port.incoming_ship, outgoing_ship, dock, undock and save_to_json, and
+Ship.load_container and unload_container carry probes (see probes.py). enable()
+points them at a registry and switches them on; disable() switches them off,
+after which each call only checks a module flag. The classes are never patched,
+so both are safe while other threads use ports and ships.
+
+watch_port() adds gauges (ships docked, containers held, fuel load of the docked
+ships) that are computed when metrics are read. The registry can be dumped as
+JSON or served in the Prometheus text format on a local socket.
+
+Usage:
+    python metrics.py [operations]      measure the wrapper overhead
+"""
+import contextlib
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import probes
+from ports import Port
+from samples import make_containers
+from ships import Ship
+
+LATENCY_BUCKETS: Tuple[float, ...] = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3,
+                                      5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    """Monotonically increasing count."""
+
+    __slots__ = ('value', '_lock')
+
+    def __init__(self) -> None:
+        """Initialize a Counter at zero."""
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        """Increase the counter."""
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Distribution of observed values over fixed upper bounds.
+
+    Attributes:
+        buckets (Tuple[float, ...]): Upper bounds of the buckets, +Inf is implied.
+        counts (List[int]): Observations per bucket (not cumulative), the last one is +Inf.
+        sum (float): Sum of all observations.
+        count (int): Number of observations.
+    """
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        """Initialize an empty Histogram."""
+        self.buckets: Tuple[float, ...] = tuple(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, fraction: float) -> float:
+        """Return the upper bound of the bucket holding the given quantile."""
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            seen += count
+            if seen >= target and count:
+                return bound
+        return 0.0
+
+
+class Gauge:
+    """Value computed by a function whenever metrics are read."""
+
+    __slots__ = ('function',)
+
+    def __init__(self, function: Callable[[], float]) -> None:
+        """Initialize a Gauge reading function()."""
+        self.function = function
+
+    @property
+    def value(self) -> float:
+        return self.function()
+
+
+class MetricsRegistry:
+    """Named metrics with labels, exportable as JSON or Prometheus text."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._metrics: Dict[str, Tuple[str, str, Dict[Labels, object]]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, name: str, help: str, labels: Dict[str, object], factory: Callable[[], object]):
+        key: Labels = tuple(sorted((label, str(value)) for label, value in labels.items()))
+        with self._lock:
+            metric_kind, _, series = self._metrics.setdefault(name, (kind, help, {}))
+            if metric_kind != kind:
+                raise ValueError(f"Metric {name} is already registered as a {metric_kind}")
+            if key not in series:
+                series[key] = factory()
+            return series[key]
+
+    def counter(self, name: str, help: str = "", **labels) -> Counter:
+        """Return the counter with the given name and labels, creating it if needed."""
+        return self._get("counter", name, help, labels, Counter)
+
+    def histogram(self, name: str, help: str = "", buckets: Sequence[float] = LATENCY_BUCKETS,
+                  **labels) -> Histogram:
+        """Return the histogram with the given name and labels, creating it if needed."""
+        return self._get("histogram", name, help, labels, lambda: Histogram(buckets))
+
+    def gauge(self, name: str, function: Callable[[], float], help: str = "", **labels) -> Gauge:
+        """Register a gauge computed by function() for the given name and labels."""
+        gauge = self._get("gauge", name, help, labels, lambda: Gauge(function))
+        gauge.function = function
+        return gauge
+
+    def remove(self, name: str, **labels) -> None:
+        """Forget one labelled series of a metric."""
+        key: Labels = tuple(sorted((label, str(value)) for label, value in labels.items()))
+        with self._lock:
+            if name in self._metrics:
+                self._metrics[name][2].pop(key, None)
+
+    def snapshot(self) -> Dict:
+        """Return the current values of all metrics as plain data."""
+        with self._lock:
+            metrics = {name: (kind, help, dict(series)) for name, (kind, help, series) in self._metrics.items()}
+        result = {}
+        for name, (kind, help, series) in metrics.items():
+            entries = []
+            for labels, metric in series.items():
+                entry = {"labels": dict(labels)}
+                if kind == "histogram":
+                    entry.update(count=metric.count, sum=metric.sum, buckets=list(metric.buckets),
+                                 counts=list(metric.counts))
+                else:
+                    entry["value"] = metric.value
+                entries.append(entry)
+            result[name] = {"type": kind, "help": help, "series": entries}
+        return result
+
+    def dump(self, filename: str) -> None:
+        """Write a JSON snapshot atomically (temporary file, then rename)."""
+        directory = os.path.dirname(os.path.abspath(filename))
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(descriptor, 'w') as f:
+            json.dump({"time": time.time(), "metrics": self.snapshot()}, f)
+        os.replace(temporary, filename)
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for name, metric in self.snapshot().items():
+            if metric["help"]:
+                lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for entry in metric["series"]:
+                labels = entry["labels"]
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(entry['value'])}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(entry["buckets"] + [math.inf], entry["counts"]):
+                    cumulative += count
+                    bucket_labels = dict(labels, le=_format_value(bound))
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(entry['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 0, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve the Prometheus text format at /metrics from a daemon thread.
+
+        Args:
+            port (int): TCP port; 0 picks a free one (see server.server_address).
+            host (str): Interface to bind, local only by default.
+
+        Returns:
+            ThreadingHTTPServer: The running server; call shutdown() to stop it.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = MetricsRegistry()
+
+def enable(registry: MetricsRegistry = REGISTRY) -> None:
+    """Count and time every call of the instrumented methods in the given registry."""
+    probes.install({operation: (
+        registry.counter("port_operations_total", "Calls per operation", op=operation).inc,
+        registry.counter("port_operation_errors_total", "Calls that raised", op=operation).inc,
+        registry.histogram("port_operation_seconds", "Operation latency", op=operation).observe,
+    ) for operation in probes.OPERATIONS})
+
+
+def disable() -> None:
+    """Stop recording the instrumented methods."""
+    probes.uninstall()
+
+
+def enabled() -> bool:
+    """Return True while the instrumented methods are recorded."""
+    return probes.installed()
+
+
+def watch_port(port: Port, registry: MetricsRegistry = REGISTRY) -> None:
+    """Add gauges for a port: ships docked, containers held and fuel load of the docked ships.
+
+    The port is referenced weakly; its gauges read 0 once it is garbage collected.
+    """
+    reference = weakref.ref(port)
+
+    def read(function: Callable[[Port], float]) -> Callable[[], float]:
+        return lambda: function(reference()) if reference() is not None else 0
+
+    registry.gauge("port_ships_docked", read(lambda p: len(p.ships)), "Ships docked", port=port.id)
+    registry.gauge("port_containers", read(lambda p: len(p.containers)), "Containers held by the port", port=port.id)
+    registry.gauge("port_fuel_load", read(lambda p: sum(ship.total_consumption() for ship in p.ships)),
+                   "Fuel consumption of the docked ships", port=port.id)
+
+
+def benchmark(operations: int = 200000) -> None:
+    """Print load_container throughput with instrumentation disabled and enabled."""
+    containers = make_containers(operations)
+    results = {}
+    for state in ("disabled", "enabled"):
+        if state == "enabled":
+            enable()
+        ship = Ship(1, 1e12)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            for container in containers:
+                ship.load_container(container)
+            results[state] = time.perf_counter() - start
+    disable()
+    latency = REGISTRY.histogram("port_operation_seconds", op="ship.load_container")
+    print(f"load_container: disabled {results['disabled'] / operations * 1e9:.0f} ns/op, "
+          f"enabled {results['enabled'] / operations * 1e9:.0f} ns/op, p99 <= {latency.quantile(0.99) * 1e6:g} us")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(float(value)) for value in sys.argv[1:2]))
@@ -0,0 +1,209 @@
+"""Streaming, compact persistence of ports in JSON Lines.
+
+Every line is one compact JSON record:
+    {"t": "port", "id": ..., "coordinates": [...]}           first line
+    {"t": "ship", "section": "ships", "id": ..., "max_weight": ..., "n": ..., "arrived": ...}
+    {"t": "c", "type": ..., "id": ..., "weight": ...}         a container
+    {"t": "visit", "ship_id": ..., "arrived": ..., "departed": ..., ...}
+    {"t": "index", "containers": [...], "ships": [[...], ...], "visits": [...]}
+    {"t": "end", "index": ...}                                last line
+
+Container records belong to the closest header above them: the port header for
+the port's own containers, otherwise the ship header. Writing and reading hold
+one record at a time, so memory stays bounded regardless of the port size.
+
+The index gives the byte offset and count of the port's containers, of every
+ship's containers (with the ship's max_weight, total weight, consumption and
+arrival time) and of the visits; the "end" line gives the offset of the index.
+It lets lazy.open_port reach any ship without reading the rest of the file.
+Files from before visit records stored departed ships in a "history" section;
+those ships are read back as visits with unknown times.
+"""
+import json
+import math
+from typing import Dict, Iterable, Iterator, Optional
+
+from containers import Container, InternTable
+from ports import Port
+from ships import Ship, add_compensated
+from visits import Visit
+
+PORT = "port"
+SHIP = "ship"
+CONTAINER = "c"
+VISIT = "visit"
+INDEX = "index"
+END = "end"
+
+_encoder = json.JSONEncoder(separators=(',', ':'), allow_nan=False)
+
+
+def _time(value: Optional[float]) -> Optional[float]:
+    """Return a time as written to JSON: unknown (None or NaN) becomes null, as in Visit.to_dict."""
+    return None if value is None or math.isnan(value) else value
+
+
+def _container_record(container: Container) -> Dict:
+    record = container.to_dict()
+    record["t"] = CONTAINER
+    return record
+
+
+def iter_port_lines(port: Port, index: bool = True) -> Iterator[str]:
+    """Yield the port as JSON Lines, one ship or container at a time.
+
+    Args:
+        port (Port): The port to serialize.
+        index (bool): End with the offset index used by lazy loading.
+
+    Yields:
+        str: Newline-terminated compact JSON records.
+    """
+    position = 0  # Рядки в ASCII, тож довжина рядка дорівнює кількості байтів
+
+    def emit(record: Dict) -> str:
+        nonlocal position
+        line = _encoder.encode(record) + "\n"
+        position += len(line)
+        return line
+
+    yield emit({"t": PORT, "id": port.id, "coordinates": list(port.coordinates)})
+    containers = [position, len(port.containers)]
+    for container in port.containers:
+        yield emit(_container_record(container))
+    ships = []
+    for ship in port.ships:
+        record = {"t": SHIP, "section": "ships", "id": ship.id, "max_weight": ship.max_weight,
+                  "n": len(ship.containers)}
+        arrived = _time(port.arrivals.get(ship.id))
+        if arrived is not None:
+            record["arrived"] = arrived
+        yield emit(record)
+        start = position
+        weight = weight_error = consumption = consumption_error = 0.0
+        for container in ship.containers:
+            # Ті самі компенсовані суми, що й у Ship, який read_port збере з цих записів
+            weight, weight_error = add_compensated(weight, weight_error, container.weight)
+            consumption, consumption_error = add_compensated(consumption, consumption_error,
+                                                             container.consumption())
+            yield emit(_container_record(container))
+        ships.append([ship.id, ship.max_weight, start, len(ship.containers), weight, consumption, arrived])
+    visits = [position, len(port.history)]
+    for visit in port.history:
+        record = visit.to_dict()
+        record["t"] = VISIT
+        yield emit(record)
+    if index:
+        start = position
+        yield emit({"t": INDEX, "containers": containers, "ships": ships, "visits": visits})
+        yield emit({"t": END, "index": start})
+
+
+def write_port(port: Port, filename: str, buffer_size: int = 1 << 20, index: bool = True) -> None:
+    """Write a port to a JSON Lines file with bounded memory.
+
+    Lines end in a bare LF on every platform, so the byte offsets in the
+    index match the file.
+
+    Args:
+        port (Port): The port to save.
+        filename (str): The destination file.
+        buffer_size (int): Size of the file write buffer in bytes.
+        index (bool): End the file with the offset index used by lazy loading.
+
+    Raises:
+        ValueError: If a weight or coordinate is NaN or infinite, which JSON cannot represent.
+    """
+    with open(filename, 'w', buffering=buffer_size, encoding='ascii', newline='\n') as f:
+        f.writelines(iter_port_lines(port, index))
+
+
+def iter_records(filename: str) -> Iterator[Dict]:
+    """Yield the records of a JSON Lines port file one by one.
+
+    Args:
+        filename (str): The file to read.
+
+    Yields:
+        Dict: The decoded records in file order.
+    """
+    with open(filename, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def build_port(records: Iterable[Dict], intern: bool = False) -> Port:
+    """Rebuild a Port, its ships and all containers from a stream of records.
+
+    Args:
+        records (Iterable[Dict]): Records as produced by iter_records.
+        intern (bool): Share one object between identical containers.
+
+    Returns:
+        Port: The reconstructed port.
+
+    Raises:
+        ValueError: If the stream does not start with a port header or has an unknown record.
+    """
+    interned: Optional[InternTable] = {} if intern else None
+    port: Optional[Port] = None
+    ship: Optional[Ship] = None
+    departed: Optional[Ship] = None  # Корабель зі старої секції "history", стає візитом
+
+    def retire() -> None:
+        if departed is not None:
+            port.history.append(departed.id, math.nan, math.nan, departed.current_weight,
+                                departed.total_consumption())
+
+    for record in records:
+        kind = record.get("t")
+        if kind == CONTAINER:
+            if port is None:
+                raise ValueError("Container record before the port header")
+            container = Container.from_dict(record, interned)
+            if ship is None:
+                port.containers.append(container)
+            else:
+                ship.restore_container(container)
+        elif kind == SHIP:
+            if port is None:
+                raise ValueError("Ship record before the port header")
+            retire()
+            ship = Ship(record["id"], record["max_weight"])
+            departed = ship if record["section"] == "history" else None
+            if departed is None:
+                port.ships.append(ship)
+                if record.get("arrived") is not None:
+                    port.arrivals[ship.id] = record["arrived"]
+        elif kind == VISIT:
+            if port is None:
+                raise ValueError("Visit record before the port header")
+            retire()
+            ship = departed = None
+            port.history.append(*Visit.from_dict(record))
+        elif kind == INDEX or kind == END:
+            continue  # Індекс потрібен лише для лінивого завантаження
+        elif kind == PORT:
+            if port is not None:
+                raise ValueError("Duplicate port header")
+            port = Port(record["id"], tuple(record["coordinates"]))
+        else:
+            raise ValueError(f"Unknown record type: {kind}")
+    if port is None:
+        raise ValueError("Missing port header")
+    retire()
+    return port
+
+
+def read_port(filename: str, intern: bool = False) -> Port:
+    """Load a port written by write_port.
+
+    Args:
+        filename (str): The file to load.
+        intern (bool): Share one object between identical containers.
+
+    Returns:
+        Port: The reconstructed port.
+    """
+    return build_port(iter_records(filename), intern)
@@ -0,0 +1,274 @@
+"""Fleet load planning: bin-packing a port's containers onto its docked ships."""
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from containers import Container
+from ports import Port
+from ships import Ship
+
+EXACT_LIMIT = 16
+
+
+class LoadingPlan:
+    """Assignment of containers to ships produced by plan_loading.
+
+    Attributes:
+        ships (List[Ship]): The ships considered by the planner.
+        assignments (Dict[int, List[Container]]): Containers planned per ship id.
+        unassigned (List[Container]): Containers that did not fit on any ship.
+    """
+
+    def __init__(self, ships: Sequence[Ship]) -> None:
+        """Initialize an empty LoadingPlan for the given ships."""
+        self.ships: List[Ship] = list(ships)
+        self.assignments: Dict[int, List[Container]] = {ship.id: [] for ship in ships}
+        self.unassigned: List[Container] = []
+
+    def loaded_weight(self) -> float:
+        """Return the total planned weight."""
+        return sum(container.weight for containers in self.assignments.values() for container in containers)
+
+    def total_fuel(self) -> float:
+        """Return the fleet fuel consumption of the planned cargo."""
+        return sum(container.consumption() for containers in self.assignments.values() for container in containers)
+
+    def ships_used(self) -> int:
+        """Return how many ships receive at least one container."""
+        return sum(1 for containers in self.assignments.values() if containers)
+
+    def ships_sailing(self) -> int:
+        """Return how many ships carry cargo after the plan, counting cargo already on board."""
+        return sum(1 for ship in self.ships if self.assignments[ship.id] or ship.current_weight > 0)
+
+    def apply(self, port: Port) -> List[Container]:
+        """Load the planned containers onto the ships and remove them from the port.
+
+        A ship can still reject a planned container, for example when rounding in
+        its running weight puts the cargo a hair over max_weight. Rejected
+        containers are offered to the other ships, heaviest first; those that no
+        ship accepts stay in the port and move to unassigned, so afterwards the
+        plan describes what was actually loaded.
+
+        Args:
+            port (Port): The port the containers are taken from.
+
+        Returns:
+            List[Container]: Planned containers that could not be loaded and stayed in the port.
+        """
+        rejected: List[Container] = []
+        for ship in self.ships:
+            accepted, refused = ship.load_containers(self.assignments[ship.id])
+            self.assignments[ship.id] = accepted
+            rejected.extend(refused)
+            port.containers.pop_many(container.id for container in accepted)
+        rejected.sort(key=lambda container: container.weight, reverse=True)
+        for ship in self.ships:
+            if not rejected:
+                break
+            accepted, rejected = ship.load_containers(rejected)
+            self.assignments[ship.id].extend(accepted)
+            port.containers.pop_many(container.id for container in accepted)
+        self.unassigned.extend(rejected)
+        return rejected
+
+
+class _MaxTree:
+    """Segment tree over remaining ship capacities for first-fit queries in O(log m)."""
+
+    def __init__(self, values: Sequence[float]) -> None:
+        size = 1
+        while size < len(values):
+            size *= 2
+        self.size = size
+        self.tree = [float('-inf')] * (2 * size)
+        self.tree[size:size + len(values)] = values
+        for i in range(size - 1, 0, -1):
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+
+    def first_fit(self, weight: float) -> Optional[int]:
+        """Return the leftmost index whose capacity is at least weight."""
+        tree = self.tree
+        if tree[1] < weight:
+            return None
+        i = 1
+        while i < self.size:
+            i = 2 * i if tree[2 * i] >= weight else 2 * i + 1
+        return i - self.size
+
+    def take(self, index: int, weight: float) -> None:
+        """Reduce the capacity at index by weight."""
+        i = index + self.size
+        tree = self.tree
+        tree[i] -= weight
+        i //= 2
+        while i:
+            tree[i] = max(tree[2 * i], tree[2 * i + 1])
+            i //= 2
+
+
+def _first_fit_decreasing(containers: List[Container], capacities: List[float], plan: List[List[Container]],
+                          unassigned: List[Container]) -> None:
+    tree = _MaxTree(capacities)
+    for container in containers:
+        index = tree.first_fit(container.weight)
+        if index is None:
+            unassigned.append(container)
+        else:
+            tree.take(index, container.weight)
+            plan[index].append(container)
+
+
+def _best_fit_decreasing(containers: List[Container], capacities: List[float], plan: List[List[Container]],
+                         unassigned: List[Container]) -> None:
+    remaining: List[Tuple[float, int]] = sorted((capacity, index) for index, capacity in enumerate(capacities))
+    for container in containers:
+        position = bisect_left(remaining, (container.weight, -1))
+        if position == len(remaining):
+            unassigned.append(container)
+            continue
+        capacity, index = remaining.pop(position)
+        plan[index].append(container)
+        insort(remaining, (capacity - container.weight, index))
+
+
+def _exact(containers: List[Container], capacities: List[float], plan: List[List[Container]],
+           unassigned: List[Container]) -> None:
+    """Branch and bound: maximize loaded weight, then minimize the number of ships used.
+
+    The best-fit plan is the initial incumbent; a branch is cut when the weight it
+    could still add (bounded by both the remaining cargo and the free capacity)
+    cannot beat the incumbent.
+    """
+    n = len(containers)
+    suffix = [0.0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        suffix[i] = suffix[i + 1] + containers[i].weight
+    index_of = {id(container): index for index, container in enumerate(containers)}
+
+    heuristic: List[List[Container]] = [[] for _ in capacities]
+    _best_fit_decreasing(containers, capacities, heuristic, [])
+    assignment = [-1] * n
+    for ship_index, assigned in enumerate(heuristic):
+        for container in assigned:
+            assignment[index_of[id(container)]] = ship_index
+    best = {"weight": sum(container.weight for assigned in heuristic for container in assigned),
+            "ships": sum(1 for assigned in heuristic if assigned), "assignment": assignment}
+
+    remaining = list(capacities)
+    used = [0] * len(capacities)
+    current: List[int] = [-1] * n
+
+    def search(i: int, loaded: float, ships: int, free: float) -> None:
+        bound = loaded + min(suffix[i], free)
+        if bound < best["weight"] or (bound == best["weight"] and ships >= best["ships"]):
+            return
+        if i == n:
+            best.update(weight=loaded, ships=ships, assignment=list(current))
+            return
+        weight = containers[i].weight
+        tried = set()
+        # ships already in use first, so consolidated plans are found early
+        for index in sorted(range(len(remaining)), key=lambda k: used[k] == 0):
+            capacity = remaining[index]
+            state = (capacity, used[index] > 0)
+            if capacity < weight or state in tried:
+                continue          # identical ship states lead to symmetric subtrees
+            tried.add(state)
+            remaining[index] -= weight
+            used[index] += 1
+            current[i] = index
+            search(i + 1, loaded + weight, ships + (used[index] == 1), free - weight)
+            used[index] -= 1
+            remaining[index] += weight
+        current[i] = -1
+        search(i + 1, loaded, ships, free)
+
+    search(0, 0.0, 0, sum(capacities))
+    for container, index in zip(containers, best["assignment"]):
+        if index < 0:
+            unassigned.append(container)
+        else:
+            plan[index].append(container)
+
+
+def _consolidate(capacities: List[float], plan: List[List[Container]], sailing: List[bool]) -> None:
+    """Move the cargo of lightly loaded ships onto ships that sail anyway, emptying whole ships.
+
+    A ship is emptied only if all its planned containers fit (best fit, heaviest
+    first) into the free capacity of the other sailing ships, so the loaded
+    weight never changes.
+    """
+    remaining = [capacity - sum(container.weight for container in assigned)
+                 for capacity, assigned in zip(capacities, plan)]
+    sails = [bool(assigned) or preloaded for assigned, preloaded in zip(plan, sailing)]
+    candidates = sorted((index for index, assigned in enumerate(plan) if assigned and not sailing[index]),
+                        key=lambda index: capacities[index] - remaining[index])
+    for index in candidates:
+        targets = sorted((remaining[other], other) for other in range(len(plan)) if sails[other] and other != index)
+        moves: List[Tuple[Container, int]] = []
+        for container in sorted(plan[index], key=lambda container: container.weight, reverse=True):
+            position = bisect_left(targets, (container.weight, -1))
+            if position == len(targets):
+                break
+            capacity, other = targets.pop(position)
+            moves.append((container, other))
+            insort(targets, (capacity - container.weight, other))
+        else:
+            for container, other in moves:
+                plan[other].append(container)
+                remaining[other] -= container.weight
+            plan[index] = []
+            remaining[index] = capacities[index]
+            sails[index] = False
+
+
+STRATEGIES = {
+    "first_fit": _first_fit_decreasing,
+    "best_fit": _best_fit_decreasing,
+    "exact": _exact,
+}
+
+
+def plan_loading(port: Port, strategy: str = "first_fit", objective: str = "weight") -> LoadingPlan:
+    """Plan how to load a port's containers onto its docked ships.
+
+    Containers are packed in decreasing weight order against each ship's free
+    capacity (max_weight minus the cargo already on board).
+
+    Args:
+        port (Port): The port whose containers and ships are planned.
+        strategy (str): "first_fit", "best_fit" or "exact" (branch and bound,
+            limited to EXACT_LIMIT containers).
+        objective (str): "weight" keeps the port's ship order. "fuel" loads the
+            same weight onto as few sailing ships as it can: ships already carrying
+            cargo are filled first, then the largest ones, and afterwards lightly
+            loaded ships are emptied into the others where everything fits. Fuel per
+            container is the same on every ship, so the saving is the ships that
+            stay idle (LoadingPlan.ships_sailing).
+
+    Returns:
+        LoadingPlan: The planned assignment.
+
+    Raises:
+        ValueError: If the strategy or objective is unknown, or the instance is too large for "exact".
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    if objective not in ("weight", "fuel"):
+        raise ValueError(f"Unknown objective: {objective}")
+    containers = sorted(port.containers, key=lambda container: container.weight, reverse=True)
+    if strategy == "exact" and len(containers) > EXACT_LIMIT:
+        raise ValueError(f"Exact planning is limited to {EXACT_LIMIT} containers, got {len(containers)}")
+
+    ships = list(port.ships)
+    if objective == "fuel":
+        ships.sort(key=lambda ship: (ship.current_weight <= 0, -(ship.max_weight - ship.current_weight)))
+    capacities = [ship.max_weight - ship.current_weight for ship in ships]
+    per_ship: List[List[Container]] = [[] for _ in ships]
+    plan = LoadingPlan(ships)
+    STRATEGIES[strategy](containers, capacities, per_ship, plan.unassigned)
+    if objective == "fuel":
+        _consolidate(capacities, per_ship, [ship.current_weight > 0 for ship in ships])
+    for ship, assigned in zip(ships, per_ship):
+        plan.assignments[ship.id] = assigned
+    return plan
@@ -1,6 +1,15 @@
+import contextlib
 import json
-from typing import Protocol, Any, Tuple, List, Dict
-from containers import Container
+import math
+import os
+import threading
+import time
+from functools import partial
+from typing import Protocol, Any, Tuple, List, Dict, Optional
+from containers import Container, ContainerStore, InternTable
+from probes import timed
+from ships import Ship
+from visits import DEFAULT_CAPACITY, Visit, VisitLog
 
 class IPort(Protocol):
     """Interface for port operations.
@@ -30,9 +39,12 @@ class Port(IPort):
     Attributes:
         id (int): The unique identifier of the port.
         coordinates (Tuple[float, float]): The geographical coordinates of the port.
-        containers (List[Container]): A list of containers currently in the port.
+        containers (ContainerStore): The containers currently in the port, keyed by id.
         ships (List[Any]): A list of ships currently at the port.
-        history (List[Any]): A list of ships that have previously been in the port.
+        history (VisitLog): Compact records of the ships that have left the port, the most
+            recent DEFAULT_CAPACITY by default. Replace it with VisitLog(capacity, spill) to keep
+            older visits in a spill file; close() or a with block then closes that file.
+        arrivals (Dict[int, float]): Arrival time of each docked ship, by ship id.
     """
 
     def __init__(self, id: int, coordinates: Tuple[float, float]) -> None:
@@ -44,10 +56,15 @@ class Port(IPort):
         """
         self.id = id
         self.coordinates: Tuple[float, float] = coordinates
-        self.containers: List[Container] = []
+        self.containers: ContainerStore = ContainerStore()
         self.ships: List[Any] = []  # Список поточних кораблів
-        self.history: List[Any] = []  # Список кораблів, що вже були в порту
+        self.history: VisitLog = VisitLog(DEFAULT_CAPACITY)  # Візити кораблів, що вже були в порту
+        self.arrivals: Dict[int, float] = {}
+        self._changes: Optional[Dict[Optional[int], Dict[int, None]]] = None  # None: зміни не відстежуються
+        self._moves: List[Tuple[str, Any, Any]] = []
+        self._tracked: Dict[int, Any] = {}
 
+    @timed("port.incoming_ship")
     def incoming_ship(self, ship: Any) -> None:
         """Register an incoming ship at the port.
 
@@ -57,9 +74,10 @@ class Port(IPort):
         Prints:
             A message indicating the arrival of the ship.
         """
-        self.ships.append(ship)
+        self.dock(ship)
         print(f"Ship {ship.id} has arrived at Port {self.id}.")
 
+    @timed("port.outgoing_ship")
     def outgoing_ship(self, ship: Any) -> None:
         """Register an outgoing ship from the port.
 
@@ -70,13 +88,104 @@ class Port(IPort):
             A message indicating the departure of the ship or if the ship was
             not found in the port.
         """
-        if ship in self.ships:
-            self.ships.remove(ship)
-            self.history.append(ship)
+        if self.undock(ship):
             print(f"Ship {ship.id} has left Port {self.id}.")
         else:
             print(f"Ship {ship.id} is not in Port {self.id}.")
 
+    @timed("port.dock")
+    def dock(self, ship: Any, at: Optional[float] = None) -> None:
+        """Add a ship to the port without printing.
+
+        Args:
+            ship (Any): The ship that is arriving at the port.
+            at (Optional[float]): Arrival time, time.time() by default.
+        """
+        at = time.time() if at is None else at
+        self.ships.append(ship)
+        self.arrivals[ship.id] = at
+        if self._changes is not None:
+            self._track_ship(ship)
+            self._changes.pop(ship.id, None)  # Стан на момент прибуття вже містить ці зміни
+            self._moves.append(("dock", ship, (at, ship.to_dict())))
+
+    @timed("port.undock")
+    def undock(self, ship: Any, at: Optional[float] = None) -> bool:
+        """Remove a ship from the port and record its visit in the history, without printing.
+
+        Args:
+            ship (Any): The ship that is leaving the port.
+            at (Optional[float]): Departure time, time.time() by default.
+
+        Returns:
+            bool: False if the ship was not in the port.
+        """
+        if ship not in self.ships:
+            return False
+        self.ships.remove(ship)
+        visit = Visit(ship.id, self.arrivals.pop(ship.id, math.nan), time.time() if at is None else at,
+                      ship.current_weight, ship.total_consumption())
+        self.history.append(*visit)
+        if self._changes is not None:
+            self._untrack_ship(ship)
+            self._moves.append(("undock", ship, visit))
+        return True
+
+    def track_changes(self) -> None:
+        """Start recording changes for incremental checkpoints.
+
+        From now on the port records container additions and removals in the
+        port and on its ships, and ships docking or leaving through dock/undock
+        (and so incoming_ship/outgoing_ship).
+        """
+        if self._changes is not None:
+            return
+        self._changes = {}
+        self.containers.subscribe(partial(self._mark, None))
+        for ship in self.ships:
+            self._track_ship(ship)
+
+    def _track_ship(self, ship: Any) -> None:
+        if ship.id not in self._tracked:
+            listener = partial(self._mark, ship.id)
+            self._tracked[ship.id] = (ship, listener)
+            ship.containers.subscribe(listener)
+
+    def _untrack_ship(self, ship: Any) -> None:
+        if ship.id in self._tracked and ship not in self.ships:
+            tracked, listener = self._tracked.pop(ship.id)
+            tracked.containers.unsubscribe(listener)
+            self._changes.pop(ship.id, None)  # Вантаж корабля, що відплив, більше не зберігається
+
+    def _mark(self, owner: Optional[int], container_id: int) -> None:
+        changed = self._changes.setdefault(owner, {})
+        changed.pop(container_id, None)  # Переміщуємо в кінець, щоб зберегти порядок додавання
+        changed[container_id] = None
+
+    def tracked_ship(self, ship_id: int) -> Any:
+        """Return the tracked ship with the given id."""
+        return self._tracked[ship_id][0]
+
+    def take_changes(self) -> Tuple[Dict[Optional[int], List[int]], List[Tuple[str, Any, Any]]]:
+        """Return and reset the changes recorded since the previous call.
+
+        Returns:
+            Tuple: Changed container ids per owner (None for the port itself, otherwise
+            a ship id) in the order of their last change, and the moves in order:
+            ("dock", ship, (arrival time, Ship.to_dict() taken when it docked)) and
+            ("undock", ship, Visit). Container changes of a ship are those after it docked.
+
+        Raises:
+            RuntimeError: If changes are not being tracked.
+        """
+        if self._changes is None:
+            raise RuntimeError(f"Port {self.id} does not track changes")
+        changes = {owner: list(ids) for owner, ids in self._changes.items()}
+        moves = self._moves
+        self._changes = {}
+        self._moves = []
+        return changes, moves
+
     def to_dict(self) -> Dict:
         """Convert the Port instance to a dictionary representation.
 
@@ -88,42 +197,76 @@ class Port(IPort):
             "coordinates": self.coordinates,
             "containers": [container.to_dict() for container in self.containers],
             "ships": [ship.to_dict() for ship in self.ships],
-            "history": [ship.to_dict() for ship in self.history],
+            "history": self.history.to_list(),
         }
 
     @staticmethod
-    def from_dict(data: Dict) -> 'Port':
+    def from_dict(data: Dict, intern: bool = False) -> 'Port':
         """Create a Port instance from a dictionary representation.
 
         Args:
             data (Dict): A dictionary containing port attributes.
+            intern (bool): Share one object between identical containers, e.g. the
+                same cargo loaded on several ships.
 
         Returns:
             Port: A new Port instance populated with data from the dictionary.
         """
+        interned: Optional[InternTable] = {} if intern else None
         port = Port(data['id'], tuple(data['coordinates']))
-        # Set containers and ships if present
+        port.containers.extend(Container.from_dict(c, interned) for c in data.get('containers', []))
+        port.ships.extend(Ship.from_dict(s, interned) for s in data.get('ships', []))
+        for entry in data.get('history', []):
+            if 'containers' in entry:  # Старий формат: повний корабель без часу візиту
+                ship = Ship.from_dict(entry)
+                entry = {"ship_id": ship.id, "cargo_weight": ship.current_weight,
+                         "consumption": ship.total_consumption()}
+            port.history.append(*Visit.from_dict(entry))
         return port
 
+    @timed("port.save_to_json")
     def save_to_json(self, filename: str) -> None:
-        """Save the port data to a JSON file.
+        """Save the port data to a JSON file atomically.
+
+        The data is written to a temporary file in the same directory, synced and
+        renamed over the target, so a crash never leaves a truncated file.
 
         Args:
             filename (str): The name of the file to save the port data.
         """
-        with open(filename, 'w') as f:
-            json.dump(self.to_dict(), f, indent=4)
+        temporary = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"  # Унікальний для процесу й потоку
+        try:
+            with open(temporary, 'w') as f:
+                json.dump(self.to_dict(), f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, filename)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temporary)
+            raise
 
     @staticmethod
-    def load_from_json(filename: str) -> 'Port':
+    def load_from_json(filename: str, intern: bool = False) -> 'Port':
         """Load a Port instance from a JSON file.
 
         Args:
             filename (str): The name of the file to load the port data from.
+            intern (bool): Share one object between identical containers, see from_dict.
 
         Returns:
             Port: A Port instance populated with data from the JSON file.
         """
         with open(filename, 'r') as f:
             data = json.load(f)
-        return Port.from_dict(data)
+        return Port.from_dict(data, intern)
+
+    def close(self) -> None:
+        """Close the history's spill file, if any; the port stays usable in memory."""
+        self.history.close()
+
+    def __enter__(self) -> 'Port':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
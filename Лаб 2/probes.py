@@ -0,0 +1,68 @@
+"""Switchable timing probes on the port and ship hot paths.
+
+The instrumented methods of Port and Ship are decorated with timed() when the
+classes are defined. While the module flag is off, the wrapper only checks it
+and calls the method. metrics.enable() installs the recorders and switches the
+flag on; the classes are never patched, so enabling is safe while other
+threads are calling the methods.
+"""
+import functools
+import time
+from typing import Callable, Dict, List, Tuple
+
+OPERATIONS: List[str] = []  # Усі операції з пробами, у порядку оголошення
+
+Recorder = Tuple[Callable[[], None], Callable[[], None], Callable[[float], None]]  # calls, errors, latency
+
+_enabled = False
+_recorders: Dict[str, Recorder] = {}
+
+
+def timed(operation: str) -> Callable[[Callable], Callable]:
+    """Decorate a method so its calls, errors and latency are recorded while probes are enabled.
+
+    Args:
+        operation (str): The operation label, e.g. "port.dock".
+    """
+    OPERATIONS.append(operation)
+    clock = time.perf_counter
+
+    def decorate(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return method(*args, **kwargs)
+            recorder = _recorders.get(operation)
+            if recorder is None:
+                return method(*args, **kwargs)
+            calls, errors, latency = recorder
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            except BaseException:
+                errors()
+                raise
+            finally:
+                latency(clock() - start)
+                calls()
+        return wrapper
+    return decorate
+
+
+def install(recorders: Dict[str, Recorder]) -> None:
+    """Record the given operations from now on."""
+    global _enabled, _recorders
+    _recorders = dict(recorders)  # Заміна словника цілком: потоки бачать старий або новий
+    _enabled = True
+
+
+def uninstall() -> None:
+    """Stop recording; the decorated methods go back to a flag check."""
+    global _enabled, _recorders
+    _enabled = False
+    _recorders = {}
+
+
+def installed() -> bool:
+    """Return True while probes are recording."""
+    return _enabled
@@ -0,0 +1,37 @@
+"""Deterministic sample containers and ports for benchmarks and demos."""
+import random
+from typing import List
+
+from containers import Container, container_factory
+from ports import Port
+from ships import Ship
+
+
+def make_containers(count: int, seed: int = 0) -> List[Container]:
+    """Generate a deterministic mix of basic and heavy containers.
+
+    Args:
+        count (int): Number of containers to generate.
+        seed (int): Seed for the random generator.
+
+    Returns:
+        List[Container]: The generated containers with unique ids.
+    """
+    rng = random.Random(seed)
+    return [container_factory(i, rng.randint(500, 6000)) for i in range(count)]
+
+
+def make_port(containers: int, ships: int = 10, seed: int = 0) -> Port:
+    """Generate a port holding containers and docked, loaded ships.
+
+    Half of the containers stay in the port, the rest is spread across the ships.
+    """
+    port = Port(seed, (50.4501, 30.5234))
+    generated = make_containers(containers, seed)
+    port.containers.extend(generated[:containers // 2])
+    for ship_id in range(ships):
+        ship = Ship(ship_id, 1e12)
+        for container in generated[containers // 2 + ship_id::ships]:
+            ship.load_container(container)
+        port.incoming_ship(ship)
+    return port
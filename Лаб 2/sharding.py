@@ -0,0 +1,294 @@
+"""Multi-process simulation with ports partitioned across worker processes.
+
+Every worker runs a Simulation over the ports it owns. A ship sailing to a port
+of another shard is exported with Simulation.export_ship (built on
+Ship.to_dict) and handed to the owning shard through the coordinator.
+
+Time advances in conservative windows. The lookahead L is the shortest sailing
+time of any route leg crossing shards (distance / max_speed). When the earliest
+pending event is at T, every worker processes its events before T + L in
+parallel. Nothing sent during the window can arrive before T + L, so no shard
+ever receives an event from its past. Each port sees exactly the same events in
+the same (time, kind, ship id) order as in a single process, so the results
+are identical.
+
+Usage:
+    python sharding.py [hours] [workers]      compare with a single-process run
+"""
+import math
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ports import Port
+from simulation import MAX_SPEED, Fleet, PortStats, Simulation, distance_km, random_fleet
+from visits import VisitLog
+
+Handoff = Tuple[float, int, Dict]
+
+
+class SimulationResult:
+    """Outcome of a simulation run.
+
+    Attributes:
+        stats (Dict[int, PortStats]): Statistics of every port, accumulated up to now.
+        fuel (Dict[int, float]): Fuel burnt by every ship.
+        voyages (int): Completed port-to-port voyages.
+        events (int): Processed events.
+        now (float): Time of the last processed event.
+        windows (int): Synchronization windows (1 for a single-process run).
+        elapsed (float): Wall-clock seconds.
+    """
+
+    def __init__(self, stats: Dict[int, PortStats], fuel: Dict[int, float], voyages: int, events: int,
+                 now: float, windows: int, elapsed: float) -> None:
+        """Initialize a SimulationResult."""
+        self.stats = stats
+        self.fuel = fuel
+        self.voyages = voyages
+        self.events = events
+        self.now = now
+        self.windows = windows
+        self.elapsed = elapsed
+
+    def same_as(self, other: 'SimulationResult') -> bool:
+        """Return True if both runs produced exactly the same statistics, fuel and counts."""
+        return (self.voyages == other.voyages and self.events == other.events and self.now == other.now
+                and self.fuel == other.fuel
+                and {port_id: stats.to_dict() for port_id, stats in self.stats.items()}
+                == {port_id: stats.to_dict() for port_id, stats in other.stats.items()})
+
+    def speedup(self, reference: 'SimulationResult') -> float:
+        """Return how many times faster this run was than a reference run, e.g. run_single."""
+        return reference.elapsed / self.elapsed if self.elapsed else math.inf
+
+
+class ShardSimulation(Simulation):
+    """Simulation of the ports owned by one shard; ships leaving for other shards go to the outbox."""
+
+    def __init__(self, shard: int, ports: Iterable[Port], coordinates: Dict[int, Tuple[float, float]],
+                 shard_of: Dict[int, int], **options) -> None:
+        """Initialize a ShardSimulation.
+
+        Args:
+            shard (int): The index of this shard.
+            ports (Iterable[Port]): The ports owned by this shard.
+            coordinates (Dict[int, Tuple[float, float]]): Coordinates of all ports of the network.
+            shard_of (Dict[int, int]): Owning shard of every port id.
+            **options: Simulation parameters.
+        """
+        super().__init__(ports, **options)
+        self.shard = shard
+        self.shard_of = shard_of
+        self.coordinates = dict(coordinates)
+        self.outbox: Dict[int, List[Handoff]] = {}
+
+    def _sail(self, arrival: float, ship_id: int, destination: int) -> None:
+        shard = self.shard_of[destination]
+        if shard == self.shard:
+            super()._sail(arrival, ship_id, destination)
+        else:
+            self.outbox.setdefault(shard, []).append((arrival, destination, self.export_ship(ship_id)))
+
+    def take_outbox(self) -> Dict[int, List[Handoff]]:
+        """Return and clear the ships handed off since the last call."""
+        outbox, self.outbox = self.outbox, {}
+        return outbox
+
+
+def partition(ports: Iterable[Port], workers: int) -> Dict[int, int]:
+    """Assign ports to shards in contiguous longitude bands of equal size.
+
+    Neighbouring ports usually share a shard, which keeps most short legs local
+    and the lookahead long.
+    """
+    ordered = sorted(ports, key=lambda port: (port.coordinates[1], port.id))
+    return {port.id: index * workers // len(ordered) for index, port in enumerate(ordered)}
+
+
+def lookahead(fleet: Fleet, coordinates: Dict[int, Tuple[float, float]], shard_of: Dict[int, int],
+              max_speed: float) -> float:
+    """Return the shortest possible sailing time between ports of different shards.
+
+    Raises:
+        ValueError: If two ports of different shards on a route share coordinates.
+    """
+    shortest = math.inf
+    for _, route, _ in fleet:
+        for origin, destination in zip(route, route[1:] + route[:1]):
+            if shard_of[origin] != shard_of[destination]:
+                shortest = min(shortest, distance_km(coordinates[origin], coordinates[destination]) / max_speed)
+    if shortest <= 0:
+        raise ValueError("Ports of different shards share coordinates; assign them to the same shard")
+    return shortest
+
+
+def _worker(connection, shard: int, ports: List[Port], fleet: Fleet, coordinates: Dict[int, Tuple[float, float]],
+            shard_of: Dict[int, int], options: Dict) -> None:
+    simulation = ShardSimulation(shard, ports, coordinates, shard_of, **options)
+    for ship, route, start in fleet:
+        simulation.add_ship(ship, route, start)
+    events = 0
+    connection.send(simulation.next_time())
+    while True:
+        command, value, inbox = connection.recv()
+        if command == "run":
+            for arrival, port_id, state in inbox:
+                simulation.import_ship(state, arrival, port_id)
+            events += simulation.run(until=value)
+            connection.send((simulation.take_outbox(), simulation.next_time(), simulation.now))
+        else:
+            connection.send((simulation.stats(value), simulation.ship_fuel(), simulation.voyages, events))
+            connection.close()
+            return
+
+
+def _receive(connections: List, processes: List, shard: int):
+    """Receive a shard worker's reply, raising RuntimeError if the worker died instead.
+
+    Raises:
+        RuntimeError: If the worker closed its end of the pipe, e.g. after an exception.
+    """
+    try:
+        return connections[shard].recv()
+    except EOFError:
+        processes[shard].join()
+        raise RuntimeError(f"Shard {shard} worker exited with code {processes[shard].exitcode}") from None
+
+
+def run_sharded(ports: Iterable[Port], fleet: Fleet, until: float, workers: Optional[int] = None,
+                shard_of: Optional[Dict[int, int]] = None, **options) -> SimulationResult:
+    """Run the simulation up to a time with ports partitioned across processes.
+
+    Args:
+        ports (Iterable[Port]): The ports of the network.
+        fleet (Fleet): (ship, route, start) of every ship.
+        until (float): Process every event at or before this time.
+        workers (Optional[int]): Number of processes, the CPU count by default.
+        shard_of (Optional[Dict[int, int]]): Owning shard of every port id, see partition().
+        **options: Simulation parameters such as berths or max_speed.
+
+    Returns:
+        SimulationResult: The same result as run_single for the same input.
+
+    Raises:
+        RuntimeError: If a worker process fails; the other workers are terminated.
+    """
+    started = time.perf_counter()
+    ports = list(ports)
+    workers = workers or os.cpu_count() or 1
+    shard_of = shard_of or partition(ports, workers)
+    coordinates = {port.id: port.coordinates for port in ports}
+    step = lookahead(fleet, coordinates, shard_of, options.get("max_speed", MAX_SPEED))
+
+    connections, processes = [], []
+    try:
+        for shard in range(workers):
+            parent, child = multiprocessing.Pipe()
+            owned = [port for port in ports if shard_of[port.id] == shard]
+            ships = [entry for entry in fleet if shard_of[entry[1][0]] == shard]
+            process = multiprocessing.Process(target=_worker,
+                                              args=(child, shard, owned, ships, coordinates, shard_of, options))
+            process.start()
+            child.close()  # so a crashed worker shows up as EOFError in recv() instead of a hang
+            connections.append(parent)
+            processes.append(process)
+
+        next_times = [_receive(connections, processes, shard) for shard in range(workers)]
+        inboxes: List[List[Handoff]] = [[] for _ in range(workers)]
+        now = 0.0
+        windows = 0
+        while True:
+            start = min(next_times + [handoff[0] for inbox in inboxes for handoff in inbox])
+            if start > until:
+                break
+            end = start + step
+            bound = until if end > until else math.nextafter(end, -math.inf)
+            # shards without events in the window keep their inbox and sit the window out
+            active = [shard for shard in range(workers)
+                      if next_times[shard] <= bound or any(handoff[0] <= bound for handoff in inboxes[shard])]
+            for shard in active:
+                connections[shard].send(("run", bound, inboxes[shard]))
+                inboxes[shard] = []
+            for shard in active:
+                outbox, next_times[shard], shard_now = _receive(connections, processes, shard)
+                now = max(now, shard_now)
+                for target, handoffs in outbox.items():
+                    inboxes[target].extend(handoffs)
+            windows += 1
+
+        stats: Dict[int, PortStats] = {}
+        fuel: Dict[int, float] = {}
+        voyages = events = 0
+        for connection in connections:
+            connection.send(("stats", now, None))
+        for shard in range(workers):
+            shard_stats, shard_fuel, shard_voyages, shard_events = _receive(connections, processes, shard)
+            stats.update(shard_stats)
+            fuel.update(shard_fuel)
+            voyages += shard_voyages
+            events += shard_events
+        for process in processes:
+            process.join()
+        failed = [shard for shard, process in enumerate(processes) if process.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"Shard {failed[0]} worker exited with code {processes[failed[0]].exitcode}")
+        for inbox in inboxes:
+            for _, _, state in inbox:
+                fuel[state["ship"]["id"]] = state["fuel"]
+    except BaseException:
+        # a worker failed: stop the others so no process is left hanging
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+        raise
+    finally:
+        for connection in connections:
+            connection.close()
+    return SimulationResult(dict(sorted(stats.items())), dict(sorted(fuel.items())), voyages, events, now,
+                            windows, time.perf_counter() - started)
+
+
+def run_single(ports: Iterable[Port], fleet: Fleet, until: float, **options) -> SimulationResult:
+    """Run the same simulation in this process, for reference."""
+    started = time.perf_counter()
+    simulation = Simulation(ports, **options)
+    for ship, route, start in fleet:
+        simulation.add_ship(ship, route, start)
+    events = simulation.run(until=until)
+    stats = simulation.stats()
+    return SimulationResult(dict(sorted(stats.items())), dict(sorted(simulation.ship_fuel().items())),
+                            simulation.voyages, events, simulation.now, 1, time.perf_counter() - started)
+
+
+def benchmark(hours: float = 20000.0, workers: Optional[int] = None) -> None:
+    """Compare sharded runs with a single-process run on a random network.
+
+    Port histories spill to temporary files, so the ports sent to the workers
+    carry open VisitLog spill files.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    def network_with_spill(directory: str) -> Tuple[List[Port], Fleet]:
+        network, fleet = random_fleet(ports=200, ships=2000, seed=1)
+        for port in network:
+            port.history = VisitLog(1000, os.path.join(directory, f"{port.id}.visits"))
+        return network, fleet
+
+    with tempfile.TemporaryDirectory() as directory:
+        reference = run_single(*network_with_spill(directory), until=hours, berths=2)
+    print(f"single:      {reference.events} events in {reference.elapsed:.2f} s ({os.cpu_count()} CPU)")
+    for count in sorted({1, 2, workers}):
+        with tempfile.TemporaryDirectory() as directory:
+            result = run_sharded(*network_with_spill(directory), hours, workers=count, berths=2)
+        print(f"{count} worker(s): {result.events} events in {result.elapsed:.2f} s, {result.windows} windows, "
+              f"speedup x{result.speedup(reference):.2f} over single, identical: {result.same_as(reference)}")
+
+
+if __name__ == "__main__":
+    benchmark(*(float(value) for value in sys.argv[1:2]), *(int(value) for value in sys.argv[2:3]))
@@ -1,7 +1,30 @@
-from containers import Container
-from typing import List, Dict
+from containers import Container, ContainerStore, InternTable
+from probes import timed
+from typing import Iterable, List, Dict, Optional, Tuple, Union
 from typing import Protocol
 
+def add_compensated(total: float, error: float, value: float) -> Tuple[float, float]:
+    """Add a value to a running sum kept as a (total, error) pair.
+
+    total is the sum rounded to a float and error the rounding error carried
+    along (a double-double), so cancellation from later subtractions does not
+    leave the drift a plain running float accumulates.
+
+    Args:
+        total (float): The current rounded sum.
+        error (float): The current rounding error.
+        value (float): The value to add; negative to subtract.
+
+    Returns:
+        Tuple[float, float]: The new total and error.
+    """
+    rounded = total + value
+    virtual = rounded - total
+    error += (total - (rounded - virtual)) + (value - virtual)
+    total = rounded + error
+    return total, error - (total - rounded)
+
+
 class IShip(Protocol):
     """Interface for ship operations.
 
@@ -16,11 +39,11 @@ class IShip(Protocol):
         """
         pass
 
-    def unload_container(self, container: Container) -> None:
+    def unload_container(self, container: Union[Container, int]) -> None:
         """Unload a container from the ship.
 
         Args:
-            container (Container): The container to be unloaded from the ship.
+            container (Union[Container, int]): The container to be unloaded from the ship, or its id.
         """
         pass
 
@@ -30,7 +53,14 @@ class Ship:
     Attributes:
         id (int): The unique identifier of the ship.
         max_weight (float): The maximum weight capacity of the ship.
-        containers (List[Container]): A list of containers currently loaded on the ship.
+        containers (ContainerStore): The containers currently loaded on the ship, keyed by id.
+        current_weight (float): Running total of the container weights.
+        current_consumption (float): Running total of the container consumptions.
+
+    The running totals are compensated sums (see add_compensated). They stay
+    within about an ulp of math.fsum over the containers on board after any
+    number of load/unload cycles, but are not guaranteed to be bit-equal to a
+    plain left-to-right sum; compare them with math.isclose.
     """
 
     def __init__(self, id: int, max_weight: float) -> None:
@@ -42,8 +72,13 @@ class Ship:
         """
         self.id = id
         self.max_weight = max_weight
-        self.containers: List[Container] = []
+        self.containers: ContainerStore = ContainerStore()
+        self.current_weight: float = 0.0
+        self.current_consumption: float = 0.0
+        self._weight_error: float = 0.0
+        self._consumption_error: float = 0.0
 
+    @timed("ship.load_container")
     def load_container(self, container: Container) -> None:
         """Load a container into the ship.
 
@@ -54,36 +89,99 @@ class Ship:
             A message indicating whether the container was loaded or if
             it exceeds the weight limit.
         """
-        total_weight = sum(c.weight for c in self.containers) + container.weight
-        if total_weight <= self.max_weight:
-            self.containers.append(container)
+        if container.id in self.containers:
+            print(f"Container {container.id} is already on Ship {self.id}.")
+        elif self.current_weight + container.weight <= self.max_weight:
+            self._add(container)
             print(f"Container {container.id} loaded into Ship {self.id}.")
         else:
             print(f"Cannot load container {container.id} into Ship {self.id}: exceeds weight limit.")
 
-    def unload_container(self, container: Container) -> None:
+    def load_containers(self, containers: Iterable[Container]) -> Tuple[List[Container], List[Container]]:
+        """Load many containers in order without printing per container.
+
+        Each container is accepted if it still fits after the previously accepted ones
+        and no container with the same id is already on board.
+
+        Args:
+            containers (Iterable[Container]): The containers to be loaded.
+
+        Returns:
+            Tuple[List[Container], List[Container]]: The accepted and the rejected containers.
+        """
+        accepted: List[Container] = []
+        rejected: List[Container] = []
+        for container in containers:
+            if container.id not in self.containers and self.current_weight + container.weight <= self.max_weight:
+                self._add(container)
+                accepted.append(container)
+            else:
+                rejected.append(container)
+        return accepted, rejected
+
+    def restore_container(self, container: Container) -> None:
+        """Add a container from saved state without the weight check.
+
+        Args:
+            container (Container): The container to add.
+        """
+        self._add(container)
+
+    def _add(self, container: Container) -> None:
+        """Append a container and update the running weight and consumption totals."""
+        self.containers.append(container)
+        self.current_weight, self._weight_error = add_compensated(
+            self.current_weight, self._weight_error, container.weight)
+        self.current_consumption, self._consumption_error = add_compensated(
+            self.current_consumption, self._consumption_error, container.consumption())
+
+    @timed("ship.unload_container")
+    def unload_container(self, container: Union[Container, int]) -> None:
         """Unload a container from the ship.
 
         Args:
-            container (Container): The container to be unloaded.
+            container (Union[Container, int]): The container to be unloaded, or its id.
 
         Prints:
             A message indicating whether the container was successfully unloaded
             or if it was not found on the ship.
         """
+        id = container.id if isinstance(container, Container) else container
         if container in self.containers:
-            self.containers.remove(container)
-            print(f"Container {container.id} unloaded from Ship {self.id}.")
+            self._discard(self.containers.remove(container))
+            print(f"Container {id} unloaded from Ship {self.id}.")
         else:
-            print(f"Container {container.id} not found on Ship {self.id}.")
+            print(f"Container {id} not found on Ship {self.id}.")
+
+    def unload_containers(self, ids: Iterable[int]) -> Tuple[List[Container], List[int]]:
+        """Unload many containers by id without printing per container.
+
+        Args:
+            ids (Iterable[int]): Ids of the containers to be unloaded.
+
+        Returns:
+            Tuple[List[Container], List[int]]: The unloaded containers and the ids not found on board.
+        """
+        removed, missing = self.containers.pop_many(ids)
+        for container in removed:
+            self._discard(container)
+        return removed, missing
+
+    def _discard(self, container: Container) -> None:
+        """Update the running totals for a container that left the ship."""
+        self.current_weight, self._weight_error = add_compensated(
+            self.current_weight, self._weight_error, -container.weight)
+        self.current_consumption, self._consumption_error = add_compensated(
+            self.current_consumption, self._consumption_error, -container.consumption())
 
     def total_consumption(self) -> float:
         """Calculate the total fuel consumption of the ship.
 
         Returns:
-            float: The total fuel consumption based on the containers on board.
+            float: The total fuel consumption based on the containers on board,
+                within about an ulp of math.fsum over the containers.
         """
-        return sum(container.consumption() for container in self.containers)
+        return self.current_consumption
 
     def to_dict(self) -> Dict:
         """Convert the Ship instance to a dictionary representation.
@@ -98,15 +196,17 @@ class Ship:
         }
 
     @staticmethod
-    def from_dict(data: Dict) -> 'Ship':
+    def from_dict(data: Dict, interned: Optional[InternTable] = None) -> 'Ship':
         """Create a Ship instance from a dictionary representation.
 
         Args:
             data (Dict): A dictionary containing ship attributes.
+            interned (Optional[InternTable]): Table sharing identical containers, see Container.from_dict.
 
         Returns:
             Ship: A new Ship instance populated with data from the dictionary.
         """
         ship = Ship(data['id'], data['max_weight'])
-        ship.containers = [Container.from_dict(c) for c in data['containers']]
+        for c in data['containers']:
+            ship.restore_container(Container.from_dict(c, interned))
         return ship
@@ -0,0 +1,372 @@
+"""Discrete-event simulation of ships sailing between ports.
+
+Every ship follows a cyclic route of port ids. At a port it waits for a free
+berth, docks for a handling time that grows with its cargo weight, then sails
+to the next port of its route. Sailing speed drops linearly with the load
+fraction, and fuel burnt per hour at sea is Ship.total_consumption().
+
+A docked ship is registered with Port.dock at the time of its arrival event,
+not when a berth frees up, so the port's visit log keeps the queueing delay.
+Visits go to the ports' bounded VisitLogs, replaced by logs of the given
+history capacity if one is set.
+
+Events live in a heapq ordered by (time, kind, ship id). A ship has at most one
+pending event, so the order is total and a run is fully deterministic.
+
+Usage:
+    python simulation.py [voyages]      benchmark a random network
+"""
+import heapq
+import math
+import random
+import sys
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from containers import container_factory
+from ports import Port
+from ships import Ship
+from visits import VisitLog
+
+DEPART, ARRIVE = 0, 1
+
+EARTH_RADIUS_KM = 6371.0088
+MAX_SPEED = 40.0
+MIN_SPEED = 25.0
+
+Event = Tuple[float, int, int, int]
+
+
+def distance_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Return the haversine distance in km between two (latitude, longitude) points in degrees."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(h, 1.0)))
+
+
+class PortStats:
+    """Throughput and queueing statistics of one port.
+
+    Attributes:
+        arrivals (int): Ships that reached the port.
+        departures (int): Ships that finished handling and left.
+        weight_handled (float): Cargo weight of the departed ships.
+        total_wait (float): Hours spent by ships waiting for a berth.
+        max_wait (float): The longest wait for a berth.
+        max_queue (int): The longest berth queue.
+        queue_area (float): Queue length integrated over time.
+        busy_area (float): Occupied berths integrated over time.
+    """
+
+    __slots__ = ('arrivals', 'departures', 'weight_handled', 'total_wait', 'max_wait', 'max_queue',
+                 'queue_area', 'busy_area', 'last_change')
+
+    def __init__(self) -> None:
+        """Initialize empty statistics."""
+        self.arrivals = 0
+        self.departures = 0
+        self.weight_handled = 0.0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.max_queue = 0
+        self.queue_area = 0.0
+        self.busy_area = 0.0
+        self.last_change = 0.0
+
+    def advance(self, now: float, queued: int, busy: int) -> None:
+        """Accumulate the time-weighted queue and berth occupancy up to now."""
+        elapsed = now - self.last_change
+        self.queue_area += queued * elapsed
+        self.busy_area += busy * elapsed
+        self.last_change = now
+
+    def mean_wait(self) -> float:
+        """Return the mean hours a departed ship waited for a berth."""
+        return self.total_wait / self.departures if self.departures else 0.0
+
+    def mean_queue(self, elapsed: float) -> float:
+        """Return the time-averaged queue length over the simulated hours."""
+        return self.queue_area / elapsed if elapsed else 0.0
+
+    def utilization(self, elapsed: float, berths: int) -> float:
+        """Return the fraction of berth time that was occupied."""
+        return self.busy_area / (elapsed * berths) if elapsed else 0.0
+
+    def to_dict(self) -> Dict:
+        """Convert the statistics to a dictionary."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _Voyager:
+    """Simulation state of one ship."""
+
+    __slots__ = ('ship', 'route', 'leg', 'arrived', 'at_sea', 'fuel', 'distance')
+
+    def __init__(self, ship: Ship, route: Sequence[int]) -> None:
+        self.ship = ship
+        self.route: Tuple[int, ...] = tuple(route)
+        self.leg = 0
+        self.arrived = 0.0
+        self.at_sea = False
+        self.fuel = 0.0
+        self.distance = 0.0
+
+
+class _Berths:
+    """Docked and waiting ships of one port."""
+
+    __slots__ = ('port', 'docked', 'queue', 'stats')
+
+    def __init__(self, port: Port) -> None:
+        self.port = port
+        self.docked = 0
+        self.queue: Deque[_Voyager] = deque()
+        self.stats = PortStats()
+
+
+class Simulation:
+    """Discrete-event engine moving ships between ports.
+
+    Attributes:
+        now (float): The current simulated time in hours.
+        voyages (int): Completed port-to-port voyages.
+        berths (int): Ships a port can handle at the same time.
+        coordinates (Dict[int, Tuple[float, float]]): Coordinates of every port a route may visit.
+    """
+
+    def __init__(self, ports: Iterable[Port], berths: int = 1, handling_hours: float = 2.0,
+                 handling_rate: float = 5000.0, max_speed: float = MAX_SPEED, min_speed: float = MIN_SPEED,
+                 history: Optional[int] = None) -> None:
+        """Initialize a Simulation over a set of ports.
+
+        Args:
+            ports (Iterable[Port]): The ports of the network.
+            berths (int): Ships a port can handle at the same time.
+            handling_hours (float): Fixed handling time of a docked ship.
+            handling_rate (float): Cargo weight handled per hour on top of the fixed time.
+            max_speed (float): Speed in km/h of an empty ship.
+            min_speed (float): Speed in km/h of a fully loaded ship.
+            history (Optional[int]): Visits kept per port; the ports keep their own logs if None.
+        """
+        self.ports: Dict[int, _Berths] = {port.id: _Berths(port) for port in ports}
+        if history is not None:
+            for port_berths in self.ports.values():
+                port_berths.port.history = VisitLog(history)
+        self.coordinates: Dict[int, Tuple[float, float]] = {port_id: berths.port.coordinates
+                                                            for port_id, berths in self.ports.items()}
+        self.berths = berths
+        self.handling_hours = handling_hours
+        self.handling_rate = handling_rate
+        self.max_speed = max_speed
+        self.min_speed = min_speed
+        self.now = 0.0
+        self.voyages = 0
+        self._events: List[Event] = []
+        self._ships: Dict[int, _Voyager] = {}
+        self._distances: Dict[Tuple[int, int], float] = {}
+
+    def add_ship(self, ship: Ship, route: Sequence[int], start: float = 0.0) -> None:
+        """Put a ship into the simulation; it arrives at the first port of its route at start.
+
+        Args:
+            ship (Ship): The ship; its cargo stays on board for the whole run.
+            route (Sequence[int]): Port ids visited in a cycle, at least two.
+            start (float): Arrival time at the first port.
+
+        Raises:
+            ValueError: If the ship is already simulated or the route is invalid.
+        """
+        if ship.id in self._ships:
+            raise ValueError(f"Ship {ship.id} is already in the simulation")
+        if len(route) < 2 or route[0] not in self.ports or any(port_id not in self.coordinates for port_id in route):
+            raise ValueError(f"Invalid route for Ship {ship.id}: {list(route)}")
+        self._ships[ship.id] = _Voyager(ship, route)
+        heapq.heappush(self._events, (start, ARRIVE, ship.id, route[0]))
+
+    def export_ship(self, ship_id: int) -> Dict:
+        """Remove a ship that is at sea and return its full state as plain data.
+
+        The running totals and their compensation terms travel with Ship.to_dict,
+        so a ship imported elsewhere continues with bit-identical values.
+        """
+        voyager = self._ships.pop(ship_id)
+        ship = voyager.ship
+        return {"ship": ship.to_dict(), "current_weight": ship.current_weight,
+                "current_consumption": ship.current_consumption, "weight_error": ship._weight_error,
+                "consumption_error": ship._consumption_error, "route": voyager.route,
+                "leg": voyager.leg, "at_sea": voyager.at_sea, "fuel": voyager.fuel, "distance": voyager.distance}
+
+    def import_ship(self, state: Dict, arrival: float, port_id: int) -> None:
+        """Add a ship exported by export_ship, arriving at one of this simulation's ports."""
+        ship = Ship.from_dict(state["ship"])
+        ship.current_weight = state["current_weight"]
+        ship.current_consumption = state["current_consumption"]
+        ship._weight_error = state["weight_error"]
+        ship._consumption_error = state["consumption_error"]
+        voyager = _Voyager(ship, state["route"])
+        voyager.leg = state["leg"]
+        voyager.at_sea = state["at_sea"]
+        voyager.fuel = state["fuel"]
+        voyager.distance = state["distance"]
+        self._ships[ship.id] = voyager
+        heapq.heappush(self._events, (arrival, ARRIVE, ship.id, port_id))
+
+    def speed(self, ship: Ship) -> float:
+        """Return the sailing speed in km/h of a ship for its current load."""
+        load = min(ship.current_weight / ship.max_weight, 1.0) if ship.max_weight else 1.0
+        return self.max_speed - (self.max_speed - self.min_speed) * load
+
+    def distance(self, origin: int, destination: int) -> float:
+        """Return the cached distance in km between two ports."""
+        key = (origin, destination)
+        if key not in self._distances:
+            self._distances[key] = distance_km(self.coordinates[origin], self.coordinates[destination])
+        return self._distances[key]
+
+    def fuel_burned(self, ship_id: int) -> float:
+        """Return the fuel a ship has burnt so far."""
+        return self._ships[ship_id].fuel
+
+    def total_fuel(self) -> float:
+        """Return the fuel burnt by all ships."""
+        return sum(voyager.fuel for voyager in self._ships.values())
+
+    def ship_fuel(self) -> Dict[int, float]:
+        """Return the fuel burnt so far by every simulated ship."""
+        return {ship_id: voyager.fuel for ship_id, voyager in self._ships.items()}
+
+    def next_time(self) -> float:
+        """Return the time of the next pending event, or infinity."""
+        return self._events[0][0] if self._events else math.inf
+
+    def stats(self, now: Optional[float] = None) -> Dict[int, PortStats]:
+        """Return the statistics of every port, accumulated up to now (the current time by default)."""
+        now = self.now if now is None else now
+        for berths in self.ports.values():
+            berths.stats.advance(now, len(berths.queue), berths.docked)
+        return {port_id: berths.stats for port_id, berths in self.ports.items()}
+
+    def run(self, until: float = math.inf, max_voyages: Optional[int] = None) -> int:
+        """Process events in order.
+
+        Args:
+            until (float): Stop before the first event later than this time.
+            max_voyages (Optional[int]): Stop once this many voyages have been completed in total.
+
+        Returns:
+            int: The number of events processed.
+        """
+        events = self._events
+        processed = 0
+        while events and events[0][0] <= until:
+            if max_voyages is not None and self.voyages >= max_voyages:
+                break
+            event = heapq.heappop(events)
+            self.now = event[0]
+            if event[1] == ARRIVE:
+                self._arrive(event)
+            else:
+                self._depart(event)
+            processed += 1
+        return processed
+
+    def _arrive(self, event: Event) -> None:
+        now, _, ship_id, port_id = event
+        voyager = self._ships[ship_id]
+        berths = self.ports[port_id]
+        if voyager.at_sea:
+            voyager.at_sea = False
+            self.voyages += 1
+        voyager.arrived = now
+        berths.stats.advance(now, len(berths.queue), berths.docked)
+        berths.stats.arrivals += 1
+        if berths.docked < self.berths:
+            self._dock(voyager, berths, now)
+        else:
+            berths.queue.append(voyager)
+            berths.stats.max_queue = max(berths.stats.max_queue, len(berths.queue))
+
+    def _dock(self, voyager: _Voyager, berths: _Berths, now: float) -> None:
+        wait = now - voyager.arrived
+        berths.stats.total_wait += wait
+        berths.stats.max_wait = max(berths.stats.max_wait, wait)
+        berths.docked += 1
+        berths.port.dock(voyager.ship, voyager.arrived)  # Час прибуття, а не швартування: черга входить у візит
+        handling = self.handling_hours + voyager.ship.current_weight / self.handling_rate
+        heapq.heappush(self._events, (now + handling, DEPART, voyager.ship.id, berths.port.id))
+
+    def _depart(self, event: Event) -> None:
+        now, _, ship_id, port_id = event
+        voyager = self._ships[ship_id]
+        berths = self.ports[port_id]
+        ship = voyager.ship
+        berths.stats.advance(now, len(berths.queue), berths.docked)
+        berths.port.undock(ship, now)
+        berths.docked -= 1
+        berths.stats.departures += 1
+        berths.stats.weight_handled += ship.current_weight
+        if berths.queue:
+            self._dock(berths.queue.popleft(), berths, now)
+
+        voyager.leg = (voyager.leg + 1) % len(voyager.route)
+        destination = voyager.route[voyager.leg]
+        distance = self.distance(port_id, destination)
+        hours = distance / self.speed(ship)
+        voyager.fuel += ship.total_consumption() * hours
+        voyager.distance += distance
+        voyager.at_sea = True
+        self._sail(now + hours, ship_id, destination)
+
+    def _sail(self, arrival: float, ship_id: int, destination: int) -> None:
+        heapq.heappush(self._events, (arrival, ARRIVE, ship_id, destination))
+
+
+Fleet = List[Tuple[Ship, List[int], float]]
+
+
+def random_fleet(ports: int = 50, ships: int = 500, route_length: int = 4, containers: int = 5,
+                 seed: int = 0) -> Tuple[List[Port], Fleet]:
+    """Generate reproducible random ports and loaded ships with their routes and start times."""
+    rng = random.Random(seed)
+    network = [Port(port_id, (rng.uniform(-60.0, 60.0), rng.uniform(-180.0, 180.0))) for port_id in range(ports)]
+    fleet: Fleet = []
+    container_id = 0
+    for ship_id in range(ships):
+        ship = Ship(ship_id, 40000)
+        for _ in range(containers):
+            ship.restore_container(container_factory(container_id, rng.randint(500, 6000)))
+            container_id += 1
+        fleet.append((ship, rng.sample(range(ports), route_length), rng.uniform(0.0, 24.0)))
+    return network, fleet
+
+
+def random_network(ports: int = 50, ships: int = 500, route_length: int = 4, containers: int = 5,
+                   seed: int = 0) -> Simulation:
+    """Build a reproducible simulation with random ports, loaded ships and routes."""
+    network, fleet = random_fleet(ports, ships, route_length, containers, seed)
+    simulation = Simulation(network, berths=2)
+    for ship, route, start in fleet:
+        simulation.add_ship(ship, route, start)
+    return simulation
+
+
+def benchmark(voyages: int = 1000000) -> None:
+    """Run a random network for the given number of voyages and print throughput and port statistics."""
+    simulation = random_network()
+    start = time.perf_counter()
+    events = simulation.run(max_voyages=voyages)
+    elapsed = time.perf_counter() - start
+    stats = simulation.stats()
+    print(f"{simulation.voyages} voyages, {events} events in {elapsed:.2f} s "
+          f"({events / elapsed:.0f} events/s), simulated {simulation.now:.0f} h")
+    busiest = sorted(stats.items(), key=lambda item: item[1].arrivals, reverse=True)[:5]
+    for port_id, port_stats in busiest:
+        print(f"Port {port_id}: {port_stats.arrivals} arrivals, mean wait {port_stats.mean_wait():.2f} h, "
+              f"mean queue {port_stats.mean_queue(simulation.now):.2f}, "
+              f"utilization {port_stats.utilization(simulation.now, simulation.berths):.2f}")
+    print(f"Total fuel: {simulation.total_fuel():.0f}")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(float(value)) for value in sys.argv[1:2]))
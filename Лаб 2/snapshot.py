@@ -0,0 +1,244 @@
+"""Binary columnar snapshots of ports, ships and containers.
+
+Layout (native byte order, recorded in the header):
+    header      magic, version, byte order, port id, coordinates, container, group and visit counts
+    ids         int64[n]      container ids
+    weights     float64[n]    container weights
+    group_ids   int64[g]      port id for group 0, then ship ids
+    max_weight  float64[g]    ship max_weight (0 for the port group)
+    offsets     int64[g + 1]  containers of group i are [offsets[i], offsets[i + 1])
+    arrived     float64[g]    arrival time of a docked ship (NaN if unknown)
+    visits      int64[v], then float64[v] x 4: ship id, arrived, departed, cargo weight, consumption
+    type_codes  uint8[n]      index into TYPE_NAMES
+    kinds       uint8[g]      PORT_GROUP or SHIP_GROUP
+
+Loading memory-maps the file and exposes the columns as zero-copy memoryviews,
+so aggregates such as per-ship weight or fuel consumption are computed with
+NumPy over the mapped buffers, without creating Container objects.
+"""
+import contextlib
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from containers import Container, InternTable, container_type, intern_container
+from ports import Port
+from ships import Ship
+from visits import Visit
+
+TYPE_NAMES: List[str] = ["BasicContainer", "HeavyContainer"]
+TYPE_CLASSES = [container_type(name).cls for name in TYPE_NAMES]
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+
+PORT_GROUP, SHIP_GROUP = 0, 1
+
+_MAGIC = b'PSNP'
+_VERSION = 2
+_HEADER = struct.Struct('<4sIcxxxqddQQQ')
+_RATES = np.array([cls.UNIT_CONSUMPTION for cls in TYPE_CLASSES])
+
+
+def write_snapshot(port: Port, filename: str) -> None:
+    """Write a port as a binary columnar snapshot atomically.
+
+    Like Port.save_to_json, the columns go to a temporary file in the same
+    directory, which is synced and renamed over the target. A crash never leaves
+    a truncated snapshot, and readers that have the old file mapped keep it.
+
+    Args:
+        port (Port): The port to save.
+        filename (str): The destination file.
+
+    Raises:
+        ValueError: If a container type has no type code.
+    """
+    ids, weights, codes = array('q'), array('d'), array('B')
+    group_ids, max_weights, offsets, kinds = array('q'), array('d'), array('q', [0]), array('B')
+    arrived = array('d')
+
+    def add_group(group_id: int, kind: int, max_weight: float, containers, arrival: float) -> None:
+        for container in containers:
+            name = container.__class__.__name__
+            if name not in TYPE_CODES:
+                raise ValueError(f"Unknown container type: {name}")
+            ids.append(container.id)
+            weights.append(container.weight)
+            codes.append(TYPE_CODES[name])
+        group_ids.append(group_id)
+        max_weights.append(max_weight)
+        arrived.append(arrival)
+        kinds.append(kind)
+        offsets.append(len(ids))
+
+    add_group(port.id, PORT_GROUP, 0.0, port.containers, math.nan)
+    for ship in port.ships:
+        add_group(ship.id, SHIP_GROUP, ship.max_weight, ship.containers, port.arrivals.get(ship.id, math.nan))
+    visits = [array('q')] + [array('d') for _ in range(4)]
+    for visit in port.history:
+        for column, value in zip(visits, visit):
+            column.append(value)
+
+    byteorder = b'<' if sys.byteorder == 'little' else b'>'
+    temporary = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"  # Унікальний для процесу й потоку
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, byteorder, port.id, port.coordinates[0],
+                                 port.coordinates[1], len(ids), len(group_ids), len(port.history)))
+            for column in (ids, weights, group_ids, max_weights, offsets, arrived, *visits, codes, kinds):
+                column.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, filename)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temporary)
+        raise
+
+
+class PortSnapshot:
+    """Memory-mapped, read-only view of a snapshot written by write_snapshot.
+
+    Attributes:
+        port_id (int): The id of the saved port.
+        coordinates (Tuple[float, float]): The coordinates of the saved port.
+        ids, weights, type_codes: Zero-copy container columns.
+        group_ids, max_weights, offsets, arrived, kinds: Zero-copy group columns.
+        visit_columns: Zero-copy visit columns, in Visit field order.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """Open and memory-map a snapshot file.
+
+        Args:
+            filename (str): The snapshot file.
+
+        Raises:
+            ValueError: If the file is not a snapshot or was written with another byte order.
+        """
+        self._file = open(filename, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ValueError(f"Not a port snapshot: {filename}")
+        magic, version, byteorder, port_id, lat, lon, n, g, v = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError(f"Not a port snapshot: {filename}")
+        if byteorder != (b'<' if sys.byteorder == 'little' else b'>'):
+            self.close()
+            raise ValueError("Snapshot was written with a different byte order")
+        self.port_id: int = port_id
+        self.coordinates: Tuple[float, float] = (lat, lon)
+
+        view = memoryview(self._map)
+        position = _HEADER.size
+
+        def column(fmt: str, count: int, size: int) -> memoryview:
+            nonlocal position
+            result = view[position:position + count * size].cast(fmt)
+            position += count * size
+            return result
+
+        self.ids = column('q', n, 8)
+        self.weights = column('d', n, 8)
+        self.group_ids = column('q', g, 8)
+        self.max_weights = column('d', g, 8)
+        self.offsets = column('q', g + 1, 8)
+        self.arrived = column('d', g, 8)
+        self.visit_columns = [column('q', v, 8)] + [column('d', v, 8) for _ in range(4)]
+        self.type_codes = column('B', n, 1)
+        self.kinds = column('B', g, 1)
+        self._views = [view, self.ids, self.weights, self.group_ids, self.max_weights, self.offsets,
+                       self.arrived, *self.visit_columns, self.type_codes, self.kinds]
+
+    def __enter__(self) -> 'PortSnapshot':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the views and unmap the file."""
+        for view in getattr(self, '_views', []):
+            view.release()
+        self._views = []
+        self._map.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def visits(self) -> Iterator[Visit]:
+        """Yield the visit records, oldest first."""
+        return (Visit(*values) for values in zip(*self.visit_columns))
+
+    def groups(self, kind: int = SHIP_GROUP) -> Iterator[int]:
+        """Yield the group indexes of the given kind."""
+        return (index for index, group_kind in enumerate(self.kinds) if group_kind == kind)
+
+    def _consumption(self, start: int, end: int) -> np.ndarray:
+        """Return the fuel consumption of each container in [start, end)."""
+        codes = np.frombuffer(self.type_codes, dtype=np.uint8)[start:end]
+        return _RATES[codes] * np.frombuffer(self.weights, dtype=np.float64)[start:end]
+
+    def group_weight(self, index: int) -> float:
+        """Return the total container weight of a group."""
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return float(np.frombuffer(self.weights, dtype=np.float64)[start:end].sum())
+
+    def group_consumption(self, index: int) -> float:
+        """Return the fuel consumption of a group; it matches Ship.total_consumption to rounding."""
+        return float(self._consumption(self.offsets[index], self.offsets[index + 1]).sum())
+
+    def ship_totals(self, kind: int = SHIP_GROUP) -> List[Tuple[int, float, float]]:
+        """Return (ship id, total weight, fuel consumption) for every group of the given kind.
+
+        All groups are summed in one pass over the columns; the totals match the
+        ships' running totals to rounding, so compare them with math.isclose.
+        """
+        offsets = np.frombuffer(self.offsets, dtype=np.int64)
+        groups = np.repeat(np.arange(len(self.kinds)), np.diff(offsets))
+        weights = np.bincount(groups, weights=np.frombuffer(self.weights, dtype=np.float64),
+                              minlength=len(self.kinds))
+        consumption = np.bincount(groups, weights=self._consumption(0, len(self)), minlength=len(self.kinds))
+        selected = np.flatnonzero(np.frombuffer(self.kinds, dtype=np.uint8) == kind)
+        return list(zip(np.frombuffer(self.group_ids, dtype=np.int64)[selected].tolist(),
+                        weights[selected].tolist(), consumption[selected].tolist()))
+
+    def containers(self, index: int, interned: Optional[InternTable] = None) -> List[Container]:
+        """Materialize the containers of one group, sharing identical ones through interned if given."""
+        start, end = self.offsets[index], self.offsets[index + 1]
+        containers = [TYPE_CLASSES[self.type_codes[i]](self.ids[i], self.weights[i]) for i in range(start, end)]
+        if interned is not None:
+            containers = [intern_container(container, interned) for container in containers]
+        return containers
+
+    def to_port(self, intern: bool = False) -> Port:
+        """Materialize the full Port with its ships and containers.
+
+        With intern, identical containers (e.g. the same cargo on several
+        ships) become one shared object.
+        """
+        interned: Optional[InternTable] = {} if intern else None
+        port = Port(self.port_id, self.coordinates)
+        for index, kind in enumerate(self.kinds):
+            containers = self.containers(index, interned)
+            if kind == PORT_GROUP:
+                port.containers.extend(containers)
+                continue
+            ship = Ship(self.group_ids[index], self.max_weights[index])
+            for container in containers:
+                ship.restore_container(container)
+            port.ships.append(ship)
+            if not math.isnan(self.arrived[index]):
+                port.arrivals[ship.id] = self.arrived[index]
+        for visit in self.visits():
+            port.history.append(*visit)
+        return port
@@ -0,0 +1,369 @@
+"""Spatial index over port coordinates for nearest-port and radius queries.
+
+Ports are placed on the unit sphere as 3-D vectors and bucketed into a uniform
+cubic grid (the 3-D analogue of a geohash). Two points within great-circle
+distance R are within chord distance c = 2 sin(R / 2 EARTH_RADIUS_KM) of each
+other, so with a cell edge of at least c every match lies in the 27 cells
+around the query. Candidates from those cells are gathered for a whole batch
+of queries at once and filtered with a vectorized haversine distance, so the
+results equal a brute-force scan over all ports.
+
+Grids are built lazily, one per power-of-two cell size, and cached. A k-nearest
+search whose radius would grow past MAX_CHORD scans all ports instead, a few
+queries at a time, and keeps the k smallest distances of each.
+
+Usage:
+    python spatial.py [ports] [queries]      benchmark against brute force
+"""
+import math
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ports import Port
+
+EARTH_RADIUS_KM = 6371.0088
+MAX_LEVEL = 20
+MAX_CHORD = 0.25      # ~1600 km; beyond it the 27 cells hold a large share of all ports
+SCAN_BUDGET = 1 << 20  # distances evaluated at once by the exhaustive k-nearest search
+
+_NEIGHBOURS = np.array([(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)],
+                       dtype=np.int64)
+
+
+def _haversine(lat1: np.ndarray, cos1: np.ndarray, lon1: np.ndarray,
+               lat2: np.ndarray, cos2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Haversine distance in km between radian coordinates with precomputed cosines of latitude."""
+    a = np.sin((lat2 - lat1) * 0.5) ** 2 + cos1 * cos2 * np.sin((lon2 - lon1) * 0.5) ** 2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Return the great-circle distance in km between points given in degrees.
+
+    Args:
+        lat1, lon1: Latitudes and longitudes of the first points (scalars or arrays).
+        lat2, lon2: Latitudes and longitudes of the second points, broadcast against the first.
+
+    Returns:
+        np.ndarray: The distances in km.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64)) for value in (lat1, lon1, lat2, lon2))
+    return _haversine(lat1, np.cos(lat1), lon1, lat2, np.cos(lat2), lon2)
+
+
+def _radians(degrees: Sequence[float], name: str) -> np.ndarray:
+    """Convert coordinates in degrees to radians, rejecting NaN and infinite values.
+
+    Raises:
+        ValueError: If a coordinate is not finite; it would never fall inside any search ring.
+    """
+    values = np.asarray(degrees, dtype=np.float64)
+    if not np.isfinite(values).all():
+        raise ValueError(f"{name} must be finite numbers")
+    return np.radians(values)
+
+
+def _chord(radius_km: float) -> float:
+    """Return the unit-sphere chord length spanning a great-circle distance."""
+    return 2.0 * np.sin(min(radius_km / (2.0 * EARTH_RADIUS_KM), np.pi / 2))
+
+
+class _Grid:
+    """Ports bucketed into cubic cells of edge 2 ** (1 - level), sorted by cell key."""
+
+    def __init__(self, vectors: np.ndarray, level: int) -> None:
+        self.edge = 2.0 ** (1 - level)
+        self.cells = int(np.ceil(2.0 / self.edge)) + 1
+        keys = self.keys(self.cell_indexes(vectors))
+        self.order = np.argsort(keys, kind='stable')
+        self.cell_keys, starts = np.unique(keys[self.order], return_index=True)
+        self.cell_starts = np.append(starts, len(keys)).astype(np.int64)
+
+    def cell_indexes(self, vectors: np.ndarray) -> np.ndarray:
+        return np.floor((vectors + 1.0) / self.edge).astype(np.int64)
+
+    def keys(self, cells: np.ndarray) -> np.ndarray:
+        return (cells[..., 0] * self.cells + cells[..., 1]) * self.cells + cells[..., 2]
+
+    def candidates(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (query index, port index) pairs for every port in the 27 cells around each query."""
+        cells = self.cell_indexes(vectors)[:, None, :] + _NEIGHBOURS[None, :, :]
+        inside = ((cells >= 0) & (cells < self.cells)).all(axis=2)
+        # cells outside the grid would alias other cells' keys, so they are marked absent
+        neighbours = np.where(inside, self.keys(cells), -1)
+        position = np.searchsorted(self.cell_keys, neighbours)
+        clipped = np.minimum(position, len(self.cell_keys) - 1)
+        found = self.cell_keys[clipped] == neighbours
+        starts = np.where(found, self.cell_starts[clipped], 0).ravel()
+        counts = np.where(found, self.cell_starts[clipped + 1] - self.cell_starts[clipped], 0).ravel()
+        total = int(counts.sum())
+        queries = np.repeat(np.arange(len(vectors), dtype=np.int64), len(_NEIGHBOURS))
+        query_of = np.repeat(queries, counts)
+        # position of every candidate inside its cell run: arange minus the run's first output slot
+        run_begin = np.cumsum(counts) - counts
+        slots = np.arange(total, dtype=np.int64) - np.repeat(run_begin - starts, counts)
+        return query_of, self.order[slots]
+
+
+class PortIndex:
+    """Spatial index over a fixed set of ports.
+
+    Attributes:
+        ports (List[Port]): The indexed ports, in index order (empty if built from coordinates).
+        ids (np.ndarray): Port id of every indexed position.
+        latitudes (np.ndarray): Latitude in degrees of every indexed position.
+        longitudes (np.ndarray): Longitude in degrees of every indexed position.
+    """
+
+    def __init__(self, ports: Iterable[Port]) -> None:
+        """Index the coordinates of the given ports.
+
+        Args:
+            ports (Iterable[Port]): The ports to index; coordinates are (latitude, longitude) in degrees.
+        """
+        self.ports: List[Port] = list(ports)
+        coordinates = np.array([port.coordinates for port in self.ports], dtype=np.float64).reshape(-1, 2)
+        self._build(np.array([port.id for port in self.ports], dtype=np.int64), coordinates[:, 0], coordinates[:, 1])
+
+    @staticmethod
+    def from_coordinates(ids: Sequence[int], latitudes: Sequence[float], longitudes: Sequence[float]) -> 'PortIndex':
+        """Build an index from parallel arrays of ids and coordinates without Port objects."""
+        index = PortIndex.__new__(PortIndex)
+        index.ports = []
+        index._build(np.asarray(ids, dtype=np.int64), np.asarray(latitudes, dtype=np.float64),
+                     np.asarray(longitudes, dtype=np.float64))
+        return index
+
+    def _build(self, ids: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray) -> None:
+        self.ids: np.ndarray = ids
+        self.latitudes: np.ndarray = latitudes
+        self.longitudes: np.ndarray = longitudes
+        self._lat = _radians(latitudes, "Port latitudes")
+        self._lon = _radians(longitudes, "Port longitudes")
+        self._cos = np.cos(self._lat)
+        self._vectors = _unit_vectors(self._lat, self._lon)
+        self._grids: Dict[int, _Grid] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _grid(self, chord: float) -> _Grid:
+        """Return the finest cached grid whose cell edge covers the chord."""
+        level = 0
+        while level < MAX_LEVEL and 2.0 ** -level >= chord * (1 + 1e-9) + 1e-12:
+            level += 1
+        if level not in self._grids:
+            self._grids[level] = _Grid(self._vectors, level)
+        return self._grids[level]
+
+    def _within(self, lat: np.ndarray, lon: np.ndarray, chord: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (query index, port index, distance) for all candidates of the batch, unfiltered."""
+        queries, ports = self._grid(chord).candidates(_unit_vectors(lat, lon))
+        distances = _haversine(lat[queries], np.cos(lat)[queries], lon[queries],
+                               self._lat[ports], self._cos[ports], self._lon[ports])
+        return queries, ports, distances
+
+    def query_radius_many(self, latitudes: Sequence[float], longitudes: Sequence[float], radius_km: float,
+                          batch_size: int = 4096) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Find all ports within a radius of many positions.
+
+        Args:
+            latitudes (Sequence[float]): Query latitudes in degrees.
+            longitudes (Sequence[float]): Query longitudes in degrees.
+            radius_km (float): The search radius in km.
+            batch_size (int): Queries evaluated together; bounds the candidate arrays.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: (offsets, ids, distances). The matches of
+            query i are ids[offsets[i]:offsets[i + 1]], sorted by distance, then by index position.
+
+        Raises:
+            ValueError: If a coordinate or the radius is NaN or infinite, or the radius is negative.
+        """
+        if not 0.0 <= radius_km < math.inf:
+            raise ValueError(f"radius_km must be a finite non-negative number, got {radius_km}")
+        lat_all = _radians(latitudes, "Latitudes")
+        lon_all = _radians(longitudes, "Longitudes")
+        chord = _chord(radius_km)
+        counts = np.zeros(len(lat_all), dtype=np.int64)
+        ports_out: List[np.ndarray] = []
+        distances_out: List[np.ndarray] = []
+        for start in range(0, len(lat_all), batch_size):
+            lat, lon = lat_all[start:start + batch_size], lon_all[start:start + batch_size]
+            queries, ports, distances = self._within(lat, lon, chord)
+            keep = distances <= radius_km
+            queries, ports, distances = queries[keep], ports[keep], distances[keep]
+            order = np.lexsort((ports, distances, queries))
+            ports_out.append(ports[order])
+            distances_out.append(distances[order])
+            counts[start:start + len(lat)] = np.bincount(queries, minlength=len(lat))
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        ports = np.concatenate(ports_out) if ports_out else np.zeros(0, dtype=np.int64)
+        distances = np.concatenate(distances_out) if distances_out else np.zeros(0)
+        return offsets, self.ids[ports], distances
+
+    def query_radius(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[int, float]]:
+        """Return (port id, distance in km) of every port within the radius, nearest first."""
+        offsets, ids, distances = self.query_radius_many([latitude], [longitude], radius_km)
+        return list(zip(ids.tolist(), distances.tolist()))
+
+    def nearest_many(self, latitudes: Sequence[float], longitudes: Sequence[float], k: int = 1,
+                     batch_size: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the k nearest ports to many positions.
+
+        The search radius starts from the expected distance of the k-th port for
+        evenly spread ports and doubles for the queries that found fewer than k.
+        Once it would exceed MAX_CHORD the grid no longer prunes much, so the
+        remaining queries fall back to an exhaustive scan that selects the k
+        nearest without sorting all distances.
+
+        Args:
+            latitudes (Sequence[float]): Query latitudes in degrees.
+            longitudes (Sequence[float]): Query longitudes in degrees.
+            k (int): Number of ports per query.
+            batch_size (int): Queries evaluated together.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (ids, distances), both of shape (queries, k), nearest first;
+            ties are broken by index position.
+
+        Raises:
+            ValueError: If k is not between 1 and the number of indexed ports, or a coordinate
+                is NaN or infinite.
+        """
+        if not 1 <= k <= len(self):
+            raise ValueError(f"k must be between 1 and {len(self)}, got {k}")
+        lat_all = _radians(latitudes, "Latitudes")
+        lon_all = _radians(longitudes, "Longitudes")
+        result_ports = np.zeros((len(lat_all), k), dtype=np.int64)
+        result_distances = np.zeros((len(lat_all), k), dtype=np.float64)
+        initial = 2.0 * np.sqrt(k / len(self))
+        for start in range(0, len(lat_all), batch_size):
+            pending = np.arange(start, min(start + batch_size, len(lat_all)))
+            chord = initial
+            while len(pending) and chord <= MAX_CHORD:
+                lat, lon = lat_all[pending], lon_all[pending]
+                queries, ports, distances = self._within(lat, lon, chord)
+                radius_km = 2.0 * EARTH_RADIUS_KM * np.arcsin(min(chord / 2.0, 1.0))
+                keep = distances <= radius_km
+                queries, ports, distances = queries[keep], ports[keep], distances[keep]
+                counts = np.bincount(queries, minlength=len(pending))
+                order = np.lexsort((ports, distances, queries))
+                queries, ports, distances = queries[order], ports[order], distances[order]
+                rank = np.arange(len(queries)) - np.repeat(np.cumsum(counts) - counts, counts)
+                done = counts >= k
+                take = (rank < k) & done[queries]
+                rows = pending[done]
+                result_ports[rows] = ports[take].reshape(-1, k)
+                result_distances[rows] = distances[take].reshape(-1, k)
+                pending = pending[~done]
+                chord *= 2.0
+            if len(pending):
+                result_ports[pending], result_distances[pending] = self._nearest_exhaustive(
+                    lat_all[pending], lon_all[pending], k)
+        return self.ids[result_ports], result_distances
+
+    def _nearest_exhaustive(self, lat: np.ndarray, lon: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (port index, distance) of the k nearest ports by scanning every port.
+
+        Queries are evaluated in chunks of at most SCAN_BUDGET distances. np.partition
+        finds the k-th smallest distance in linear time; only ports at or below it are
+        sorted, so ties at the boundary are broken by index position like the grid search.
+        """
+        ports = np.zeros((len(lat), k), dtype=np.int64)
+        distances = np.zeros((len(lat), k), dtype=np.float64)
+        chunk = max(1, SCAN_BUDGET // len(self))
+        for start in range(0, len(lat), chunk):
+            rows = slice(start, start + chunk)
+            scanned = _haversine(lat[rows, None], np.cos(lat[rows, None]), lon[rows, None],
+                                 self._lat[None, :], self._cos[None, :], self._lon[None, :])
+            kth = np.partition(scanned, k - 1, axis=1)[:, k - 1]
+            for row, (row_distances, bound) in enumerate(zip(scanned, kth), start):
+                nearest = np.flatnonzero(row_distances <= bound)
+                nearest = nearest[np.lexsort((nearest, row_distances[nearest]))][:k]
+                ports[row] = nearest
+                distances[row] = row_distances[nearest]
+        return ports, distances
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1) -> List[Tuple[int, float]]:
+        """Return (port id, distance in km) of the k nearest ports, nearest first."""
+        ids, distances = self.nearest_many([latitude], [longitude], k)
+        return list(zip(ids[0].tolist(), distances[0].tolist()))
+
+    def port(self, port_id: int) -> Optional[Port]:
+        """Return the indexed Port with the given id, or None."""
+        matches = np.flatnonzero(self.ids == port_id)
+        return self.ports[matches[0]] if len(matches) and self.ports else None
+
+
+def _unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    cos = np.cos(lat)
+    return np.column_stack((cos * np.cos(lon), cos * np.sin(lon), np.sin(lat)))
+
+
+def brute_force_radius(index: PortIndex, latitudes: Sequence[float], longitudes: Sequence[float],
+                       radius_km: float) -> List[List[Tuple[int, float]]]:
+    """Reference radius query: haversine to every port, one query at a time."""
+    results = []
+    for latitude, longitude in zip(np.radians(latitudes), np.radians(longitudes)):
+        distances = _haversine(np.float64(latitude), np.cos(latitude), np.float64(longitude),
+                               index._lat, index._cos, index._lon)
+        matches = np.flatnonzero(distances <= radius_km)
+        matches = matches[np.lexsort((matches, distances[matches]))]
+        results.append(list(zip(index.ids[matches].tolist(), distances[matches].tolist())))
+    return results
+
+
+def brute_force_nearest(index: PortIndex, latitudes: Sequence[float], longitudes: Sequence[float],
+                        k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Reference k-nearest query: haversine to every port, one query at a time."""
+    ids, result = [], []
+    for latitude, longitude in zip(np.radians(latitudes), np.radians(longitudes)):
+        distances = _haversine(np.float64(latitude), np.cos(latitude), np.float64(longitude),
+                               index._lat, index._cos, index._lon)
+        order = np.argsort(distances, kind='stable')[:k]
+        ids.append(index.ids[order])
+        result.append(distances[order])
+    return np.array(ids), np.array(result)
+
+
+def benchmark(ports: int = 50000, queries: int = 1000, k: int = 8, radius_km: float = 100.0,
+              seed: int = 0) -> None:
+    """Compare the grid index with brute force on random ports and print the timings."""
+    rng = np.random.default_rng(seed)
+
+    def random_points(count: int) -> Tuple[np.ndarray, np.ndarray]:
+        latitudes = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, count)))
+        return latitudes, rng.uniform(-180.0, 180.0, count)
+
+    port_lat, port_lon = random_points(ports)
+    index = PortIndex.from_coordinates(np.arange(ports), port_lat, port_lon)
+    lat, lon = random_points(queries)
+
+    start = time.perf_counter()
+    ids, distances = index.nearest_many(lat, lon, k)
+    indexed = time.perf_counter() - start
+    start = time.perf_counter()
+    expected_ids, expected_distances = brute_force_nearest(index, lat, lon, k)
+    brute = time.perf_counter() - start
+    same = np.array_equal(ids, expected_ids) and np.array_equal(distances, expected_distances)
+    print(f"nearest {k}:   index {queries / indexed:>10.0f} q/s   brute force {queries / brute:>8.0f} q/s   "
+          f"x{brute / indexed:.1f}   identical: {same}")
+
+    start = time.perf_counter()
+    offsets, ids, distances = index.query_radius_many(lat, lon, radius_km)
+    indexed = time.perf_counter() - start
+    start = time.perf_counter()
+    expected = brute_force_radius(index, lat, lon, radius_km)
+    brute = time.perf_counter() - start
+    same = all(list(zip(ids[offsets[i]:offsets[i + 1]].tolist(), distances[offsets[i]:offsets[i + 1]].tolist()))
+               == expected[i] for i in range(queries))
+    print(f"radius {radius_km:g} km: index {queries / indexed:>10.0f} q/s   brute force {queries / brute:>8.0f} q/s   "
+          f"x{brute / indexed:.1f}   identical: {same}")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(float(value)) for value in sys.argv[1:3]))
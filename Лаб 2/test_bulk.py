@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+from bulk import load_ports, save_ports
+from samples import make_port
+
+
+def sample_ports(count=4):
+    return [make_port(50, ships=2, seed=seed) for seed in range(count)]
+
+
+@pytest.mark.parametrize("processes", [True, False])
+def test_failed_save_does_not_stop_the_others(tmp_path, processes):
+    ports = sample_ports()
+    for number, port in enumerate(ports):
+        port.id = number
+    os.mkdir(tmp_path / "port_2.json")                          # the rename onto a directory fails
+    report = save_ports(ports, str(tmp_path), workers=2, processes=processes)
+
+    assert [result.port_id for result in report.results] == [0, 1, None, 3]
+    assert [result.filename for result in report.failed] == [str(tmp_path / "port_2.json")]
+    assert report.failed[0].size == 0 and "Error" in report.failed[0].error
+    assert all(os.path.getsize(result.filename) == result.size for result in report.results if result.error is None)
+    assert sorted(os.listdir(tmp_path)) == ["port_0.json", "port_1.json", "port_2.json", "port_3.json"]
+
+
+@pytest.mark.parametrize("processes", [True, False])
+def test_failed_load_does_not_stop_the_others(tmp_path, processes):
+    ports = sample_ports(3)
+    for number, port in enumerate(ports):
+        port.id = number
+    saved = save_ports(ports, str(tmp_path), processes=processes)
+    with open(saved.results[1].filename, 'w') as f:
+        f.write("{truncated")
+    filenames = [result.filename for result in saved.results] + [str(tmp_path / "missing.json")]
+    loaded, report = load_ports(filenames, workers=2, processes=processes)
+
+    assert loaded[1] is None and loaded[3] is None
+    assert [port.to_dict() for port in (loaded[0], loaded[2])] == [ports[0].to_dict(), ports[2].to_dict()]
+    assert [result.error.split(":")[0] for result in report.failed] == ["JSONDecodeError", "FileNotFoundError"]
+    assert len(report.results) == 4
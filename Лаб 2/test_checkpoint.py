@@ -0,0 +1,82 @@
+import pytest
+
+from checkpoint import Checkpointer, load_checkpoint
+from containers import container_factory
+from ports import Port
+from ships import Ship
+
+
+def make_port():
+    port = Port(7, (46.48, 30.72))
+    port.containers.extend(container_factory(number, 400.0 + 731.1 * number) for number in range(20))
+    for ship_id in range(3):
+        ship = Ship(ship_id, 1e6)
+        for number in range(5):
+            ship.restore_container(container_factory(100 + 10 * ship_id + number, 1000.0 / (number + 3)))
+        port.dock(ship, at=10.0 * ship_id)
+    return port
+
+
+def ship_state(ship):
+    return (ship.max_weight, ship.current_weight, ship._weight_error,
+            ship.current_consumption, ship._consumption_error)
+
+
+def assert_same(restored, port):
+    assert restored.to_dict() == port.to_dict()
+    assert {ship.id: ship_state(ship) for ship in restored.ships} == {ship.id: ship_state(ship) for ship in port.ships}
+
+
+def test_delta_round_trip(tmp_path):
+    port = make_port()
+    checkpointer = Checkpointer(port, str(tmp_path / "port.log"))
+    first, second, third = port.ships
+
+    port.containers.remove(3)
+    port.containers.append(container_factory(500, 1234.5))
+    first.unload_container(101)
+    first.restore_container(container_factory(501, 0.1))
+    second.max_weight = 2e6
+    port.undock(third, at=99.0)
+    newcomer = Ship(9, 5e5)
+    newcomer.restore_container(container_factory(502, 777.7))
+    port.dock(newcomer, at=100.0)
+    newcomer.restore_container(container_factory(503, 1.3))   # after docking: goes into a delta
+    assert checkpointer.checkpoint() > 0
+
+    first.current_weight += 1e-9                                # running total drifted on its own
+    assert checkpointer.checkpoint() == 2                       # one "ship" record and the commit
+    checkpointer.close()
+    assert_same(load_checkpoint(checkpointer.path), port)
+
+
+def test_dock_records_the_state_at_arrival(tmp_path):
+    port = make_port()
+    checkpointer = Checkpointer(port, str(tmp_path / "port.log"))
+    ship = Ship(42, 1e6)
+    ship.restore_container(container_factory(600, 900.0))
+    port.dock(ship, at=5.0)
+    ship.unload_container(600)
+    checkpointer.checkpoint()
+    checkpointer.close()
+    restored = load_checkpoint(checkpointer.path)
+    assert_same(restored, port)
+    assert len(restored.ships[-1].containers) == 0
+
+
+def test_compaction_keeps_exact_totals(tmp_path):
+    port = make_port()
+    checkpointer = Checkpointer(port, str(tmp_path / "port.log"), compact_every=5)
+    ship = port.ships[0]
+    for number in range(30):
+        ship.restore_container(container_factory(700 + number, 0.1 * (number + 1)))
+        checkpointer.checkpoint()
+    assert checkpointer.generation > 0
+    checkpointer.close()
+    assert_same(load_checkpoint(checkpointer.path), port)
+
+
+def test_containers_cannot_change_in_place():
+    container = container_factory(1, 100.0)
+    with pytest.raises(AttributeError):
+        container.weight = 200.0
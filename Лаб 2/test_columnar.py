@@ -0,0 +1,49 @@
+import math
+
+import numpy as np
+
+from columnar import ColumnarContainers
+from containers import container_factory
+from samples import make_port
+from snapshot import PORT_GROUP, SHIP_GROUP, PortSnapshot, write_snapshot
+
+
+def sample_port():
+    port = make_port(300, ships=4)
+    port.containers.extend(container_factory(10000 + number, 1000.0 * number) for number in range(1, 6))
+    return port
+
+
+def assert_same(store, other):
+    for name in ("ship_ids", "weights", "type_codes", "groups", "kinds"):
+        assert np.array_equal(getattr(store, name), getattr(other, name)), name
+
+
+def test_from_port_includes_the_port_containers():
+    port = sample_port()
+    store = ColumnarContainers.from_port(port)
+    assert store.ship_ids.tolist() == [port.id] + [ship.id for ship in port.ships]
+    assert store.kinds.tolist() == [PORT_GROUP] + [SHIP_GROUP] * len(port.ships)
+    assert len(store) == len(port.containers) + sum(len(ship.containers) for ship in port.ships)
+    assert math.isclose(store.ship_weight()[0], sum(container.weight for container in port.containers))
+    assert math.isclose(store.ship_consumption()[0], sum(container.consumption() for container in port.containers))
+    for weight, ship in zip(store.ship_weight()[1:], port.ships):
+        assert math.isclose(weight, ship.current_weight, rel_tol=1e-12)
+
+
+def test_from_port_round_trips_through_a_snapshot(tmp_path):
+    port = sample_port()
+    path = str(tmp_path / "port.snap")
+    write_snapshot(port, path)
+    with PortSnapshot(path) as snapshot:
+        assert_same(ColumnarContainers.from_port(port), ColumnarContainers.from_snapshot(snapshot))
+        assert_same(ColumnarContainers.from_ships(port.ships),
+                    ColumnarContainers.from_snapshot(snapshot, kind=SHIP_GROUP))
+        assert_same(ColumnarContainers.from_port(snapshot.to_port()), ColumnarContainers.from_port(port))
+
+
+def test_consumption_of_ignores_the_port_group():
+    port = sample_port()
+    port.id = port.ships[0].id
+    store = ColumnarContainers.from_port(port)
+    assert math.isclose(store.consumption_of(port.ships[0].id), port.ships[0].total_consumption(), rel_tol=1e-12)
@@ -0,0 +1,117 @@
+import json
+import math
+
+from containers import Container
+from lazy import open_port, read_index, scan_index
+from persistence import CONTAINER, VISIT, read_port, write_port
+from samples import make_port
+from ships import Ship
+
+
+def sample_port():
+    port = make_port(200, ships=5)
+    port.history.append(99, math.nan, 1000.0, 0.0, 0.0)       # unknown arrival: written as null
+    port.dock(Ship(98, 1e12), at=500.0)
+    port.undock(port.ships[0], at=2000.0)
+    return port
+
+
+def test_open_port_matches_read_port(tmp_path):
+    port = sample_port()
+    path = str(tmp_path / "port.jsonl")
+    write_port(port, path)
+
+    assert read_port(path).to_dict() == port.to_dict()
+    with open_port(path, max_resident=2) as lazy:
+        assert lazy.to_dict() == port.to_dict()
+    assert math.isnan(read_port(path).history[0].arrived)
+
+
+def test_open_port_without_index_scans_the_file(tmp_path):
+    port = sample_port()
+    path = str(tmp_path / "port.jsonl")
+    write_port(port, path, index=False)
+
+    assert read_index(path) is None
+    with open_port(path) as lazy:
+        assert lazy.to_dict() == port.to_dict()
+
+
+def test_index_offsets_are_byte_exact(tmp_path):
+    port = sample_port()
+    path = str(tmp_path / "port.jsonl")
+    write_port(port, path)
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert b"\r" not in data and b"NaN" not in data
+
+    index = read_index(path)
+    scanned = scan_index(path)
+    assert index.containers == scanned.containers
+    assert index.visits == scanned.visits
+    assert [entry[:4] for entry in index.ships] == [entry[:4] for entry in scanned.ships]
+
+    def records(offset, count):
+        lines = data[offset:].split(b"\n")[:count]
+        return [json.loads(line) for line in lines]
+
+    offset, count = index.containers
+    assert all(record["t"] == CONTAINER for record in records(offset, count))
+    assert [Container.from_dict(record).id for record in records(offset, count)] == \
+        [container.id for container in port.containers]
+    for (ship_id, _, offset, count, _, _, _), ship in zip(index.ships, port.ships):
+        assert ship_id == ship.id
+        assert [record["id"] for record in records(offset, count)] == [container.id for container in ship.containers]
+    offset, count = index.visits
+    assert [record["t"] for record in records(offset, count)] == [VISIT] * len(port.history)
+
+
+def lazy_fleet(tmp_path, max_resident=2):
+    port = make_port(100, ships=10)
+    path = str(tmp_path / "fleet.jsonl")
+    write_port(port, path)
+    return port, open_port(path, max_resident=max_resident)
+
+
+def test_least_recently_used_ships_are_evicted(tmp_path):
+    port, lazy = lazy_fleet(tmp_path)
+    with lazy:
+        first, second, third = lazy.ships[:3]
+        assert not first.hydrated and lazy.source.resident == 0
+        len(first.containers)
+        len(second.containers)
+        len(first.containers)                                  # first is now the most recently used
+        len(third.containers)
+        assert lazy.source.resident == 2
+        assert first.hydrated and third.hydrated and not second.hydrated
+        assert second.current_weight == port.ships[1].current_weight  # totals come from the index
+        assert [c.id for c in second.containers] == [c.id for c in port.ships[1].containers]
+        assert second.hydrated and not first.hydrated
+
+
+def test_modified_ships_stay_resident(tmp_path):
+    port, lazy = lazy_fleet(tmp_path)
+    with lazy:
+        pinned = lazy.ships[0]
+        pinned.unload_container(next(iter(pinned.containers)))
+        for ship in lazy.ships[1:]:
+            len(ship.containers)
+        assert pinned.hydrated
+        assert lazy.source.resident == 2
+        assert len(pinned.containers) == len(port.ships[0].containers) - 1
+
+
+def test_unload_by_object_after_eviction(tmp_path):
+    port, lazy = lazy_fleet(tmp_path, max_resident=1)
+    with lazy:
+        ship = lazy.ships[0]
+        container = next(iter(ship.containers))
+        weight = ship.current_weight
+        len(lazy.ships[1].containers)                          # evicts ship 0
+        assert not ship.hydrated
+        assert container in ship.containers
+        ship.unload_container(container)
+        assert container.id not in ship.containers
+        assert ship.current_weight == weight - container.weight
+        assert ship.hydrated                                   # modified: pinned in memory
@@ -0,0 +1,75 @@
+import contextlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from containers import container_factory
+from metrics import MetricsRegistry
+from ports import Port
+from ships import Ship
+
+
+def count(registry, name, operation):
+    return registry.counter(name, op=operation).value
+
+
+def test_enabled_metrics_match_the_operations(tmp_path):
+    registry = MetricsRegistry()
+    port = Port(1, (0.0, 0.0))
+    ships = [Ship(number, 1e6) for number in range(5)]
+    metrics.enable(registry)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for ship in ships[:3]:
+                port.incoming_ship(ship)                        # docks through Port.dock
+            for ship in ships[3:]:
+                port.dock(ship, at=1.0)
+            port.undock(ships[0], at=2.0)
+            port.outgoing_ship(ships[1])
+            for number in range(10):
+                ships[2].load_container(container_factory(number, 100.0))
+            ships[2].unload_container(3)
+            ships[2].unload_container(99)                   # not on board, still a call
+            port.save_to_json(str(tmp_path / "port.json"))
+    finally:
+        metrics.disable()
+    port.dock(Ship(9, 1.0), at=3.0)                         # not recorded once disabled
+
+    expected = {"port.incoming_ship": 3, "port.dock": 5, "port.undock": 2, "port.outgoing_ship": 1,
+                "ship.load_container": 10, "ship.unload_container": 2, "port.save_to_json": 1}
+    for operation, calls in expected.items():
+        assert count(registry, "port_operations_total", operation) == calls
+        assert registry.histogram("port_operation_seconds", op=operation).count == calls
+        assert count(registry, "port_operation_errors_total", operation) == 0
+
+
+def test_errors_are_counted(tmp_path):
+    registry = MetricsRegistry()
+    metrics.enable(registry)
+    try:
+        try:
+            Port(1, (0.0, 0.0)).save_to_json(str(tmp_path / "missing" / "port.json"))
+        except OSError:
+            pass
+    finally:
+        metrics.disable()
+    assert count(registry, "port_operation_errors_total", "port.save_to_json") == 1
+    assert count(registry, "port_operations_total", "port.save_to_json") == 1
+
+
+def test_counts_are_exact_under_threads():
+    registry = MetricsRegistry()
+    metrics.enable(registry)
+
+    def work(seed):
+        ship = Ship(seed, 1e12)
+        for number in range(2000):
+            ship.load_container(container_factory(number, 10.0))
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(work, range(4)))
+    finally:
+        metrics.disable()
+    assert count(registry, "port_operations_total", "ship.load_container") == 8000
+    assert registry.histogram("port_operation_seconds", op="ship.load_container").count == 8000
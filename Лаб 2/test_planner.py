@@ -0,0 +1,51 @@
+from containers import container_factory
+from planner import plan_loading
+from ports import Port
+from ships import Ship
+
+
+def make_port(capacities, weights, preloaded=()):
+    port = Port(0, (0.0, 0.0))
+    for ship_id, capacity in enumerate(capacities):
+        port.ships.append(Ship(ship_id, capacity))
+    for ship_id, weight in preloaded:
+        port.ships[ship_id].restore_container(container_factory(1000 + ship_id, weight))
+    port.containers.extend(container_factory(number, weight) for number, weight in enumerate(weights))
+    return port
+
+
+def assigned_ids(plan):
+    return {ship_id: sorted(container.id for container in containers)
+            for ship_id, containers in plan.assignments.items() if containers}
+
+
+def test_fuel_objective_uses_fewer_ships():
+    port = make_port([1000.0, 1000.0, 3000.0], [800.0, 800.0, 800.0])
+    by_weight = plan_loading(port, "first_fit", "weight")
+    by_fuel = plan_loading(port, "first_fit", "fuel")
+    assert assigned_ids(by_weight) != assigned_ids(by_fuel)
+    assert by_weight.loaded_weight() == by_fuel.loaded_weight() == 2400.0
+    assert (by_weight.ships_sailing(), by_fuel.ships_sailing()) == (3, 1)
+
+
+def test_fuel_objective_prefers_ships_that_sail_anyway():
+    port = make_port([10000.0, 1500.0], [500.0, 500.0], preloaded=[(1, 400.0)])
+    by_weight = plan_loading(port, "first_fit", "weight")
+    by_fuel = plan_loading(port, "first_fit", "fuel")
+    assert assigned_ids(by_weight) == {0: [0, 1]}
+    assert assigned_ids(by_fuel) == {1: [0, 1]}
+    assert (by_weight.ships_sailing(), by_fuel.ships_sailing()) == (2, 1)
+
+
+def test_consolidation_keeps_every_container():
+    weights = [float(100 + 37 * i % 900) for i in range(200)]
+    port = make_port([4000.0 + 250 * i for i in range(30)], weights)
+    for strategy in ("first_fit", "best_fit"):
+        by_weight = plan_loading(port, strategy, "weight")
+        by_fuel = plan_loading(port, strategy, "fuel")
+        assert by_fuel.loaded_weight() == by_weight.loaded_weight()
+        assert by_fuel.ships_sailing() <= by_weight.ships_sailing()
+        for ship in by_fuel.ships:
+            assert sum(c.weight for c in by_fuel.assignments[ship.id]) <= ship.max_weight - ship.current_weight
+        planned = [c.id for containers in by_fuel.assignments.values() for c in containers]
+        assert sorted(planned + [c.id for c in by_fuel.unassigned]) == list(range(len(weights)))
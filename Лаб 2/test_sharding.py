@@ -0,0 +1,37 @@
+import os
+import pickle
+
+from sharding import run_sharded, run_single
+from simulation import random_fleet
+from visits import VisitLog
+
+
+def spilling_network(directory, capacity=4):
+    network, fleet = random_fleet(ports=12, ships=60, seed=3)
+    for port in network:
+        port.history = VisitLog(capacity, os.path.join(directory, f"{port.id}.visits"))
+    return network, fleet
+
+
+def test_port_with_spill_file_pickles(tmp_path):
+    network, fleet = spilling_network(str(tmp_path))
+    port = network[0]
+    for number in range(10):
+        port.history.append(number, number, number + 1.0, 1.0, 1.0)
+    copy = pickle.loads(pickle.dumps(port))
+    assert list(copy.history.spilled()) == list(port.history.spilled())
+    assert list(copy.history) == list(port.history)
+    copy.history.append(99, 20.0, 21.0, 1.0, 1.0)            # the copy keeps spilling to the same file
+    assert len(list(copy.history.spilled())) == 7
+    copy.close()
+    port.close()
+
+
+def test_sharded_run_with_spilling_histories_matches_single(tmp_path):
+    os.mkdir(tmp_path / "single")
+    os.mkdir(tmp_path / "sharded")
+    reference = run_single(*spilling_network(str(tmp_path / "single")), until=300.0, berths=2)
+    result = run_sharded(*spilling_network(str(tmp_path / "sharded")), 300.0, workers=2, berths=2)
+    assert result.same_as(reference)
+    assert result.events > 0
+    assert result.speedup(reference) > 0.0
@@ -0,0 +1,50 @@
+import math
+
+from ports import Port
+from ships import Ship
+from simulation import Simulation, random_network
+from visits import DEFAULT_CAPACITY
+
+
+def two_ports():
+    return [Port(0, (0.0, 0.0)), Port(1, (0.0, 1.0))]
+
+
+def test_visit_keeps_the_arrival_event_time():
+    ports = two_ports()
+    simulation = Simulation(ports, berths=1, handling_hours=3.0)
+    simulation.add_ship(Ship(1, 1000.0), [0, 1], start=1.0)
+    simulation.add_ship(Ship(2, 1000.0), [0, 1], start=2.0)     # waits for the berth until 4.0
+    simulation.run(until=10.0)
+
+    first, second = ports[0].history
+    assert (first.ship_id, first.arrived, first.departed) == (1, 1.0, 4.0)
+    assert (second.ship_id, second.arrived, second.departed) == (2, 2.0, 7.0)
+    stats = simulation.stats()[0]
+    assert stats.total_wait == 2.0
+    assert stats.total_wait == sum(visit.departed - visit.arrived - 3.0 for visit in ports[0].history)
+
+
+def test_docked_ship_arrival_is_the_event_time():
+    ports = two_ports()
+    simulation = Simulation(ports, berths=1, handling_hours=3.0)
+    simulation.add_ship(Ship(1, 1000.0), [0, 1], start=1.0)
+    simulation.add_ship(Ship(2, 1000.0), [0, 1], start=2.0)
+    simulation.run(until=5.0)
+    assert ports[0].arrivals == {2: 2.0}
+
+
+def test_history_stays_bounded():
+    simulation = random_network(ports=5, ships=50)
+    for berths in simulation.ports.values():
+        assert berths.port.history.capacity == DEFAULT_CAPACITY
+    simulation = Simulation([berths.port for berths in random_network(ports=5, ships=50).ports.values()],
+                            history=20)
+    for ship_id in range(50):
+        simulation.add_ship(Ship(ship_id, 1000.0), [ship_id % 5, (ship_id + 1) % 5], start=float(ship_id))
+    simulation.run(max_voyages=2000)
+    for berths in simulation.ports.values():
+        assert len(berths.port.history) <= 20
+        assert berths.port.history.total > 20
+    assert not any(math.isnan(visit.arrived) for berths in simulation.ports.values()
+                   for visit in berths.port.history)
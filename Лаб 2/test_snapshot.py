@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+import snapshot
+from samples import make_port
+from snapshot import PortSnapshot, write_snapshot
+
+
+def test_snapshot_round_trips_the_port(tmp_path):
+    port = make_port(200, ships=3)
+    path = str(tmp_path / "port.snap")
+    write_snapshot(port, path)
+    with PortSnapshot(path) as saved:
+        assert saved.to_port().to_dict() == port.to_dict()
+
+
+def test_failed_write_keeps_the_previous_snapshot(tmp_path, monkeypatch):
+    port = make_port(200, ships=3)
+    path = str(tmp_path / "port.snap")
+    write_snapshot(port, path)
+    with open(path, 'rb') as f:
+        before = f.read()
+
+    def crash(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(snapshot.os, "fsync", crash)
+    with pytest.raises(OSError):
+        write_snapshot(make_port(50, ships=1), path)
+    with open(path, 'rb') as f:
+        assert f.read() == before
+    assert os.listdir(tmp_path) == ["port.snap"]
+
+
+def test_open_snapshot_survives_a_rewrite(tmp_path):
+    path = str(tmp_path / "port.snap")
+    write_snapshot(make_port(200, ships=3), path)
+    with PortSnapshot(path) as saved:
+        count = len(saved)
+        write_snapshot(make_port(20, ships=1), path)
+        assert len(saved) == count and saved.to_port().ships
+    with PortSnapshot(path) as saved:
+        assert len(saved) < count
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import spatial
+from spatial import PortIndex, brute_force_nearest, brute_force_radius
+
+
+def random_points(rng, count):
+    latitudes = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, count)))
+    return latitudes, rng.uniform(-180.0, 180.0, count)
+
+
+def sample_index(ports=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    latitudes, longitudes = random_points(rng, ports)
+    return PortIndex.from_coordinates(np.arange(ports), latitudes, longitudes), rng
+
+
+@pytest.mark.parametrize("k", [1, 8, 300, 2000])
+def test_nearest_matches_brute_force(k):
+    index, rng = sample_index()
+    latitudes, longitudes = random_points(rng, 200)
+    ids, distances = index.nearest_many(latitudes, longitudes, k, batch_size=64)
+    expected_ids, expected_distances = brute_force_nearest(index, latitudes, longitudes, k)
+    assert np.array_equal(ids, expected_ids)
+    assert np.array_equal(distances, expected_distances)
+
+
+def test_large_k_does_not_scan_all_pairs_per_batch(monkeypatch):
+    index, rng = sample_index()
+    latitudes, longitudes = random_points(rng, 100)
+    chords = []
+    within = index._within
+
+    def spy(lat, lon, chord):
+        chords.append(chord)
+        return within(lat, lon, chord)
+
+    monkeypatch.setattr(index, "_within", spy)
+    monkeypatch.setattr(spatial, "SCAN_BUDGET", 10 * len(index))
+    ids, _ = index.nearest_many(latitudes, longitudes, k=1500)
+    assert all(chord <= spatial.MAX_CHORD for chord in chords)
+    assert np.array_equal(ids, brute_force_nearest(index, latitudes, longitudes, 1500)[0])
+
+
+def test_nearest_breaks_ties_by_index_position():
+    index = PortIndex.from_coordinates([10, 11, 12, 13], [0.0, 0.0, 0.0, 5.0], [1.0, -1.0, 1.0, 0.0])
+    assert [port_id for port_id, _ in index.nearest(0.0, 0.0, k=3)] == [10, 11, 12]
+    assert [port_id for port_id, _ in index.nearest(90.0, 0.0, k=4)] == [13, 10, 11, 12]
+
+
+def test_radius_matches_brute_force():
+    index, rng = sample_index()
+    latitudes, longitudes = random_points(rng, 100)
+    offsets, ids, distances = index.query_radius_many(latitudes, longitudes, 500.0)
+    expected = brute_force_radius(index, latitudes, longitudes, 500.0)
+    for i, matches in enumerate(expected):
+        assert list(zip(ids[offsets[i]:offsets[i + 1]].tolist(),
+                        distances[offsets[i]:offsets[i + 1]].tolist())) == matches
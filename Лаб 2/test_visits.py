@@ -0,0 +1,48 @@
+import pytest
+
+from ports import Port
+from visits import DEFAULT_CAPACITY, VisitLog
+
+
+def fill(log, visits):
+    for number in range(visits):
+        log.append(number % 3, number * 10.0, number * 10.0 + 5.0, 100.0, 1.0)
+
+
+def test_port_history_is_bounded_by_default():
+    port = Port(1, (0.0, 0.0))
+    assert port.history.capacity == DEFAULT_CAPACITY
+    fill(port.history, DEFAULT_CAPACITY + 10)
+    assert len(port.history) == DEFAULT_CAPACITY
+    assert port.history.total == DEFAULT_CAPACITY + 10
+    assert port.history[0].arrived == 100.0
+
+
+def test_spilled_visits_are_found_by_time_and_ship(tmp_path):
+    with VisitLog(capacity=4, spill=str(tmp_path / "spill.bin")) as log:
+        fill(log, 10)
+        assert [visit.arrived for visit in log.spilled()] == [number * 10.0 for number in range(6)]
+        assert [visit.arrived for visit in log.departed_between(20.0, 80.0, include_spilled=True)] == \
+            [20.0, 30.0, 40.0, 50.0, 60.0, 70.0]
+        assert [visit.arrived for visit in log.visits_of(1, include_spilled=True)] == [10.0, 40.0, 70.0]
+
+
+def test_closed_spill_file_raises(tmp_path):
+    log = VisitLog(capacity=4, spill=str(tmp_path / "spill.bin"))
+    fill(log, 6)
+    log.close()
+    with pytest.raises(ValueError):
+        list(log.spilled())
+    with pytest.raises(ValueError):
+        log.departed_between(0.0, 100.0, include_spilled=True)
+    with pytest.raises(ValueError):
+        log.append(5, 100.0, 105.0, 1.0, 1.0)
+    assert len(log.departed_between(0.0, 100.0)) == 4       # the visits in memory stay readable
+
+
+def test_log_without_spill_file_drops_evicted_visits():
+    log = VisitLog(capacity=2)
+    fill(log, 5)
+    log.close()
+    assert list(log.spilled()) == []
+    assert [visit.arrived for visit in log] == [30.0, 40.0]
@@ -0,0 +1,354 @@
+"""Compact log of ship visits to a port.
+
+A visit is five numbers: ship id, arrival and departure time, cargo weight and
+fuel consumption at departure. They are kept in parallel typed arrays (40 bytes
+per visit) instead of retaining the departed Ship with its containers.
+
+With a capacity the log is a ring buffer holding the most recent visits; older
+ones are appended to an optional spill file of fixed-size binary records, or
+dropped. Ports keep DEFAULT_CAPACITY visits unless given another log. Visits are indexed by ship id, and lookups by departure time use binary
+search, in memory and in the spill file alike, while departures do not decrease.
+An out-of-order or NaN departure makes lookups scan the memory until it is
+evicted, and the spill file for good once it is written there.
+
+Usage:
+    python visits.py [visits]      compare with a list of departed ships
+"""
+import math
+import os
+import struct
+import sys
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set
+
+from containers import container_factory
+from ships import Ship
+
+_RECORD = struct.Struct('<qdddd')
+DEFAULT_CAPACITY = 100000  # Візитів у пам'яті порту за замовчуванням
+
+
+class Visit(NamedTuple):
+    """One stay of a ship in a port; unknown times are NaN."""
+    ship_id: int
+    arrived: float
+    departed: float
+    cargo_weight: float
+    consumption: float
+
+    def to_dict(self) -> Dict:
+        """Convert the visit to a dictionary; unknown times become None."""
+        return {
+            "ship_id": self.ship_id,
+            "arrived": None if math.isnan(self.arrived) else self.arrived,
+            "departed": None if math.isnan(self.departed) else self.departed,
+            "cargo_weight": self.cargo_weight,
+            "consumption": self.consumption,
+        }
+
+    @staticmethod
+    def from_dict(data: Dict) -> 'Visit':
+        """Create a Visit from its dictionary representation."""
+        return Visit(data["ship_id"], math.nan if data.get("arrived") is None else data["arrived"],
+                     math.nan if data.get("departed") is None else data["departed"],
+                     data["cargo_weight"], data["consumption"])
+
+
+class _Departures:
+    """Sequence of departure times of a log, oldest first, for bisect."""
+
+    def __init__(self, log: 'VisitLog') -> None:
+        self.log = log
+
+    def __len__(self) -> int:
+        return len(self.log)
+
+    def __getitem__(self, index: int) -> float:
+        return self.log._departed[self.log._slot(self.log.evicted + index)]
+
+
+class _SpilledDepartures:
+    """Sequence of departure times of a spill file, read record by record."""
+
+    def __init__(self, f, count: int) -> None:
+        self.f = f
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> float:
+        self.f.seek(index * _RECORD.size)
+        return _RECORD.unpack(self.f.read(_RECORD.size))[2]
+
+
+class VisitLog:
+    """Columnar, optionally bounded log of ship visits.
+
+    Attributes:
+        capacity (Optional[int]): Visits kept in memory, unbounded if None.
+        spill (Optional[str]): File receiving visits evicted from memory; they are dropped if None.
+        evicted (int): Visits that left memory (spilled or dropped).
+    """
+
+    def __init__(self, capacity: Optional[int] = None, spill: Optional[str] = None) -> None:
+        """Initialize an empty VisitLog.
+
+        Args:
+            capacity (Optional[int]): Visits kept in memory, unbounded if None.
+            spill (Optional[str]): File receiving evicted visits; an existing file is truncated.
+
+        Raises:
+            ValueError: If capacity is not positive.
+        """
+        if capacity is not None and capacity <= 0:
+            raise ValueError("Capacity must be positive")
+        self.capacity = capacity
+        self.spill = spill
+        self.evicted = 0
+        self._count = 0  # Усього записаних візитів
+        self._ship_ids = array('q')
+        self._arrived = array('d')
+        self._departed = array('d')
+        self._weights = array('d')
+        self._consumption = array('d')
+        self._by_ship: Dict[int, array] = {}  # Номери візитів у пам'яті для кожного корабля
+        self._disorder = 0  # Сусідні пари в пам'яті, де час відправлення спадає (або NaN)
+        self._spill_file = open(spill, 'w+b') if spill else None
+        self._spilled_ordered = True
+        self._last_spilled = -math.inf
+
+    def _spill_handle(self):
+        """Return the open spill file, or None if the log has no spill file.
+
+        Raises:
+            ValueError: If the spill file was closed; its visits can no longer be written or read.
+        """
+        if self._spill_file is None and self.spill is not None:
+            raise ValueError(f"Spill file {self.spill} of the visit log is closed")
+        return self._spill_file
+
+    def _slot(self, number: int) -> int:
+        return number % self.capacity if self.capacity else number
+
+    def __len__(self) -> int:
+        return self._count - self.evicted
+
+    @property
+    def total(self) -> int:
+        """Number of visits ever recorded, including evicted ones."""
+        return self._count
+
+    def append(self, ship_id: int, arrived: float, departed: float, cargo_weight: float,
+               consumption: float) -> None:
+        """Record a visit, evicting the oldest one if the log is full.
+
+        Args:
+            ship_id (int): The ship.
+            arrived (float): Arrival time, NaN if unknown.
+            departed (float): Departure time, NaN if unknown.
+            cargo_weight (float): Total container weight on departure.
+            consumption (float): Fuel consumption on departure.
+        """
+        columns = (self._ship_ids, self._arrived, self._departed, self._weights, self._consumption)
+        values = (ship_id, arrived, departed, cargo_weight, consumption)
+        if self.capacity is not None and len(self) == self.capacity:
+            self._evict()
+        if len(self) and not departed >= self._departed[self._slot(self._count - 1)]:
+            self._disorder += 1
+        if len(self._ship_ids) < (self.capacity or math.inf):
+            for column, value in zip(columns, values):
+                column.append(value)
+        else:
+            slot = self._slot(self._count)
+            for column, value in zip(columns, values):
+                column[slot] = value
+        self._by_ship.setdefault(ship_id, array('q')).append(self._count)
+        self._count += 1
+
+    def _evict(self) -> None:
+        visit = self._visit(self.evicted)
+        spill_file = self._spill_handle()
+        if spill_file is not None:
+            if not visit.departed >= self._last_spilled:
+                self._spilled_ordered = False
+            self._last_spilled = visit.departed
+            spill_file.seek(0, os.SEEK_END)
+            spill_file.write(_RECORD.pack(*visit))
+        if len(self) > 1 and not self._departed[self._slot(self.evicted + 1)] >= visit.departed:
+            self._disorder -= 1  # Порушення порядку пішло з пам'яті разом із візитом
+        numbers = self._by_ship[visit.ship_id]
+        del numbers[0]  # Найстаріший візит корабля завжди витісняється першим
+        if not numbers:
+            del self._by_ship[visit.ship_id]
+        self.evicted += 1
+
+    def _visit(self, number: int) -> Visit:
+        slot = self._slot(number)
+        return Visit(self._ship_ids[slot], self._arrived[slot], self._departed[slot],
+                     self._weights[slot], self._consumption[slot])
+
+    def __getitem__(self, index: int) -> Visit:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Visit index out of range")
+        return self._visit(self.evicted + index)
+
+    def __iter__(self) -> Iterator[Visit]:
+        """Iterate over the visits in memory, oldest first."""
+        return (self._visit(number) for number in range(self.evicted, self._count))
+
+    def spilled(self) -> Iterator[Visit]:
+        """Iterate over the visits in the spill file, oldest first.
+
+        Raises:
+            ValueError: If the spill file was closed.
+        """
+        spill_file = self._spill_handle()
+        if spill_file is None:
+            return iter(())
+        spill_file.flush()
+        return self._read_spilled()
+
+    def _read_spilled(self) -> Iterator[Visit]:
+        with open(self.spill, 'rb') as f:
+            while True:
+                data = f.read(_RECORD.size)
+                if len(data) < _RECORD.size:
+                    return
+                yield Visit(*_RECORD.unpack(data))
+
+    def visits_of(self, ship_id: int, include_spilled: bool = False) -> List[Visit]:
+        """Return the visits of one ship, oldest first.
+
+        Args:
+            ship_id (int): The ship.
+            include_spilled (bool): Also scan the spill file.
+
+        Returns:
+            List[Visit]: The ship's visits.
+
+        Raises:
+            ValueError: If include_spilled is set and the spill file was closed.
+        """
+        visits = [visit for visit in self.spilled() if visit.ship_id == ship_id] if include_spilled else []
+        visits.extend(self._visit(number) for number in self._by_ship.get(ship_id, ()))
+        return visits
+
+    def departed_between(self, start: float, end: float, include_spilled: bool = False) -> List[Visit]:
+        """Return the visits with a departure time in [start, end), oldest first.
+
+        Args:
+            start (float): Earliest departure time.
+            end (float): Departure times from here on are excluded.
+            include_spilled (bool): Also search the spill file.
+
+        Returns:
+            List[Visit]: The matching visits.
+
+        Raises:
+            ValueError: If include_spilled is set and the spill file was closed.
+        """
+        visits: List[Visit] = []
+        spill_file = self._spill_handle() if include_spilled else None
+        if spill_file is not None:
+            spill_file.flush()
+            with open(self.spill, 'rb') as f:
+                count = self.evicted
+                first = bisect_left(_SpilledDepartures(f, count), start) if self._spilled_ordered else 0
+                f.seek(first * _RECORD.size)
+                for _ in range(first, count):
+                    visit = Visit(*_RECORD.unpack(f.read(_RECORD.size)))
+                    if visit.departed >= end and self._spilled_ordered:
+                        break
+                    if start <= visit.departed < end:
+                        visits.append(visit)
+        if self._disorder:
+            visits.extend(visit for visit in self if start <= visit.departed < end)
+            return visits
+        departures = _Departures(self)
+        first = bisect_left(departures, start)
+        last = bisect_left(departures, end, first)
+        visits.extend(self._visit(self.evicted + index) for index in range(first, last))
+        return visits
+
+    def ships_between(self, start: float, end: float, include_spilled: bool = False) -> Set[int]:
+        """Return the ids of the ships that departed in [start, end)."""
+        return {visit.ship_id for visit in self.departed_between(start, end, include_spilled)}
+
+    def to_list(self) -> List[Dict]:
+        """Return the visits in memory as dictionaries, oldest first."""
+        return [visit.to_dict() for visit in self]
+
+    def close(self) -> None:
+        """Close the spill file, keeping it on disk; later evictions and spill reads raise ValueError."""
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def __getstate__(self) -> Dict:
+        """Return the state for pickling; the open spill file is flushed and left out."""
+        state = self.__dict__.copy()
+        if self._spill_file is not None:
+            self._spill_file.flush()
+        state["_spill_file"] = self._spill_file is not None  # Чи був файл відкритий
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        """Restore a pickled log, reopening its spill file without truncating it.
+
+        The copy appends to the same spill file, so only one of the copies should
+        keep recording visits, e.g. the one in the worker process that owns the port.
+        """
+        opened = state.pop("_spill_file")
+        self.__dict__.update(state)
+        self._spill_file = open(self.spill, 'r+b') if opened else None
+
+    def __enter__(self) -> 'VisitLog':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def benchmark(visits: int = 1000000, ships: int = 1000, containers: int = 20) -> None:
+    """Compare the memory of a list of departed ships with a VisitLog, and time the lookups."""
+    cargo = [container_factory(number, 1000.0 + number) for number in range(containers)]
+    tracemalloc.start()
+    departed = []
+    for number in range(visits // 10):
+        ship = Ship(number, 1e12)
+        for container in cargo:
+            ship.restore_container(container)
+        departed.append(ship)
+    ship_bytes = tracemalloc.get_traced_memory()[0] / len(departed)
+    del departed
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    log = VisitLog()
+    for number in range(visits):
+        log.append(number % ships, number * 10.0, number * 10.0 + 5.0, 1000.0, 3.5)
+    visit_bytes = tracemalloc.get_traced_memory()[0] / visits
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    week = log.departed_between(visits * 5.0, visits * 5.0 + 7 * 24 * 3600)
+    indexed = time.perf_counter() - start
+    start = time.perf_counter()
+    scanned = [visit for visit in log if visits * 5.0 <= visit.departed < visits * 5.0 + 7 * 24 * 3600]
+    scan = time.perf_counter() - start
+    start = time.perf_counter()
+    log.visits_of(7)
+    by_ship = time.perf_counter() - start
+    print(f"departed ship with {containers} containers: {ship_bytes:.0f} B, visit record: {visit_bytes:.0f} B")
+    print(f"time range ({len(week)} visits): {indexed * 1e3:.2f} ms, scan {scan * 1e3:.0f} ms, "
+          f"same: {week == scanned}; visits of one ship: {by_ship * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(float(value)) for value in sys.argv[1:2]))